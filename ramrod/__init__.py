@@ -1,6 +1,9 @@
 # Copyright (c) 2015, The MITRE Corporation. All rights reserved.
 # See LICENSE.txt for complete terms.
 
+# external
+from six import iteritems, string_types
+
 # internal
 from . import errors, utils
 
@@ -11,7 +14,109 @@ from .results import ResultDocument, UpdateResults  # noqa
 from .version import __version__  # noqa
 
 
-def update(doc, from_=None, to_=None, options=None, force=False):
+def _get_packages():
+    """Returns a dictionary of root node names to the packages which update
+    documents with those roots.
+
+    """
+    import ramrod.cybox
+    import ramrod.stix
+
+    return {
+        'STIX_Package': ramrod.stix,
+        'Observables': ramrod.cybox,
+    }
+
+
+def get_package(root, roots=None):
+    """Returns the package which updates documents with `root` as their
+    root node: ``ramrod.stix`` or ``ramrod.cybox``.
+
+    Args:
+        root: The root node of a document, or the local name of a root node
+            (e.g., ``'STIX_Package'``).
+        roots (optional): A collection of the root node names which are
+            accepted. If ``None``, both STIX and CybOX documents are
+            accepted.
+
+    Raises:
+        .UpdateError: If `root` is not the root node of a document which can
+            be updated, or if it is not found in `roots`.
+
+    """
+    packages = _get_packages()
+
+    if roots is not None:
+        packages = dict((k, v) for k, v in iteritems(packages) if k in roots)
+
+    if isinstance(root, string_types):
+        name = root
+    else:
+        name = utils.get_localname(root)
+
+    try:
+        return packages[name]
+    except KeyError:
+        error = "Document root node must be one of {0}. Found: '{1}'"
+        error = error.format(list(packages), name)
+        raise errors.UpdateError(error)
+
+
+def get_updater(family, version):
+    """Returns a shared updater instance for `version` of the `family`
+    language.
+
+    Updaters are cached, so repeated calls return the same instance. The
+    returned updater is safe to use from any number of threads at once.
+
+    Example:
+        >>> updater = ramrod.get_updater('stix', '1.1.1')
+        >>> results = updater.update(doc)
+
+    Args:
+        family: The language of the updater: ``'stix'`` or ``'cybox'``.
+        version: The version of the content the updater updates from.
+
+    Raises:
+        ValueError: If `family` is not ``'stix'`` or ``'cybox'``.
+        .InvalidVersionError: If `version` is not a known `family`
+            version.
+
+    """
+    families = dict((x.FAMILY, x) for x in _get_packages().values())
+
+    try:
+        package = families[family]
+    except KeyError:
+        error = "Unknown language family: '{0}'. Expected one of {1}."
+        error = error.format(family, sorted(families))
+        raise ValueError(error)
+
+    return package.get_updater(version)
+
+
+def _update(root, owned, from_, to_, options, force, inplace):
+    """Updates the document with the `root` node using the package which
+    matches the name of `root`.
+
+    Args:
+        root: The root node of the document.
+        owned: ``True`` if `root` belongs to a tree which is private to the
+            caller (e.g., it was just parsed) and can be updated in place.
+
+    """
+    package = get_package(root)
+    from_ = from_ or package.get_version(root)
+
+    # A document parsed from a filename or file-like object is private to
+    # this call, so the update can modify it without copying it first.
+    inplace = inplace or owned
+    updated = package.update(root, from_, to_, options, force, inplace=inplace)
+    return updated
+
+
+def update(doc, from_=None, to_=None, options=None, force=False,
+           inplace=False):
     """Updates an input STIX or CybOX document to align with a newer version
     of the STIX/CybOX schemas.
 
@@ -37,6 +142,10 @@ def update(doc, from_=None, to_=None, options=None, force=False):
             ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
         force (boolean): Attempt to force the update process if the document
             contains untranslatable fields.
+        inplace (boolean): If ``True`` and `doc` is an ``etree._Element`` or
+            ``etree._ElementTree``, the document is updated in place rather
+            than copied. The updated document should always be retrieved from
+            the return value, since the root node may be replaced.
 
     Returns:
         An instance of
@@ -56,34 +165,219 @@ def update(doc, from_=None, to_=None, options=None, force=False):
             document does not contain a version attribute.
 
     """
-    import ramrod.cybox
-    import ramrod.stix
+    root, owned = utils.get_owned_root(doc)
+    options = options or DEFAULT_UPDATE_OPTIONS
+    return _update(root, owned, from_, to_, options, force, inplace)
+
+
+def analyze(doc, from_=None, to_=None, options=None):
+    """Reports what updating a STIX or CybOX document would do, without
+    copying or modifying the document.
+
+    For each version hop of the update, the report lists the untranslatable
+    fields which a forced update would remove, the non-unique IDs it would
+    remap, the fields which would be translated, the empty optional
+    elements and attributes which would be removed and the controlled
+    vocabulary instances which would be updated. A cost estimate is given
+    for each hop as well, so that documents can be ranked by the work their
+    updates need.
 
+    Every hop is analyzed against the input document, since the document is
+    not updated. Findings of hops after the first are estimates: content
+    which an earlier hop would translate or renamespace is not seen by
+    later hops.
+
+    Example:
+        >>> report = ramrod.analyze("stix_1.0.xml")
+        >>> report.updatable, report.loses_content
+        (False, True)
+        >>> report.hops[0].disallowed
+        {'DisallowedMAEC': 1}
+
+    Args:
+        doc: A STIX or CybOX document filename, file-like object,
+            ``etree._Element`` or ``etree._ElementTree`` object instance.
+        from_ (optional, string): The version to update from. If not specified,
+            the `from_` version will be retrieved from the input document.
+        to_ (optional, string): The version to update to. If not specified,
+            the latest language version will be assumed.
+        options (optional): A :class:`.UpdateOptions` instance. If
+            ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used. Its
+            ``check_versions``, ``update_vocabularies`` and
+            ``remove_optionals`` options are honored.
+
+    Returns:
+        A :class:`ramrod.analysis.AnalysisReport`.
+
+    Raises:
+        .UpdateError: If the input `doc` does not contain a ``STIX_Package``
+            or ``Observables`` root-level node.
+        .InvalidVersionError: If `from_` or `to_` is not a known version, or
+            `from_` was not specified and the version of `doc` is not known.
+        .UnknownVersionError: If `from_` was not specified and the input
+            document does not contain a version attribute.
+
+    """
     root = utils.get_etree_root(doc)
-    name = utils.get_localname(root)
+    package = get_package(root)
+    from_ = from_ or package.get_version(root)
+
+    if not from_:
+        error = "Unable to determine the version of the input document."
+        raise errors.UnknownVersionError(error)
+
+    report = package.get_plan(from_, to_).analyze(root, options)
+    report.family = package.FAMILY
+
+    return report
+
+
+def sniff(doc):
+    """Reads the language, version and namespaces of a STIX or CybOX
+    document from its root node, without parsing the rest of the document.
+
+    This is meant for sorting or skipping documents before they are
+    updated. See :meth:`ramrod.header.sniff` for details.
+
+    Example:
+        >>> header = ramrod.sniff("stix_1.0.xml")
+        >>> header.family, header.version, header.is_latest
+        ('stix', '1.0', False)
+
+    Args:
+        doc: A STIX or CybOX document filename, file-like object,
+            ``etree._Element`` or ``etree._ElementTree`` object instance.
+
+    Returns:
+        A :class:`ramrod.header.DocumentHeader` instance.
+
+    Raises:
+        .UpdateError: If the input `doc` does not contain a ``STIX_Package``
+            or ``Observables`` root-level node.
+        etree.XMLSyntaxError: If the root start tag of `doc` cannot be
+            parsed.
+
+    """
+    from . import header
+
+    return header.sniff(doc)
+
+
+def update_many(docs, from_=None, to_=None, options=None, force=False,
+                inplace=False):
+    """Updates each STIX or CybOX document in `docs`, yielding the results
+    as each document is updated.
+
+    This performs the same updates as :meth:`update`, but the XML parser,
+    update plans and updater instances are shared by every document. A
+    document which cannot be parsed or updated does not stop the batch:
+    the error is yielded in place of its results.
+
+    Args:
+        docs: An iterable of STIX or CybOX document filenames, file-like
+            objects, ``etree._Element`` or ``etree._ElementTree`` object
+            instances. Documents may be of mixed types and versions.
+        to_ (optional, string): The expected output version of the update
+            process. If not specified, the latest language version will be
+            assumed.
+        from_ (optional, string): The version to update from. If not specified,
+            the `from_` version will be retrieved from each input document.
+        options (optional): A :class:`.UpdateOptions` instance. If
+            ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+        force (boolean): Attempt to force the update process if a document
+            contains untranslatable fields.
+        inplace (boolean): If ``True``, ``etree._Element`` or
+            ``etree._ElementTree`` documents are updated in place rather than
+            copied.
+
+    Yields:
+        A ``(doc, result)`` tuple for each document in `docs`. The `result`
+        is an instance of :class:`.UpdateResults`, or the
+        :class:`.UpdateError`, :class:`.InvalidVersionError`,
+        :class:`.UnknownVersionError`, ``etree.XMLSyntaxError`` or ``IOError``
+        raised while parsing or updating `doc`.
+
+    """
     options = options or DEFAULT_UPDATE_OPTIONS
+    parser = utils.get_xml_parser()
 
-    packages = {
-        'STIX_Package': ramrod.stix,
-        'Observables': ramrod.cybox,
-    }
+    for doc in docs:
+        try:
+            root, owned = utils.get_owned_root(doc, parser=parser)
+            result = _update(
+                root, owned, from_, to_, options, force, inplace
+            )
+        except errors.DOCUMENT_ERRORS as ex:
+            result = ex
 
-    try:
-        package = packages[name]
-        version_func = package.get_version
-        update_func  = package.update
-        from_ = from_ or version_func(root)
-    except KeyError:
-        error = "Document root node must be one of {0}. Found: '{1}'"
-        error = error.format(packages.keys(), name)
-        raise errors.UpdateError(error)
+        yield doc, result
 
-    updated = update_func(root, from_, to_, options, force)
-    return updated
+
+def update_stream(doc, output, from_=None, to_=None, options=None,
+                  force=False, jobs=None):
+    """Updates an input STIX or CybOX document a few components at a time,
+    writing the updated document to `output` as it is updated.
+
+    This performs the same updates as :meth:`update`, but the input
+    document is never fully loaded into memory. See
+    :meth:`ramrod.stream.update` for details.
+
+    Args:
+        doc: A STIX or CybOX document filename or file-like object.
+        output: A filename or file-like object to write the updated document
+            to.
+        to_ (optional, string): The expected output version of the update
+            process. If not specified, the latest language version will be
+            assumed.
+        from_ (optional, string): The version to update from. If not specified,
+            the `from_` version will be retrieved from the input document.
+        options (optional): A :class:`.UpdateOptions` instance. If
+            ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+        force (boolean): Attempt to force the update process if the document
+            contains untranslatable fields.
+        jobs (optional): The number of worker processes which update the
+            components of the document. If ``None``, the document is
+            updated in this process.
+
+    Returns:
+        An instance of :class:`.UpdateResults`. The ``document`` attribute is
+        ``None``.
+
+    Raises:
+        .UpdateError: If any of the following occur:
+
+            * The input `doc` does not contain a ``STIX_Package``
+              or ``Observables`` root-level node.
+            * If`force` is ``False`` and an untranslatable field or
+              non-unique ID is found in the input `doc`.
+        .InvalidVersionError: If the input document contains a version
+            attribute that is incompatible with a STIX/CybOX Updater class
+            instance.
+        .UnknownVersionError: If `from_` was not specified and the input
+            document does not contain a version attribute.
+
+    """
+    from . import stream
+
+    return stream.update(
+        doc,
+        output,
+        from_=from_,
+        to_=to_,
+        options=options,
+        force=force,
+        jobs=jobs
+    )
 
 
 __all__ = [
+    'analyze',
+    'get_package',
+    'get_updater',
+    'sniff',
     'update',
+    'update_many',
+    'update_stream',
     'UpdateOptions',  # defined in ramrod.options
     'DEFAULT_UPDATE_OPTIONS',  # defined in ramrod.options
     'UpdateResults',  # defined in ramrod.results
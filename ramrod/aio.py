@@ -0,0 +1,226 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import weakref
+
+# internal
+import ramrod
+from ramrod import errors, utils
+from ramrod.options import DEFAULT_UPDATE_OPTIONS
+
+
+# The default number of documents updated at once by an AsyncUpdater.
+DEFAULT_CONCURRENCY = 4
+
+
+class AsyncUpdater(object):
+    """Updates STIX and CybOX documents without blocking the event loop of
+    an ``asyncio`` application.
+
+    At most `concurrency` documents are updated at once. Further calls wait
+    for a running update to finish, which applies back-pressure to callers
+    that produce documents faster than they can be updated.
+
+    Work is run in `executor` one phase at a time: parsing and each version
+    hop of an update, and serialization with :meth:`as_bytes`. If an update
+    is cancelled, the phase which is running completes, but no further
+    phases are started.
+
+    Args:
+        concurrency (optional): The maximum number of documents updated at
+            once.
+        executor (optional): A ``concurrent.futures.Executor`` which runs the
+            update phases. If ``None``, a ``ThreadPoolExecutor`` with
+            `concurrency` threads is created. Process executors cannot be
+            used, since lxml trees cannot be pickled.
+
+    Note:
+        This class requires Python 3.6 or later.
+
+    """
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, executor=None):
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(concurrency)
+
+        self.concurrency = concurrency
+        self.executor = executor
+        self._semaphores = weakref.WeakKeyDictionary()  # loop => semaphore
+
+    async def _run(self, func, *args, **kwargs):
+        """Runs `func` in the executor and returns its result."""
+        loop = asyncio.get_event_loop()
+        call = functools.partial(func, *args, **kwargs)
+        return await loop.run_in_executor(self.executor, call)
+
+    def _get_semaphore(self):
+        """Returns the semaphore which limits the updates running in the
+        current event loop.
+
+        """
+        loop = asyncio.get_event_loop()
+        semaphore = self._semaphores.get(loop)
+
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            self._semaphores[loop] = semaphore
+
+        return semaphore
+
+    async def update(self, doc, from_=None, to_=None, options=None,
+                     force=False, inplace=False):
+        """Updates a STIX or CybOX document.
+
+        See :meth:`ramrod.update` for a description of the arguments and
+        errors.
+
+        Returns:
+            An instance of :class:`ramrod.UpdateResults`.
+
+        """
+        options = options or DEFAULT_UPDATE_OPTIONS
+
+        async with self._get_semaphore():
+            root, _ = await self._run(
+                utils.get_owned_root, doc, make_copy=not inplace
+            )
+
+            package = ramrod.get_package(root)
+            from_ = from_ or package.get_version(root)
+            plan = package.get_plan(from_, to_)
+            steps = plan.iter_update(root, options, force, inplace=True)
+
+            result = None
+
+            while result is None:
+                result = await self._run(next, steps)
+
+            return result
+
+    async def check_update(self, doc, from_=None, to_=None, options=None):
+        """Checks that a STIX or CybOX document can be updated without
+        forcing the update.
+
+        The document is updated without being modified and the update is
+        discarded, since the later hops of an update can only be checked
+        against the output of the earlier hops.
+
+        Raises:
+            .UpdateError: If an untranslatable field or non-unique ID is
+                found in `doc`.
+            .InvalidVersionError: If the version of `doc` is invalid.
+            .UnknownVersionError: If `from_` was not specified and `doc`
+                does not contain a version attribute.
+
+        """
+        await self.update(doc, from_, to_, options, force=False)
+
+    async def as_bytes(self, document, pretty=False, encoding='utf-8',
+                       xml_declaration=True):
+        """Serializes `document`, a :class:`ramrod.ResultDocument`.
+
+        See :meth:`ramrod.ResultDocument.as_bytes`.
+
+        """
+        return await self._run(
+            document.as_bytes,
+            pretty=pretty,
+            encoding=encoding,
+            xml_declaration=xml_declaration
+        )
+
+    async def _update_or_error(self, doc, *args):
+        try:
+            return await self.update(doc, *args)
+        except errors.DOCUMENT_ERRORS as ex:
+            return ex
+
+    async def update_many(self, docs, from_=None, to_=None, options=None,
+                          force=False, inplace=False):
+        """Updates each document in `docs`. This is an asynchronous
+        generator which yields ``(doc, result)`` tuples in the order of
+        `docs`, as :meth:`ramrod.update_many` does.
+
+        Up to `concurrency` documents are updated ahead of the document
+        being yielded. Updates which have not been yielded are cancelled if
+        the generator is closed.
+
+        """
+        args = (from_, to_, options, force, inplace)
+        pending = collections.deque()
+
+        try:
+            for doc in docs:
+                update = self._update_or_error(doc, *args)
+                pending.append((doc, asyncio.ensure_future(update)))
+
+                if len(pending) < self.concurrency:
+                    continue
+
+                doc, task = pending.popleft()
+                yield doc, await task
+
+            while pending:
+                doc, task = pending.popleft()
+                yield doc, await task
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+
+# The AsyncUpdater used by the module-level functions.
+_default = None
+
+
+def _get_default():
+    global _default
+
+    if _default is None:
+        _default = AsyncUpdater()
+
+    return _default
+
+
+async def update(doc, from_=None, to_=None, options=None, force=False,
+                 inplace=False):
+    """Updates a STIX or CybOX document with the default
+    :class:`AsyncUpdater`. See :meth:`AsyncUpdater.update`.
+
+    """
+    updater = _get_default()
+    return await updater.update(doc, from_, to_, options, force, inplace)
+
+
+async def check_update(doc, from_=None, to_=None, options=None):
+    """Checks that a STIX or CybOX document can be updated with the default
+    :class:`AsyncUpdater`. See :meth:`AsyncUpdater.check_update`.
+
+    """
+    updater = _get_default()
+    await updater.check_update(doc, from_, to_, options)
+
+
+async def update_many(docs, from_=None, to_=None, options=None, force=False,
+                      inplace=False):
+    """Updates each document in `docs` with the default
+    :class:`AsyncUpdater`. See :meth:`AsyncUpdater.update_many`.
+
+    """
+    updater = _get_default()
+    updated = updater.update_many(docs, from_, to_, options, force, inplace)
+
+    async for doc, result in updated:
+        yield doc, result
+
+
+__all__ = [
+    'AsyncUpdater',
+    'DEFAULT_CONCURRENCY',
+    'check_update',
+    'update',
+    'update_many'
+]
@@ -0,0 +1,155 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+
+class HopReport(object):
+    """Describes what one version hop of an update would do to a document.
+
+    Rule counts are dictionaries of rule class names to the number of nodes
+    each rule matched. Rules which match nothing are omitted.
+
+    Attributes:
+        from_: The version the hop updates from.
+        to_: The version the hop updates to.
+        nodes: The number of elements in the document.
+        version_error: The message of the :class:`.UnknownVersionError` or
+            :class:`.InvalidVersionError` the hop would raise, or ``None``.
+        disallowed: Counts of untranslatable fields, which are removed if an
+            update is forced.
+        removed_nodes: The number of elements in the untranslatable fields,
+            including their descendants.
+        duplicates: A dictionary of non-unique IDs to the number of nodes
+            which carry them. These are remapped if an update is forced.
+        translatable: Counts of fields which are translated.
+        optional_elements: Counts of empty elements which are removed.
+        optional_attributes: Counts of elements with empty attributes which
+            are removed.
+        vocabs: Counts of controlled vocabulary instances which are updated.
+        passes: The number of traversals of the document made by the hop:
+            one for namespace and version updates and one for each kind of
+            rule the hop applies.
+
+    """
+    def __init__(self, from_, to_, nodes):
+        self.from_ = from_
+        self.to_ = to_
+        self.nodes = nodes
+        self.version_error = None
+        self.disallowed = {}
+        self.removed_nodes = 0
+        self.duplicates = {}
+        self.translatable = {}
+        self.optional_elements = {}
+        self.optional_attributes = {}
+        self.vocabs = {}
+        self.passes = 1
+
+    @property
+    def hits(self):
+        """The number of nodes matched by every rule of the hop."""
+        counts = (
+            self.disallowed,
+            self.translatable,
+            self.optional_elements,
+            self.optional_attributes,
+            self.vocabs
+        )
+
+        return sum(sum(x.values()) for x in counts)
+
+    @property
+    def cost(self):
+        """A unitless estimate of the work done by the hop: the number of
+        elements visited by its traversals of the document, plus the number
+        of nodes its rules match. This is meant for ranking documents by the
+        work their updates need, not for predicting how long they take.
+
+        """
+        return self.nodes * self.passes + self.hits
+
+    @property
+    def updatable(self):
+        """``True`` if the hop can run without forcing the update."""
+        return not (self.version_error or self.disallowed or self.duplicates)
+
+    def as_dict(self):
+        """Returns the report as a dictionary of JSON-serializable values."""
+        return {
+            'from': self.from_,
+            'to': self.to_,
+            'version_error': self.version_error,
+            'disallowed': dict(self.disallowed),
+            'removed_nodes': self.removed_nodes,
+            'duplicates': dict(self.duplicates),
+            'translatable': dict(self.translatable),
+            'optional_elements': dict(self.optional_elements),
+            'optional_attributes': dict(self.optional_attributes),
+            'vocabs': dict(self.vocabs),
+            'hits': self.hits,
+            'passes': self.passes,
+            'cost': self.cost
+        }
+
+
+class AnalysisReport(object):
+    """Describes what updating a document would do. Returned from
+    :meth:`ramrod.analyze`.
+
+    Note:
+        Every hop is analyzed against the input document, since the document
+        is not updated. Content introduced or renamed by an earlier hop is
+        not seen by the later hops, so their counts are estimates.
+
+    Attributes:
+        from_: The version the document would be updated from.
+        to_: The version the document would be updated to.
+        nodes: The number of elements in the document.
+        hops: A list of :class:`HopReport` instances, one for each version
+            hop of the update.
+        family: The language of the document, ``'stix'`` or ``'cybox'``, if
+            it is known.
+
+    """
+    def __init__(self, from_, to_, nodes, hops=None, family=None):
+        self.from_ = from_
+        self.to_ = to_
+        self.nodes = nodes
+        self.hops = hops or []
+        self.family = family
+
+    @property
+    def cost(self):
+        """The estimated cost of every hop."""
+        return sum(x.cost for x in self.hops)
+
+    @property
+    def updatable(self):
+        """``True`` if the document can be updated without forcing the
+        update.
+
+        """
+        return all(x.updatable for x in self.hops)
+
+    @property
+    def loses_content(self):
+        """``True`` if a forced update would remove untranslatable fields."""
+        return any(x.disallowed for x in self.hops)
+
+    def as_dict(self):
+        """Returns the report as a dictionary of JSON-serializable values."""
+        return {
+            'family': self.family,
+            'from': self.from_,
+            'to': self.to_,
+            'nodes': self.nodes,
+            'cost': self.cost,
+            'updatable': self.updatable,
+            'loses_content': self.loses_content,
+            'hops': [x.as_dict() for x in self.hops]
+        }
+
+
+__all__ = [
+    'AnalysisReport',
+    'HopReport'
+]
@@ -2,14 +2,15 @@
 # See LICENSE.txt for complete terms.
 
 # builtin
-import collections
+import itertools
 
 # external
 from lxml import etree
 from six import iteritems
 
 # relative
-from . import errors, utils, xmlconst, results
+from . import analysis, engine, errors, utils, xmlconst, results
+from .index import DocumentIndex
 from .options import DEFAULT_UPDATE_OPTIONS
 
 
@@ -18,6 +19,69 @@ TAG_VOCAB_REFERENCE = "vocab_reference"
 TAG_VOCAB_NAME = 'vocab_name'
 
 
+def get_xpath(owner, attr):
+    """Returns a :class:`ramrod.utils.CompiledXPath` for the xpath expression
+    found in the `attr` attribute of `owner`, evaluated against the
+    ``NSMAP`` attribute of `owner`.
+
+    The compiled expression is cached on `owner` and is only recompiled if
+    the xpath or ``NSMAP`` attribute values are replaced.
+
+    Args:
+        owner: A rule class (e.g., a ``DisallowedFields`` implementation) or
+            updater instance.
+        attr: The name of the xpath attribute (e.g., ``'XPATH'``).
+
+    """
+    path, nsmap = getattr(owner, attr), owner.NSMAP
+    cache_attr = "_compiled_%s" % attr
+    cached = getattr(owner, cache_attr, None)
+
+    if cached is None or cached[0] is not path or cached[1] is not nsmap:
+        cached = (path, nsmap, utils.compile_xpath(path, nsmap))
+        setattr(owner, cache_attr, cached)
+
+    return cached[2]
+
+
+def get_template(owner):
+    """Returns a :class:`ramrod.utils.ElementTemplate` for the ``TEMPLATE``
+    and ``TEMPLATE_TARGET`` attributes of `owner`.
+
+    The template is cached on `owner` and is only rebuilt if either attribute
+    value is replaced.
+
+    Args:
+        owner: A ``TranslatableField`` implementation.
+
+    """
+    xml, target = owner.TEMPLATE, owner.TEMPLATE_TARGET
+    cached = getattr(owner, "_compiled_TEMPLATE", None)
+
+    if cached is None or cached[0] is not xml or cached[1] is not target:
+        cached = (xml, target, utils.ElementTemplate(xml, target))
+        owner._compiled_TEMPLATE = cached
+
+    return cached[2]
+
+
+def get_engine(owners, attr):
+    """Returns a :class:`ramrod.engine.RuleEngine` which evaluates the `attr`
+    xpath of every object in `owners` with a single document traversal.
+
+    Args:
+        owners: A tuple of rule classes or updater instances. The
+            ``CTX_TYPES`` attribute of each owner is used if present.
+        attr: The name of the xpath attribute (e.g., ``'XPATH'``).
+
+    """
+    selectors = tuple(
+        (get_xpath(x, attr), getattr(x, 'CTX_TYPES', None)) for x in owners
+    )
+
+    return engine.get_engine(selectors)
+
+
 class Vocab(object):
     """Controlled Vocabulary update class. This is used on conjunction with a
     dictionary which maps found controlled vocabulary instance names to _Vocab
@@ -43,22 +107,38 @@ class Vocab(object):
     TERMS = {}
 
     @classmethod
-    def find(cls, root, typed=None):
+    def find(cls, root, typed=None, index=None):
         """Finds and returns a list of nodes that are instances of old
         controlled vocabularies.
 
+        Args:
+            root: The top-level xml node.
+            typed (optional): xsi:typed nodes to search through.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for
+                `root`. If provided and `typed` is ``None``, only nodes typed
+                as one of the `OLD_TYPES` are searched.
+
         """
+        if typed is None and index is not None:
+            typed = []
+
+            for typename in cls.OLD_TYPES:
+                typed.extend(index.typed(typename))
+
+            typed = index.sort(typed)
+
         if typed is None:
             typed = utils.get_typed_nodes(root)
 
+        resolver = utils.NamespaceResolver()
+
         found = []
         for node in typed:
             _, typename = utils.get_type_info(node)
-            ext_ns = utils.get_ext_namespace(node)
 
-            if ext_ns != cls.VOCAB_NAMESPACE:
+            if typename not in cls.OLD_TYPES:
                 continue
-            elif typename not in cls.OLD_TYPES:
+            elif utils.get_ext_namespace(node, resolver) != cls.VOCAB_NAMESPACE:
                 continue
             else:
                 found.append(node)
@@ -66,7 +146,41 @@ class Vocab(object):
         return found
 
     @classmethod
-    def update(cls, root, typed=None):
+    def _update_node(cls, node, alias, index=None):
+        """Updates the controlled vocabulary instance `node`, whose
+        ``xsi:type`` attribute uses the `alias` namespace alias.
+
+        """
+        attribs    = node.attrib
+        terms      = cls.TERMS
+        new_type   = cls.NEW_TYPE
+        vocab_ref  = cls.VOCAB_REFERENCE
+        vocab_name = cls.VOCAB_NAME
+
+        # Update the xsi:type attribute to identify the new
+        # controlled vocabulary
+        new_xsi_type = "%s:%s" % (alias, new_type)
+        attribs[xmlconst.TAG_XSI_TYPE] = new_xsi_type
+
+        # Update the vocab_reference attribute if present
+        if TAG_VOCAB_REFERENCE in attribs:
+            attribs[TAG_VOCAB_REFERENCE] = vocab_ref
+
+        # Update the vocab_name attribute if present
+        if TAG_VOCAB_NAME in attribs:
+            attribs[TAG_VOCAB_NAME] = vocab_name
+
+        # Update the node value if there is a new value in the updated
+        # controlled vocabulary
+        value = node.text
+        if value in terms:
+            node.text = terms[value]
+
+        if index is not None:
+            index.update(node)
+
+    @classmethod
+    def update(cls, root, typed=None, index=None):
         """Updates controlled vocabularies found under the `root` document.
 
         This performs the following updates:
@@ -76,38 +190,11 @@ class Vocab(object):
         * Updates ``vocab_reference`` attribute value if present.
 
         """
-        if typed is None:
-            typed = utils.get_typed_nodes(root)
-
-        vocabs = cls.find(root, typed)
+        vocabs = cls.find(root, typed, index)
 
         for node in vocabs:
             alias, _ = utils.get_type_info(node)
-
-            attribs    = node.attrib
-            terms      = cls.TERMS
-            new_type   = cls.NEW_TYPE
-            vocab_ref  = cls.VOCAB_REFERENCE
-            vocab_name = cls.VOCAB_NAME
-
-            # Update the xsi:type attribute to identify the new
-            # controlled vocabulary
-            new_xsi_type = "%s:%s" % (alias, new_type)
-            attribs[xmlconst.TAG_XSI_TYPE] = new_xsi_type
-
-            # Update the vocab_reference attribute if present
-            if TAG_VOCAB_REFERENCE in attribs:
-                attribs[TAG_VOCAB_REFERENCE] = vocab_ref
-
-            # Update the vocab_name attribute if present
-            if TAG_VOCAB_NAME in attribs:
-                attribs[TAG_VOCAB_NAME] = vocab_name
-
-            # Update the node value if there is a new value in the updated
-            # controlled vocabulary
-            value = node.text
-            if value in terms:
-                node.text = terms[value]
+            cls._update_node(node, alias, index)
 
 
 class TranslatableField(object):
@@ -132,6 +219,11 @@ class TranslatableField(object):
         OVERRIDE_ATTRIBUTES (dict): A dictionary of attribute names => value to
             override during the translation. This will only update existing
             attributes--not add them.
+        TEMPLATE: The XML of the translated field, if it is a structure
+            rather than a single element. It is parsed once and copied for
+            each translated field. Overrides `NEW_TAG`.
+        TEMPLATE_TARGET: An xpath which locates the element within
+            `TEMPLATE` which receives the translated value and attributes.
 
     """
     NSMAP = None
@@ -140,12 +232,35 @@ class TranslatableField(object):
     NEW_TAG = None
     COPY_ATTRIBUTES = False
     OVERRIDE_ATTRIBUTES = {}
+    TEMPLATE = None
+    TEMPLATE_TARGET = '.'
+
+    @classmethod
+    def _compile_xpaths(cls):
+        """Compiles the `XPATH_NODE` and `XPATH_VALUE` xpaths against the
+        current `NSMAP`.
+
+        """
+        get_xpath(cls, 'XPATH_NODE')
+
+        if cls.XPATH_VALUE:
+            get_xpath(cls, 'XPATH_VALUE')
+
+        if cls.TEMPLATE:
+            get_template(cls)
+
+    @classmethod
+    def _get_value_node(cls, old):
+        """Returns the node discovered by applying `XPATH_VALUE` to `old`."""
+        if cls.XPATH_VALUE == '.':
+            return old
+
+        return get_xpath(cls, 'XPATH_VALUE')(old)[0]
 
     @classmethod
     def _translate_value(cls, old, new):
-        xpath, nsmap = cls.XPATH_VALUE, cls.NSMAP
-        if xpath:
-            value = old.xpath(xpath, namespaces=nsmap)[0]
+        if cls.XPATH_VALUE:
+            value = cls._get_value_node(old)
             new.text = value.text
         else:
             # Used when the fields are the same data type, just different names
@@ -162,10 +277,8 @@ class TranslatableField(object):
         `OVERRIDE_ATTRIBUTES`.
 
         """
-        xpath, nsmap = cls.XPATH_VALUE, cls.NSMAP
-
-        if xpath:
-            source = old.xpath(xpath, namespaces=nsmap)[0]
+        if cls.XPATH_VALUE:
+            source = cls._get_value_node(old)
         else:
             source = old
 
@@ -180,16 +293,18 @@ class TranslatableField(object):
     @classmethod
     def _translate_fields(cls, node):
         """Translates values and attributes from `node` to a new XML
-        element.
+        element, or to a copy of `TEMPLATE` if it is defined.
 
         Returns:
             A translated ``etree._Element``.
         """
-        tag = cls.NEW_TAG or node.tag
-        new = etree.Element(tag)
+        if cls.TEMPLATE:
+            new, target = get_template(cls).build()
+        else:
+            new = target = etree.Element(cls.NEW_TAG or node.tag)
 
-        cls._translate_value(node, new)
-        cls._translate_attributes(node, new)
+        cls._translate_value(node, target)
+        cls._translate_attributes(node, target)
 
         return new
 
@@ -201,18 +316,37 @@ class TranslatableField(object):
             A list of nodes discovered via the `XPATH_NODE` xpath.
 
         """
-        return root.xpath(cls.XPATH_NODE, namespaces=cls.NSMAP)
+        return get_xpath(cls, 'XPATH_NODE')(root)
 
     @classmethod
-    def translate(cls, root):
+    def translate(cls, root, nodes=None, index=None):
         """Translates and replaces nodes found in `root` with new nodes.
 
+        Args:
+            root: The top-level xml node.
+            nodes (optional): The nodes to translate. If ``None``, nodes are
+                discovered via the `XPATH_NODE` xpath.
+            index (optional): A :class:`ramrod.index.DocumentIndex` to update
+                with the replaced nodes.
+
+        Returns:
+            A list of the nodes which were inserted into `root`.
+
         """
-        nodes = cls._find(root)
+        if nodes is None:
+            nodes = cls._find(root)
+
+        inserted = []
 
         for node in nodes:
             new_node = cls._translate_fields(node)
             utils.replace_xml_element(node, new_node)
+            inserted.append(new_node)
+
+            if index is not None:
+                index.replace(node, new_node)
+
+        return inserted
 
 
 class RenamedField(TranslatableField):
@@ -224,12 +358,18 @@ class RenamedField(TranslatableField):
 
     """
     @classmethod
-    def translate(cls, root):
-        nodes = cls._find(root)
+    def translate(cls, root, nodes=None, index=None):
+        if nodes is None:
+            nodes = cls._find(root)
 
         for node in nodes:
             node.tag = cls.NEW_TAG
 
+            if index is not None:
+                index.rename(node)
+
+        return list(nodes)
+
 
 class DisallowedFields(object):
     """Helper class used to discover untranslatable fields within an XML
@@ -253,6 +393,11 @@ class DisallowedFields(object):
     def __init__(self,):
         pass
 
+    @classmethod
+    def _compile_xpaths(cls):
+        """Compiles the `XPATH` xpath against the current `NSMAP`."""
+        get_xpath(cls, 'XPATH')
+
     @classmethod
     def _interrogate(cls, nodes):
         """Overriden by implemmentation classes if a set of requirments must
@@ -299,10 +444,12 @@ class DisallowedFields(object):
         if typed is None:
             typed = utils.get_typed_nodes(root)
 
+        resolver = utils.NamespaceResolver()
+
         contexts = []
         for node in typed:
             type_ = utils.get_type_info(node)[1]
-            ns = utils.get_ext_namespace(node)
+            ns = utils.get_ext_namespace(node, resolver)
 
             if ctx.get(type_) == ns:
                 contexts.append(node)
@@ -318,11 +465,11 @@ class DisallowedFields(object):
 
         """
         contexts = cls._get_contexts(root, typed)
-        xpath, nsmap = cls.XPATH, cls.NSMAP
+        xpath = get_xpath(cls, 'XPATH')
 
         found = []
         for ctx in contexts:
-            nodes = ctx.xpath(xpath, namespaces=nsmap)
+            nodes = xpath(ctx)
             interrogated = cls._interrogate(nodes)
             found.extend(interrogated)
 
@@ -390,17 +537,23 @@ class OptionalElements(DisallowedFields):
         super(OptionalElements, self).__init__()
 
     @classmethod
-    def _is_empty(cls, node):
+    def _is_empty(cls, node, content=None):
         """Returns ``False`` if `node` or any of its descendants contain
         attributes or text values.
 
+        Args:
+            node: The node to inspect.
+            content (optional): A :class:`ramrod.utils.ContentMap` which
+                caches the content of the document between calls.
+
         """
-        nodes = node.iter('*')
-        content = any(x.attrib or utils.strip_whitespace(x.text) for x in nodes)
-        return content is False
+        if content is None:
+            content = utils.ContentMap()
+
+        return not content.has_content(node)
 
     @classmethod
-    def _interrogate(cls, nodes):
+    def _interrogate(cls, nodes, content=None):
         """Checks if any of the nodes in `nodes` are empty.
 
         Note:
@@ -408,11 +561,19 @@ class OptionalElements(DisallowedFields):
             value, and no children with content (attribs or text content).
             These criterion may be overridden by implementations of this class.
 
+        Args:
+            nodes: The nodes to inspect.
+            content (optional): A :class:`ramrod.utils.ContentMap` shared by
+                the ``OptionalElements`` rules of an update pass.
+
         Returns:
             A list of nodes that are empty.
 
         """
-        return [x for x in nodes if cls._is_empty(x)]
+        if content is None:
+            content = utils.ContentMap()
+
+        return [x for x in nodes if cls._is_empty(x, content)]
 
 
 class BaseUpdater(object):
@@ -451,12 +612,16 @@ class BaseUpdater(object):
             instances.
         TRANSLATABLE_FIELDS: An iterable collection of TranslatableField
             instances.
-        cleaned_fields: A tuple of untranslatable nodes which were removed
-            during a forced `update` or `clean` process.
-        cleaned_ids: A dictionary of id => [nodes] which contains a list of
-            nodes which have had their originally non-unique ids remapped to
-            unique ids. This is only populated in a forced `update` or
-            `clean` process.
+        CHECK_UNIQUE_IDS: ``True`` if the document is checked for non-unique
+            IDs, which are remapped if the update is forced. Updaters set
+            this to ``False`` when the schemas of the versions they update
+            between both enforce ID uniqueness, or when the version they
+            update to does not enforce it.
+
+    Note:
+        Updaters hold no per-document state and are not modified once they
+        are constructed, so a single instance can update documents in any
+        number of threads at once. See :meth:`ramrod.get_updater`.
 
     """
     # OVERRIDE THESE IN IMPLEMENTATIONS
@@ -478,6 +643,70 @@ class BaseUpdater(object):
     OPTIONAL_ATTRIBUTES = ()
     TRANSLATABLE_FIELDS = ()
 
+    CHECK_UNIQUE_IDS = True
+
+    # Set by _defer_schemalocs()
+    _schemalocs_deferred = False
+
+    @classmethod
+    def _compile_xpaths(cls):
+        """Compiles the updater xpaths (e.g., `XPATH_VERSIONED_NODES`) and the
+        xpaths of every rule class against their `NSMAP` values.
+
+        This is called when an updater class is registered. The
+        `UPDATE_VOCABS` dispatch table is built here as well.
+
+        """
+        get_xpath(cls, 'XPATH_VERSIONED_NODES')
+        get_xpath(cls, 'XPATH_ROOT_NODES')
+        cls._get_vocab_table()
+
+        rules = itertools.chain(
+            cls.DISALLOWED,
+            cls.OPTIONAL_ELEMENTS,
+            cls.OPTIONAL_ATTRIBUTES,
+            cls.TRANSLATABLE_FIELDS,
+        )
+
+        for klass in rules:
+            klass._compile_xpaths()  # noqa
+
+    @classmethod
+    def _get_vocab_table(cls):
+        """Returns a ``{(namespace, typename): vocab}`` dictionary which maps
+        each old controlled vocabulary type in `UPDATE_VOCABS` to the
+        ``Vocab`` class which updates it.
+
+        If more than one vocabulary declares a type, the first one in
+        `UPDATE_VOCABS` is used. The table is cached on the class.
+
+        """
+        table = cls.__dict__.get('_vocab_table')
+
+        if table is not None:
+            return table
+
+        table = {}
+
+        for vocab in cls.UPDATE_VOCABS:
+            for typename in vocab.OLD_TYPES:
+                table.setdefault((vocab.VOCAB_NAMESPACE, typename), vocab)
+
+        cls._vocab_table = table
+        return table
+
+    def _compile_selectors(self):
+        """Compiles the `XPATH_VERSIONED_NODES` and `XPATH_ROOT_NODES` xpaths
+        of this instance against its `NSMAP`.
+
+        Instances which replace these attributes must call this before they
+        are shared, since compiled xpaths are otherwise cached on the
+        instance when they are first used.
+
+        """
+        get_xpath(self, 'XPATH_VERSIONED_NODES')
+        get_xpath(self, 'XPATH_ROOT_NODES')
+
     def _is_leaf(self, node):
         """Returns ``True`` if the `node` has no children."""
         return len(node.xpath(xmlconst.XPATH_RELATIVE_CHILDREN)) == 0
@@ -498,33 +727,39 @@ class BaseUpdater(object):
         """
         return root.nsmap.get(ns)
 
-    def _get_duplicates(self, root):
+    def _get_duplicates(self, root, index=None):
         """This checks `root` for nodes with duplicate IDs.
 
+        Args:
+            root: The top-level xml node.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for
+                `root`. If ``None``, a new index is built.
+
         Returns:
             A dictionary where the ID is the key and the values are lists of
-            lxml._Element nodes.
+            lxml._Element nodes. The dictionary is empty if
+            ``CHECK_UNIQUE_IDS`` is ``False``.
 
         """
-        namespaces = self.NSMAP.values()
-        id_nodes = collections.defaultdict(list)
+        if not self.CHECK_UNIQUE_IDS:
+            return {}
 
-        for desc in utils.iterdescendants(root):
-            if 'id' not in desc.attrib:
-                continue
+        if index is None or index.root is not root:
+            index = DocumentIndex(root)
 
-            ns = utils.get_namespace(desc)
+        namespaces = self.NSMAP.values()
+        duplicates = {}
 
-            if ns not in namespaces:
-                continue
+        for id_, nodes in iteritems(index.ids()):
+            nodes = [x for x in nodes if utils.get_namespace(x) in namespaces]
 
-            id_ = desc.attrib['id']
-            id_nodes[id_].append(desc)
+            if len(nodes) > 1:
+                duplicates[nodes[0]] = nodes
 
+        # Order the duplicates by the position of their first node.
         filtered = {}
-        for id_, nodes in iteritems(id_nodes):
-            if len(nodes) > 1:
-                filtered[id_] = nodes
+        for node in index.sort(duplicates):
+            filtered[node.attrib['id']] = duplicates[node]
 
         return filtered
 
@@ -540,9 +775,7 @@ class BaseUpdater(object):
             `XPATH_VERSIONED_NODES` xpath.
 
         """
-        xpath = self.XPATH_VERSIONED_NODES
-        namespaces = self.NSMAP
-        return root.xpath(xpath, namespaces=namespaces)
+        return get_engine((self,), 'XPATH_VERSIONED_NODES').select(root)[0]
 
     def _get_root_nodes(self, root):
         """Discovers all versioned nodes under `root` defined by the class-level
@@ -557,9 +790,7 @@ class BaseUpdater(object):
             `XPATH_ROOT_NODES` xpath.
 
         """
-        xpath = self.XPATH_ROOT_NODES
-        namespaces = self.NSMAP
-        return root.xpath(xpath, namespaces=namespaces)
+        return get_engine((self,), 'XPATH_ROOT_NODES').select(root)[0]
 
     def _check_version(self, root):
         """Checks that the version of the document matches the expected
@@ -575,7 +806,118 @@ class BaseUpdater(object):
         """
         raise NotImplementedError()
 
-    def _update_vocabs(self, root):
+    def _find_disallowed(self, root, rules=None, index=None):
+        """Finds all xml entities under `root` which are discovered by the
+        ``DisallowedFields`` classes in `rules`.
+
+        All rules are evaluated with a single traversal of `root`.
+
+        Args:
+            root: The top-level xml node.
+            rules (optional): A tuple of ``DisallowedFields`` classes. If
+                ``None``, the `DISALLOWED` class-level attribute is used.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for
+                `root`.
+
+        Returns:
+            A list of untranslatable items.
+
+        """
+        if rules is None:
+            rules = tuple(self.DISALLOWED)
+
+        found = get_engine(rules, 'XPATH').select(root, index=index)
+        disallowed = []
+
+        for klass, nodes in zip(rules, found):
+            disallowed.extend(klass._interrogate(nodes))  # noqa
+
+        return disallowed
+
+    def _translate_fields(self, root, index=None):
+        """Translates fields which have changed in structure or data type.
+
+        Every class in `TRANSLATABLE_FIELDS` is evaluated with a single
+        traversal of `root`. Fields are translated in the order they are
+        declared; nodes inserted or renamed by one translation are checked
+        against the remaining fields.
+
+        Args:
+            root: The top-level xml node.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for
+                `root`.
+
+        """
+        fields = tuple(self.TRANSLATABLE_FIELDS)
+        rules = get_engine(fields, 'XPATH_NODE')
+        found = rules.select(root, index=index)
+        changed = []
+
+        for idx, field in enumerate(fields):
+            nodes = found[idx]
+
+            if changed:
+                added = rules.select(root, subtrees=changed)[idx]
+                nodes = rules.verify(idx, nodes + added, root)
+
+            if nodes:
+                changed.extend(field.translate(root, nodes, index=index))
+
+    def _update_optionals(self, root, index=None):
+        """Finds and removes empty xml elements and attributes which are
+        optional in the next language release.
+
+        Every class in `OPTIONAL_ELEMENTS` and `OPTIONAL_ATTRIBUTES` is
+        evaluated with a single traversal of `root`, and the content of each
+        element is inspected at most once.
+
+        Args:
+            root: The top-level xml node.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for
+                `root`.
+
+        """
+        elements = tuple(self.OPTIONAL_ELEMENTS)
+        optionals = elements + tuple(self.OPTIONAL_ATTRIBUTES)
+        rules = get_engine(optionals, 'XPATH')
+        found = rules.select(root, index=index)
+        modified = False
+
+        # Element emptiness is cached across the OptionalElements rules. The
+        # elements they remove have no content, so removing them does not
+        # change the cached results. Attributes are removed after every
+        # element rule has run.
+        content = utils.ContentMap()
+
+        for idx, optional in enumerate(optionals):
+            nodes = found[idx]
+
+            if modified:
+                nodes = rules.verify(idx, nodes, root, index=index)
+
+            if idx < len(elements):
+                nodes = optional._interrogate(nodes, content)  # noqa
+            else:
+                nodes = optional._interrogate(nodes)  # noqa
+
+            if not nodes:
+                continue
+
+            modified = True
+
+            if idx < len(elements):
+                utils.remove_xml_elements(nodes)
+
+                if index is not None:
+                    for node in nodes:
+                        index.remove(node)
+
+                continue
+
+            for node in nodes:
+                utils.remove_xml_attributes(node, optional.ATTRIBUTES)
+
+    def _update_vocabs(self, root, index=None):
         """Updates controlled vocabularies found under the `root` document.
 
         This performs the following updates:
@@ -585,14 +927,69 @@ class BaseUpdater(object):
         * Updates ``vocab_reference`` attribute value if present.
 
         Vocabulary updates are dictated by the `UPDATE_VOCABS` class-level
-        attribute.
+        attribute. Typed nodes are inspected once and dispatched to their
+        vocabulary through the table returned by :meth:`_get_vocab_table`.
+
+        Args:
+            root: The top-level xml node.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for
+                `root`. If provided, only nodes which are typed as one of the
+                old vocabulary types are inspected.
 
         """
+        if index is not None and index.root is not root:
+            index = None
+
+        for node, alias, vocab in self._find_vocabs(root, index=index):
+            vocab._update_node(node, alias, index)  # noqa
+
+    def _find_vocabs(self, root, index=None):
+        """Finds the controlled vocabulary instances under `root` which are
+        updated by :meth:`_update_vocabs`.
+
+        Args:
+            root: The top-level xml node.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for
+                `root`.
+
+        Returns:
+            A list of ``(node, alias, vocab)`` tuples in document order, where
+            `alias` is the namespace alias of the ``xsi:type`` of `node` and
+            `vocab` is the ``Vocab`` class which updates it.
+
+        """
+        table = self._get_vocab_table()
+
+        if not table:
+            return []
 
-        typed_nodes = utils.get_typed_nodes(root)
+        typenames = set(x for _, x in table)
 
-        for vocab in self.UPDATE_VOCABS:
-            vocab.update(root, typed=typed_nodes)
+        if index is not None and index.root is root:
+            typed = []
+
+            for typename in typenames:
+                typed.extend(index.typed(typename))
+
+            typed = index.sort(typed)
+        else:
+            typed = utils.get_typed_nodes(root)
+
+        resolver = utils.NamespaceResolver()
+        found = []
+
+        for node in typed:
+            alias, typename = utils.get_type_info(node)
+
+            if typename not in typenames:
+                continue
+
+            vocab = table.get((resolver.resolve(node, alias), typename))
+
+            if vocab is not None:
+                found.append((node, alias, vocab))
+
+        return found
 
     def _remove_schemalocations(self, root):
         """Removes the ``xsi:schemaLocation`` attribute from `root`."""
@@ -654,10 +1051,17 @@ class BaseUpdater(object):
         The new schemalocations are defined by the ``UPDATE_SCHEMALOC_MAP``
         class-level attribute.
 
+        Note:
+            This does nothing if schemalocation updates have been deferred via
+            ``_defer_schemalocs()``.
+
         Args:
             root (lxml.etree._Element): The top-level xml node.
 
         """
+        if self._schemalocs_deferred:
+            return
+
         if xmlconst.TAG_SCHEMALOCATION not in root.attrib:
             return
 
@@ -668,21 +1072,44 @@ class BaseUpdater(object):
 
         root.attrib[xmlconst.TAG_SCHEMALOCATION] = updated
 
+    def _defer_schemalocs(self):
+        """Disables ``xsi:schemaLocation`` updates for this updater instance.
+
+        This is used by :class:`ramrod.plan.UpdatePlan`, which applies the
+        composed schemalocation updates of every hop once at the end of the
+        update process.
+
+        """
+        self._schemalocs_deferred = True
+
     def _apply_namespace_updates(self, root):
-        """Updates the children of `root` to be defined under their updated
+        """Updates the descendants of `root` to be defined under their updated
         namespace.
 
         This uses the `UPDATE_NS_MAP` attribute to look up and assign
-        an updated namespace to a node.
+        an updated namespace to a node. Nodes are renamed in place, so the
+        updated namespaces must already be declared in the scope of `root`.
 
         If this isn't done, the node will retain its old namespace and receive
         a new `ns0` namespace alias.
 
         """
-        for node in utils.iterdescendants(root):
-            node_ns = utils.get_namespace(node)
-            updated_ns = self.UPDATE_NS_MAP.get(node_ns, node_ns)
-            node.tag = node.tag.replace(node_ns, updated_ns)
+        updated = self.UPDATE_NS_MAP
+
+        if not updated:
+            return
+
+        # One traversal renames the nodes of every namespace in the map.
+        for node in root.iterdescendants("*"):
+            tag = node.tag
+
+            if tag[0] != "{":
+                continue
+
+            ns, _, localname = tag[1:].partition("}")
+
+            if ns in updated:
+                node.tag = "{%s}%s" % (updated[ns], localname)
 
     def _remap_namespaces(self, node):
         """Remaps the namespaces found on the input `node` to namespaces
@@ -736,54 +1163,125 @@ class BaseUpdater(object):
         node.tag = self._get_remapped_tag(node)
         return node
 
-    def _update_nsmap(self, node):
-        """Updates the ``nsmap`` attribute found on `node` to `nsmap`.
+    def _update_nsmap(self, node, rename=True):
+        """Replaces `node` with a copy whose ``nsmap`` attribute declares the
+        updated namespaces.
 
         The lxml API does not allow in-place modification of the ``nsmap``
         dictionary. Instead, a copy of the node must be created and initialized
-        with an updated ``nsmap`` attribute.
+        with an updated ``nsmap`` attribute. The children of `node` are moved
+        to the copy. If `node` has no children, its text nodes are moved to the
+        copy instead, which keeps any ``<![CDATA[]]>`` blocks without copying
+        or serializing the text.
 
         Args:
             node (lxml.etree._Element): An XML element
-            nsmap: A ``namspace alias => namespace`` dictionary.
+            rename: If ``True``, the descendants of `node` are renamed to use
+                their updated namespaces before they are moved to the copy.
 
         Returns:
-            A copy of `root` with its ``nsmap`` attribute set to `nsmap`.
+            The copy of `node` which replaced it in the document.
 
         """
         tag = self._get_remapped_tag(node)
         updated_nsmap = self._remap_namespaces(node)
         new  = etree.Element(tag, nsmap=updated_nsmap)
         new.attrib.update(node.attrib)
-        new.text  = utils.get_node_text(node)
-        new[:] = node[:]
+        new.tail = node.tail
+        utils.replace_xml_element(node, new)
+
+        # Rename the descendants while `node` sits under the copy, so the
+        # updated namespaces are found on the copy rather than being declared
+        # again on each renamed element.
+        node.tail = None
+        new.append(node)
+
+        if len(node) == 0:
+            # Stripping `node` splices its text nodes into the copy.
+            etree.strip_tags(new, node.tag)
+            return new
+
+        if rename:
+            self._apply_namespace_updates(node)
+
+        new.extend(node[:])
+        new.remove(node)
 
         return new
 
-    def _update_namespaces(self, node):
+    def _get_declaring_nodes(self, root):
+        """Returns the nodes under and including `root` which declare a
+        namespace found in ``UPDATE_NS_MAP`` or ``DISALLOWED_NAMESPACES``.
+
+        Returns:
+            A list of ``(node, nested)`` tuples in document order, where
+            `nested` is ``True`` if an ancestor of `node` is also found in
+            the list.
+
+        """
+        updated = set(self.UPDATE_NS_MAP)
+        updated.update(self.DISALLOWED_NAMESPACES)
+
+        found, stack, depth, declared = [], [], 0, False
+
+        # The 'start-ns' events for a node precede its 'start' event and only
+        # include the namespaces declared on the node itself.
+        events = ('start', 'end', 'start-ns')
+
+        for event, obj in etree.iterwalk(root, events=events):
+            if event == 'start-ns':
+                declared = declared or obj[1] in updated
+            elif event == 'start':
+                if declared:
+                    found.append((obj, depth > 0))
+                    depth += 1
+
+                stack.append(declared)
+                declared = False
+            elif stack.pop():
+                depth -= 1
+
+        return found
+
+    def _update_namespaces(self, node, index=None):
         """Updates the namespaces in the instance `node` to align with
         with the updated schema. This will also remove any disallowed
         namespaces if found in the instance document.
 
+        Only the nodes which declare an updated or disallowed namespace are
+        replaced. Their descendants are renamed in place.
+
         Note:
             The lxml library does not allow you to modify the ``nsmap``
             attribute of an ``_Element`` directly. To modify the ``nsmap``,
             A copy of `root` must be made with a new initial ``nsmap``.
 
+        Args:
+            node: The xml node to update.
+            index (optional): A :class:`ramrod.index.DocumentIndex` which is
+                invalidated if any nodes are replaced.
+
         Returns:
-            A copy of the `node` with an updated ``nsmap`` attribute. Each
-            of its descendants which belong to known namespaces are updated
-            as well.
+            `node` or its replacement if `node` declared an updated
+            namespace.
+
         """
-        for child in utils.children(node):
-            self._update_namespaces(child)
+        if not self.UPDATE_NS_MAP:
+            return node
 
-        ns = utils.get_namespace(node)
+        declaring = self._get_declaring_nodes(node)
 
-        if ns in self.UPDATE_NS_MAP:
-            new_node = self._update_nsmap(node)
-            utils.replace_xml_element(node, new_node)
-            node = new_node
+        if declaring and index is not None:
+            index.invalidate()
+
+        for declarer, nested in declaring:
+            updated = self._update_nsmap(declarer, rename=not nested)
+
+            if declarer is node:
+                if index is not None:
+                    index.replace(node, updated)
+
+                node = updated
 
         return node
 
@@ -806,7 +1304,7 @@ class BaseUpdater(object):
 
         return update_results
 
-    def _get_disallowed(self, root, options):
+    def _get_disallowed(self, root, options, index=None):
         raise NotImplementedError()
 
     def _clean_disallowed(self, disallowed, options):
@@ -815,14 +1313,24 @@ class BaseUpdater(object):
     def _clean_duplicates(self, duplicates, options):
         raise NotImplementedError()
 
-    def _clean(self, root, options):
+    def _clean(self, root, options, index=None, disallowed=None,
+               duplicates=None):
         """Internal handler for public ``clean()`` method. Orchestrates the
         invocation of sub-cleaning methods (e.g., ``_clean_disallowed()``).
 
+        If `disallowed` or `duplicates` are provided (e.g., from the findings
+        of ``_check_update()``), they are cleaned rather than being searched
+        for again. If `index` is provided, it is invalidated after cleaning.
+
         """
         options = options or DEFAULT_UPDATE_OPTIONS
-        disallowed = self._get_disallowed(root, options=options)
-        duplicates = self._get_duplicates(root)
+
+        if disallowed is None:
+            disallowed = self._get_disallowed(root, options=options, index=index)
+
+        if duplicates is None:
+            duplicates = self._get_duplicates(root, index=index)
+
         remapped, removed = {}, ()
 
         if duplicates:
@@ -831,6 +1339,9 @@ class BaseUpdater(object):
         if disallowed:
             removed = self._clean_disallowed(disallowed, options=options)
 
+        if index is not None:
+            index.invalidate()
+
         result = results.UpdateResults(root)
         result.remapped_ids = remapped
         result.removed = tuple(removed)
@@ -876,34 +1387,208 @@ class BaseUpdater(object):
         results = self._clean(root, options)
         return results
 
-    def check_update(self, root, options=None):
-        """Checks to see if the `root` document can be updated.
+    def _check_update(self, root, options, index=None):
+        """Collects the untranslatable fields and non-unique IDs found in
+        `root` without raising an :class:`.UpdateError`.
+
+        The findings are returned as an :class:`.UpdateError` so that they can
+        either be raised by ``check_update()`` or passed to ``_clean()`` when
+        an update is forced, without searching `root` a second time.
 
         Note:
             This needs to be overidden by an implementation class.
 
+        Returns:
+            An :class:`.UpdateError` describing the untranslatable fields and
+            non-unique IDs found in `root`, or ``None`` if `root` can be
+            updated. An ``UpdateError`` attribute is ``None`` if this updater
+            did not search for that kind of finding.
+
         Raises:
+            .UnknownVersionError: If the input document does not have a
+                version.
+            .InvalidVersionError: If the version of the input document
+                does not match the `VERSION` class-level attribute value.
             NotImplementedError: If this is called directly from _BaseUpdater.
 
         """
         raise NotImplementedError()
 
-    def _force_update(self, root, options):
+    def check_update(self, root, options=None, index=None):
+        """Determines if the input document can be upgraded.
+
+        Args:
+            root: The XML document. This can be a filename, a file-like object,
+                an instance of ``etree._Element`` or an instance of
+                ``etree._ElementTree``.
+            options (optional): A ``ramrod.UpdateOptions`` instance. If
+                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+
+        Raises:
+            .UnknownVersionError: If the input document does not have a
+                version.
+            .InvalidVersionError: If the version of the input document
+                does not match the `VERSION` class-level attribute value.
+            .UpdateError: If the input document contains fields which
+                cannot be updated or constructs with non-unique IDs are discovered.
+
+        """
+        root = utils.get_etree_root(root)
+        options = options or DEFAULT_UPDATE_OPTIONS
+        error = self._check_update(root, options, index=index)
+
+        if error is not None:
+            raise error
+
+    def _get_rule_owners(self):
+        """Returns the updaters whose rules are applied to a document by
+        :meth:`_update`. This is this updater, and the CybOX updater of STIX
+        updaters which update CybOX content with its rules.
+
+        """
+        return (self,)
+
+    def _analyze(self, root, options, report, index=None):
+        """Records the findings of each rule this updater would apply to
+        `root` in `report`, a :class:`ramrod.analysis.HopReport`, without
+        modifying `root`.
+
+        The version of `root` is not checked.
+
+        Args:
+            root: The top-level xml node.
+            options: A :class:`ramrod.UpdateOptions` instance.
+            report: The :class:`ramrod.analysis.HopReport` to fill in.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for
+                `root`.
+
+        """
+        owners = self._get_rule_owners()
+        passes = 1  # Namespace and version updates
+
+        def count(counts, klass, nodes):
+            if nodes:
+                name = klass.__name__
+                counts[name] = counts.get(name, 0) + len(nodes)
+
+        rules = tuple(itertools.chain.from_iterable(x.DISALLOWED for x in owners))
+
+        if rules:
+            passes += 1
+            found = get_engine(rules, 'XPATH').select(root, index=index)
+            disallowed = set()
+
+            for klass, nodes in zip(rules, found):
+                nodes = klass._interrogate(nodes)  # noqa
+                count(report.disallowed, klass, nodes)
+                disallowed.update(nodes)
+
+            # Nested untranslatable fields are removed with their ancestor.
+            report.removed_nodes = sum(
+                sum(1 for _ in node.iter('*')) for node in disallowed
+                if not any(x in disallowed for x in node.iterancestors())
+            )
+
+        duplicates = self._get_duplicates(root, index=index) or {}
+        report.duplicates = dict(
+            (id_, len(nodes)) for id_, nodes in iteritems(duplicates)
+        )
+
+        for owner in owners:
+            fields = tuple(owner.TRANSLATABLE_FIELDS)
+
+            if fields:
+                passes += 1
+                found = get_engine(fields, 'XPATH_NODE').select(root, index=index)
+
+                for klass, nodes in zip(fields, found):
+                    count(report.translatable, klass, nodes)
+
+            elements = tuple(owner.OPTIONAL_ELEMENTS)
+            optionals = elements + tuple(owner.OPTIONAL_ATTRIBUTES)
+
+            if options.remove_optionals and optionals:
+                passes += 1
+                found = get_engine(optionals, 'XPATH').select(root, index=index)
+                content = utils.ContentMap()
+
+                for idx, klass in enumerate(optionals):
+                    if idx < len(elements):
+                        nodes = klass._interrogate(found[idx], content)  # noqa
+                        count(report.optional_elements, klass, nodes)
+                    else:
+                        nodes = klass._interrogate(found[idx])  # noqa
+                        count(report.optional_attributes, klass, nodes)
+
+            if options.update_vocabularies:
+                for _, _, vocab in owner._find_vocabs(root, index=index):  # noqa
+                    count(report.vocabs, vocab, (vocab,))
+
+        report.passes = passes
+
+    def analyze(self, root, options=None, index=None):
+        """Reports what updating `root` with this updater would do, without
+        copying or modifying `root`.
+
+        Args:
+            root: The XML document. This can be a filename, a file-like object,
+                an instance of ``etree._Element`` or an instance of
+                ``etree._ElementTree``.
+            options (optional): A ``ramrod.UpdateOptions`` instance. If
+                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for
+                `root`.
+
+        Returns:
+            A :class:`ramrod.analysis.HopReport`. Its ``to_`` attribute is
+            ``None``.
+
+        """
+        root = utils.get_etree_root(root)
+        options = options or DEFAULT_UPDATE_OPTIONS
+        nodes = sum(1 for _ in root.iter('*'))
+        report = analysis.HopReport(self.VERSION, None, nodes)
+
+        if options.check_versions:
+            try:
+                self._check_version(root)
+            except (errors.UnknownVersionError, errors.InvalidVersionError) as ex:
+                report.version_error = str(ex)
+
+        self._analyze(root, options, report, index=index)
+        return report
+
+    def _force_update(self, root, options, index=None, findings=None):
         """Removes untranslatable fields from the `root` document and calls
         ``self._update(...)``.
 
-         Returns:
+        Args:
+            findings (optional): The :class:`.UpdateError` returned by
+                ``_check_update()`` for `root`. If provided, the untranslatable
+                fields and non-unique IDs it describes are cleaned rather than
+                being searched for again.
+
+        Returns:
             An instance of ``ramrod.UpdateResults`` for the updated document.
 
         """
+        disallowed = findings.disallowed if findings is not None else None
+        duplicates = findings.duplicates if findings is not None else None
+
         # Clean the document
-        cleaned_results = self._clean(root, options)
+        cleaned_results = self._clean(
+            root,
+            options,
+            index=index,
+            disallowed=disallowed,
+            duplicates=duplicates
+        )
         cleaned_doc = cleaned_results.document.as_element()
         remapped = cleaned_results.remapped_ids
         removed = cleaned_results.removed
 
         # Update the document
-        updated = self._update(cleaned_doc, options)
+        updated = self._update(cleaned_doc, options, index=index)
         results = self._create_update_results(
             root=updated,
             remapped=remapped,
@@ -912,14 +1597,15 @@ class BaseUpdater(object):
 
         return results
 
-    def _update(self, root, options):
+    def _update(self, root, options, index=None):
         """Abstract method that needs to be overriden by concrete base
         classes.
 
         """
         raise NotImplementedError()
 
-    def update(self, root, options=None, force=False):
+    def update(self, root, options=None, force=False, inplace=False,
+               index=None):
         """Attempts to update `root` to the next version of its language
         specification.
 
@@ -956,6 +1642,14 @@ class BaseUpdater(object):
                 removing untranslatable xml nodes and/or remapping non-unique
                 IDs. This may result in non-schema=conformant XML. **USE AT
                 YOUR OWN RISK!**
+            inplace: If ``True``, `root` is updated in place rather than
+                being copied first. Some nodes (including the root node) may be
+                replaced during the update, so the updated document should
+                always be retrieved from the return value.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for
+                `root`, which is kept up to date during the update. This is
+                used to share an index between the hops of a multi-version
+                update. If ``None``, a new index is built.
 
         Returns:
             An instance of ``ramrod.UpdateResults``.
@@ -970,17 +1664,24 @@ class BaseUpdater(object):
                 the `root` node contains v1.1 content).
 
         """
-        root = utils.get_etree_root(root, make_copy=True)
+        root = utils.get_etree_root(root, make_copy=not inplace)
         options = options or DEFAULT_UPDATE_OPTIONS
 
+        if index is None or index.root is not root:
+            index = DocumentIndex(root)
+
         try:
-            self.check_update(root, options)
-            updated = self._update(root, options)
-            results = self._create_update_results(updated)
-        except (errors.UpdateError, errors.UnknownVersionError, errors.InvalidVersionError):
-            if force:
-                results = self._force_update(root, options)
-            else:
+            findings = self._check_update(root, options, index=index)
+        except (errors.UnknownVersionError, errors.InvalidVersionError):
+            if not force:
                 raise
+            return self._force_update(root, options, index=index)
 
-        return results
+        if findings is None:
+            updated = self._update(root, options, index=index)
+            return self._create_update_results(updated)
+
+        if not force:
+            raise findings
+
+        return self._force_update(root, options, index=index, findings=findings)
@@ -3,9 +3,11 @@
 
 # stdlib
 import itertools
+import threading
 
 # internal
-from ramrod import utils, results
+from ramrod import stream, utils
+from ramrod.plan import UpdatePlan
 
 # relative
 from . import common
@@ -18,7 +20,8 @@ def get_version(doc):
     return BaseCyboxUpdater.get_version(root)
 
 
-def update(doc, from_=None, to_=None, options=None, force=False):
+def update(doc, from_=None, to_=None, options=None, force=False,
+           inplace=False):
     """Updates a CybOX document to align with a given version of the CybOX
     Language.
 
@@ -35,6 +38,10 @@ def update(doc, from_=None, to_=None, options=None, force=False):
         force (boolean): Forces the update process. This may result in content
             being removed during the update process and could result in
             schema-invalid content. **Use at your own risk!**
+        inplace (boolean): If ``True``, an ``etree._Element`` or
+            ``etree._ElementTree`` `doc` is updated in place instead of being
+            copied. The input document is copied at most once, regardless of
+            how many version hops the update spans.
 
     Returns:
         An instance of ``ramrod.UpdateResults``.
@@ -51,32 +58,134 @@ def update(doc, from_=None, to_=None, options=None, force=False):
             version information and `force` is ``False``.
 
     """
-    root = utils.get_etree_root(doc)
-    versions = common.CYBOX_VERSIONS
+    # Copy the input once up front. Each version hop then works directly on
+    # the private copy rather than copying the document again.
+    root = utils.get_etree_root(doc, make_copy=not inplace)
     from_ = from_ or BaseCyboxUpdater.get_version(root)
-    to_ = to_ or versions[-1]  # The latest version if not specified
+    plan = get_plan(from_, to_)
+
+    return plan.update(root, options=options, force=force, inplace=True)
 
-    utils.validate_versions(from_, to_, versions)
 
-    removed, remapped = [], {}
-    idx = versions.index
+def update_stream(doc, output, from_=None, to_=None, options=None,
+                  force=False, jobs=None):
+    """Updates a CybOX document one ``Observable`` at a time and writes the
+    updated document to `output`.
 
-    for version in versions[idx(from_):idx(to_)]:
-        updater   = CYBOX_UPDATERS[version]
-        result    = updater().update(root, options=options, force=force)
-        root      = result.document.as_element()
+    The ``Observables`` root attributes and ``schemaLocation`` are updated
+    and written before any of its children. Each child of the root (e.g.,
+    each ``cybox:Observable``) is then updated separately from the rest of
+    the document and written as soon as it has been parsed. This bounds
+    memory use by the size of a small batch of observables rather than by
+    the whole document.
 
-        # Update record of removed and remapped fields
-        removed.extend(result.removed)
-        remapped.update(result.remapped_ids)
+    See :meth:`ramrod.stream.update` for details.
 
-    result = results.UpdateResults(
-        document=root,
-        removed=removed,
-        remapped_ids=remapped
+    Args:
+        doc: A CybOX document filename or file-like object.
+        output: A filename or file-like object to write the updated document
+            to.
+        from_ (optional, string): The base version for the update process. If
+            ``None``, an attempt will be made to extract the version number
+            from `doc`.
+        to_ (optional, string): The version to update to. If ``None``, the
+            latest version of CybOX is assumed.
+        options (optional): A :class:`ramrod.UpdateOptions` instance. If
+            ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+        force (boolean): Forces the update process. This may result in content
+            being removed during the update process and could result in
+            schema-invalid content. **Use at your own risk!**
+        jobs (optional): The number of worker processes which update the
+            components of the document. If ``None``, the document is
+            updated in this process.
+
+    Returns:
+        An instance of ``ramrod.UpdateResults``. The ``document`` attribute
+        is ``None``.
+
+    Raises:
+        .UpdateError: If any of the following conditions are encountered:
+
+            * The `from_` or `to_` versions are invalid.
+            * The root node of `doc` is not an ``Observables``.
+            * An untranslatable field is encountered and `force` is ``False``.
+            * A non-unique ID is encountered and `force` is ``False``.
+        .InvalidVersionError: If the source document version and the
+            `from_` value do not match and `force` is ``False``.
+        .UnknownVersionError: If the source document does not contain
+            version information and `force` is ``False``.
+
+    """
+    return stream.update(
+        doc,
+        output,
+        from_=from_,
+        to_=to_,
+        options=options,
+        force=force,
+        jobs=jobs,
+        roots=('Observables',)
     )
 
-    return result
+
+def get_plan(from_, to_=None):
+    """Returns an :class:`ramrod.plan.UpdatePlan` for updating CybOX content
+    from `from_` to `to_`.
+
+    Plans are cached, so repeated calls for the same version pair return the
+    same instance.
+
+    Args:
+        from_: The version to update from.
+        to_ (optional): The version to update to. If ``None``, the latest
+            version of CybOX is assumed.
+
+    Raises:
+        .InvalidVersionError: If `from_` or `to_` are invalid.
+
+    """
+    to_ = to_ or LATEST_VERSION
+    key = (from_, to_)
+
+    try:
+        return _PLANS[key]
+    except KeyError:
+        pass
+
+    with _CACHE_LOCK:
+        if key not in _PLANS:
+            _PLANS[key] = UpdatePlan(CYBOX_UPDATERS, CYBOX_VERSIONS, from_, to_)
+
+        return _PLANS[key]
+
+
+def get_updater(version):
+    """Returns a shared instance of the CybOX updater class for `version`.
+
+    Updaters hold no per-document state and are not modified after they
+    are constructed, so the returned instance can be used by any number of
+    threads at once. Repeated calls for the same version return the same
+    instance.
+
+    Args:
+        version: The version of CybOX content the updater updates from.
+
+    Raises:
+        .InvalidVersionError: If `version` is not a known CybOX version.
+
+    """
+    try:
+        return _UPDATERS[version]
+    except KeyError:
+        pass
+
+    utils.validate_version(version, CYBOX_VERSIONS)
+
+    with _CACHE_LOCK:
+        if version not in _UPDATERS:
+            _UPDATERS[version] = CYBOX_UPDATERS[version]()
+
+        return _UPDATERS[version]
 
 def _wire_nsmaps(cls):
     # Wiring namespace dictionaries
@@ -90,12 +199,35 @@ def _wire_nsmaps(cls):
     for klass in nsmapped:
         klass.NSMAP = cls.NSMAP
 
+    # Compile the updater and rule xpaths against the wired namespaces.
+    cls._compile_xpaths()
+
+# The language family name used by ramrod.get_updater().
+FAMILY = 'cybox'
+
 # All known CybOX versions.
 CYBOX_VERSIONS = common.CYBOX_VERSIONS
 
+# The latest known version, which documents are updated to by default.
+LATEST_VERSION = CYBOX_VERSIONS[-1]
+
 # Dictionary mapping CybOX versions to their respective updater class.
 CYBOX_UPDATERS = {}
 
+# A cache of (from, to) version pairs to UpdatePlan instances.
+_PLANS = {}
+
+# A cache of version numbers to shared updater instances.
+_UPDATERS = {}
+
+# Serializes the construction of cached plans and updaters.
+_CACHE_LOCK = threading.Lock()
+
+# The Observables children whose children are updated one at a time by
+# update_stream(). Each Observable is a child of the root, so none are
+# needed.
+STREAM_CONTAINERS = frozenset()
+
 
 def register_updater(cls):
     """Registers a CybOX updater class.
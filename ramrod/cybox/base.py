@@ -21,6 +21,11 @@ class BaseCyboxUpdater(base.BaseUpdater):
     def __init__(self):
         super(BaseCyboxUpdater, self).__init__()
 
+    @classmethod
+    def _compile_xpaths(cls):
+        super(BaseCyboxUpdater, cls)._compile_xpaths()
+        base.get_xpath(cls, 'XPATH_OBJECT_PROPS')
+
     @classmethod
     def get_version(cls, observables):
         """Returns the version of the `observables` ``Observables`` node.
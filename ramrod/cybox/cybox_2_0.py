@@ -2,8 +2,7 @@
 # See LICENSE.txt for complete terms.
 
 # internal
-from ramrod import utils, xmlconst
-from ramrod.options import DEFAULT_UPDATE_OPTIONS
+from ramrod import base, xmlconst
 
 # relative
 from . import common
@@ -35,6 +34,10 @@ class Cybox_2_0_Updater(BaseCyboxUpdater):
     """
     VERSION = '2.0'
 
+    # The CybOX 2.0.1 schema does not enforce ID uniqueness, so
+    # non-unique IDs are not checked for.
+    CHECK_UNIQUE_IDS = False
+
     NSMAP = {
         'APIObj': 'http://cybox.mitre.org/objects#APIObject-2',
         'AccountObj': 'http://cybox.mitre.org/objects#AccountObject-2',
@@ -241,7 +244,7 @@ class Cybox_2_0_Updater(BaseCyboxUpdater):
             values if found?
 
         """
-        props = root.xpath(self.XPATH_OBJECT_PROPS, namespaces=self.NSMAP)
+        props = base.get_xpath(self, 'XPATH_OBJECT_PROPS')(root)
 
         for prop in props:
             for child in prop.findall(xmlconst.XPATH_RELATIVE_DESCENDANTS):
@@ -253,55 +256,32 @@ class Cybox_2_0_Updater(BaseCyboxUpdater):
                 text = text.replace("&comma;", ",")
                 child.text = text
 
-    def _get_disallowed(self, root, options=None):
+    def _get_disallowed(self, root, options=None, index=None):
         """There are no untranslatable fields between CybOX 2.0 and
         CybOX v2.0.1..
 
         """
         pass
 
-    def _get_duplicates(self, root):
-        """There is no need to remap non-unique IDs between CybOX 2.0 and
-        CybOX 2.0.1 instance documents because CybOX 2.0.1 does not enforce
-        ID uniqueness in schema.
-
-        Note:
-            This assumes that `root` is schema-valid.
-
-        """
-        pass
-
-    def check_update(self, root, options=None):
+    def _check_update(self, root, options, index=None):
         """Determines if the input document can be upgraded.
 
-        Args:
-            root: The XML document. This can be a filename, a file-like object,
-                an instance of ``etree._Element`` or an instance of
-                ``etree._ElementTree``.
-            options (optional): A ``ramrod.UpdateOptions`` instance. If
-                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
-
         Raises:
             .UnknownVersionError: If the input document does not have a
                 version.
             .InvalidVersionError: If the version of the input document
                 does not match the `VERSION` class-level attribute value.
-            .UpdateError: If the input document contains fields which
-                cannot be updated or constructs with non-unique IDs are discovered.
 
         """
-        root = utils.get_etree_root(root)
-        options = options or DEFAULT_UPDATE_OPTIONS
-
         if options.check_versions:
             self._check_version(root)
 
-    def _update(self, root, options):
+    def _update(self, root, options, index=None):
         self._update_schemalocs(root)
         self._update_versions(root)
         self._update_lists(root)
 
         if options.update_vocabularies:
-            self._update_vocabs(root)
+            self._update_vocabs(root, index=index)
 
         return root
@@ -3,7 +3,6 @@
 
 # internal
 from ramrod import base, errors, utils
-from ramrod.options import DEFAULT_UPDATE_OPTIONS
 
 # external
 from six import iteritems
@@ -211,16 +210,22 @@ class TransWinMailslotHandle(base.TranslatableField):
     NEW_TAG = "{http://cybox.mitre.org/objects#WinMailslotObject-2}Handle"
 
     @classmethod
-    def _replace(cls, node):
+    def _replace(cls, node, index=None):
         parent = node.getparent()
         dup = utils.copy_xml_element(node, tag=cls.NEW_TAG)
         utils.replace_xml_element(parent, dup)
 
+        if index is not None:
+            index.replace(parent, dup)
+
+        return dup
+
     @classmethod
-    def translate(cls, root):
-        nodes = cls._find(root)
-        for node in nodes:
-            cls._replace(node)
+    def translate(cls, root, nodes=None, index=None):
+        if nodes is None:
+            nodes = cls._find(root)
+
+        return [cls._replace(node, index) for node in nodes]
 
 
 @register_updater
@@ -531,37 +536,7 @@ class Cybox_2_0_1_Updater(BaseCyboxUpdater):
             with utils.ignored(KeyError):
                 del attribs[common.TAG_CYBOX_UPDATE]
 
-    def _translate_fields(self, root):
-        """Translates fields which have changed in structure or data type.
-
-        """
-        for field in self.TRANSLATABLE_FIELDS:
-            field.translate(root)
-
-    def _update_optionals(self, root):
-        """Finds and removes empty xml elements and attributes which are
-        optional in the next language release.
-
-        Args:
-            root: The top-level xml node.
-
-        """
-        optional_elements = self.OPTIONAL_ELEMENTS
-        optional_attribs = self.OPTIONAL_ATTRIBUTES
-
-        typed_nodes = utils.get_typed_nodes(root)
-
-        for optional in optional_elements:
-            found = optional.find(root, typed=typed_nodes)
-            utils.remove_xml_elements(found)
-
-
-        for optional in optional_attribs:
-            found = optional.find(root, typed=typed_nodes)
-            for node in found:
-                utils.remove_xml_attributes(node, optional.ATTRIBUTES)
-
-    def _get_disallowed(self, root, options=None):
+    def _get_disallowed(self, root, options=None, index=None):
         """Finds all xml entities under `root` that cannot be updated.
 
         Args:
@@ -571,13 +546,7 @@ class Cybox_2_0_1_Updater(BaseCyboxUpdater):
             A list of untranslatable items.
 
         """
-        disallowed = []
-
-        for klass in self.DISALLOWED:
-            found = klass.find(root)
-            disallowed.extend(found)
-
-        return disallowed
+        return self._find_disallowed(root, index=index)
 
     def _clean_disallowed(self, disallowed, options):
         """Removes the `disallowed` nodes from the source document.
@@ -614,55 +583,48 @@ class Cybox_2_0_1_Updater(BaseCyboxUpdater):
 
         return duplicates
 
-    def check_update(self, root, options=None):
-        """Determines if the input document can be upgraded.
+    def _check_update(self, root, options, index=None):
+        """Collects the untranslatable fields and non-unique IDs found in
+        the input document.
 
-        Args:
-            root: The XML document. This can be a filename, a file-like object,
-                an instance of ``etree._Element`` or an instance of
-                ``etree._ElementTree``.
-            options (optional): A ``ramrod.UpdateOptions`` instance. If
-                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+        Returns:
+            An :class:`.UpdateError` describing the findings or ``None`` if
+            the input document can be updated.
 
         Raises:
             .UnknownVersionError: If the input document does not have a
                 version.
             .InvalidVersionError: If the version of the input document
                 does not match the `VERSION` class-level attribute value.
-            .UpdateError: If the input document contains fields which
-                cannot be updated or constructs with non-unique IDs are discovered.
 
         """
-        root = utils.get_etree_root(root)
-        options = options or DEFAULT_UPDATE_OPTIONS
-
         if options.check_versions:
             self._check_version(root)
 
-        duplicates = self._get_duplicates(root)
-        disallowed = self._get_disallowed(root)
+        duplicates = self._get_duplicates(root, index=index)
+        disallowed = self._get_disallowed(root, index=index)
 
         if not (disallowed or duplicates):
-            return
+            return None
 
         error = "Found duplicate or untranslatable fields in source document."
-        raise errors.UpdateError(
+        return errors.UpdateError(
             message=error,
             disallowed=disallowed,
             duplicates=duplicates
         )
 
-    def _update(self, root, options):
-        updated = self._update_namespaces(root)
+    def _update(self, root, options, index=None):
+        updated = self._update_namespaces(root, index=index)
 
         self._update_schemalocs(updated)
         self._update_versions(updated)
-        self._translate_fields(updated)
+        self._translate_fields(updated, index=index)
 
         if options.update_vocabularies:
-            self._update_vocabs(updated)
+            self._update_vocabs(updated, index=index)
 
         if options.remove_optionals:
-            self._update_optionals(updated)
+            self._update_optionals(updated, index=index)
 
         return updated
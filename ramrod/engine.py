@@ -0,0 +1,507 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import re
+
+# external
+from six import iteritems
+
+# relative
+from . import utils, xmlconst
+
+
+# Matches a single location step of the form ``prefix:Name[predicate]``.
+# Names cannot begin with ``.``, so ``.`` and ``..`` steps do not match.
+_RE_STEP = re.compile(
+    r"^(?:(?P<prefix>[^\W\d][\w.-]*):)?(?P<local>[^\W\d][\w.-]*)"
+    r"(?:\[(?P<predicate>[^\[\]|]+)\])?$",
+    re.UNICODE
+)
+
+# String literals in a predicate.
+_RE_LITERAL = re.compile(r"\"[^\"]*\"|'[^']*'")
+
+# Parenthesized groups and function arguments which contain no other groups.
+_RE_GROUP = re.compile(r"\([^()]*\)")
+
+# Predicates which refer to the position of the context node.
+_RE_POSITIONAL = re.compile(r"\b(?:position|last)\s*\(", re.UNICODE)
+
+# Predicates which are a location path, such as ``@id`` or ``a:Foo/@bar``.
+_RE_PATH = re.compile(
+    r"^@?[\w.-]+(?::[\w.-]+)?(?:/@?[\w.-]+(?::[\w.-]+)?)*$",
+    re.UNICODE
+)
+
+# Predicates which begin with a number or a negation.
+_RE_NUMBER = re.compile(r"^(?:-|\.?\d)", re.UNICODE)
+
+# Predicates which are a single call to a function returning a boolean.
+_RE_BOOLEAN_CALL = re.compile(
+    r"^(?:not|boolean|contains|starts-with|true|false|lang)\s*_$"
+)
+
+# Operators which produce a boolean. They bind more loosely than any
+# arithmetic operator, so an expression which uses one outside of
+# parentheses is a boolean.
+_RE_BOOLEAN_OP = re.compile(r"[=<>]|\s(?:and|or)\s")
+
+
+def _is_boolean(predicate):
+    """Returns ``True`` if `predicate` is known to evaluate to a boolean or
+    a node-set, and so gives the same result for a node whether or not it
+    is tested on its own.
+
+    Numeric predicates (e.g., ``[1]``) and predicates which use
+    ``position()`` or ``last()`` select nodes by their position among
+    their siblings, so they cannot be tested against one node at a time.
+
+    """
+    text = _RE_LITERAL.sub("''", predicate).strip()
+
+    if _RE_POSITIONAL.search(text):
+        return False
+
+    if _RE_PATH.match(text):
+        return not _RE_NUMBER.match(text)
+
+    # Reduce the predicate to its outermost expression.
+    while True:
+        reduced = _RE_GROUP.sub("_", text)
+
+        if reduced == text:
+            break
+
+        text = reduced
+
+    return bool(_RE_BOOLEAN_CALL.match(text) or _RE_BOOLEAN_OP.search(text))
+
+
+class _Step(object):
+    """A location step in a :class:`_Branch`.
+
+    Attributes:
+        tag: The etree tag (``{namespace}localname``) selected by the step.
+        predicate: A :class:`ramrod.utils.CompiledXPath` which tests the
+            predicate of the step against a node, or ``None``.
+
+    """
+    __slots__ = ('tag', 'predicate')
+
+    def __init__(self, tag, predicate=None):
+        self.tag = tag
+        self.predicate = predicate
+
+    def matches(self, node):
+        if node is None or node.tag != self.tag:
+            return False
+
+        if self.predicate is None:
+            return True
+
+        return bool(self.predicate(node))
+
+
+class _Branch(object):
+    """One ``.//a:Foo/b:Bar`` or ``//a:Foo`` branch of an xpath union.
+
+    Attributes:
+        steps: A tuple of :class:`_Step` instances.
+        absolute: ``True`` if the branch begins with ``//``, meaning the first
+            step may match the document root node.
+
+    """
+    __slots__ = ('steps', 'absolute')
+
+    def __init__(self, steps, absolute):
+        self.steps = steps
+        self.absolute = absolute
+
+    @property
+    def tag(self):
+        """The tag of the nodes selected by this branch."""
+        return self.steps[-1].tag
+
+    def matches(self, node, root):
+        """Returns ``True`` if `node` is selected by this branch when it is
+        evaluated against `root`.
+
+        Note:
+            `node` must be a descendant-or-self of `root`.
+
+        """
+        steps = self.steps
+        last = len(steps) - 1
+
+        if not steps[last].matches(node):
+            return False
+
+        for step in reversed(steps[:last]):
+            if node is root:
+                return False
+
+            node = node.getparent()
+
+            if not step.matches(node):
+                return False
+
+        return self.absolute or node is not root
+
+
+def _parse_branch(path, namespaces):
+    """Parses a single xpath union branch into a :class:`_Branch`.
+
+    Returns:
+        A :class:`_Branch` or ``None`` if the branch uses xpath features which
+        are not supported by the engine.
+
+    """
+    path = path.strip()
+
+    if path.startswith(".//"):
+        absolute, path = False, path[3:]
+    elif path.startswith("//"):
+        absolute, path = True, path[2:]
+    else:
+        return None
+
+    steps = []
+
+    for text in path.split("/"):
+        match = _RE_STEP.match(text.strip())
+
+        if not match:
+            return None
+
+        prefix, local, predicate = match.group('prefix', 'local', 'predicate')
+
+        if prefix is None:
+            tag = local
+        elif prefix in namespaces:
+            tag = "{%s}%s" % (namespaces[prefix], local)
+        else:
+            return None
+
+        if predicate is not None:
+            if not _is_boolean(predicate):
+                return None
+
+            predicate = utils.compile_xpath(
+                "self::*[%s]" % predicate, namespaces
+            )
+
+        steps.append(_Step(tag, predicate))
+
+    return _Branch(tuple(steps), absolute)
+
+
+def parse_xpath(path, namespaces=None):
+    """Parses `path` into a tuple of :class:`_Branch` objects which can be
+    dispatched by node tag.
+
+    Only unions of child-axis location paths beginning with ``.//`` or
+    ``//`` are supported (e.g., ``.//a:Foo/b:Bar[@id] | //c:Baz``). Steps
+    must name an element, and their predicates must not depend on the
+    position of the node (e.g., ``[1]`` or ``[last()]``).
+
+    Returns:
+        A tuple of branches or ``None`` if `path` cannot be dispatched by
+        tag.
+
+    """
+    namespaces = namespaces or {}
+    branches = []
+
+    for text in path.split("|"):
+        branch = _parse_branch(text, namespaces)
+
+        if branch is None:
+            return None
+
+        branches.append(branch)
+
+    return tuple(branches)
+
+
+def is_attached(node, root):
+    """Returns ``True`` if `node` is `root` or a descendant of `root`."""
+    if node is root:
+        return True
+
+    for ancestor in node.iterancestors():
+        if ancestor is root:
+            return True
+
+    return False
+
+
+def _is_document_root(node):
+    """Returns ``True`` if `node` is the root element of its document."""
+    return node.getroottree().getroot() is node
+
+
+class RuleEngine(object):
+    """Evaluates a collection of xpath selectors against a document with a
+    single traversal, rather than one traversal per selector.
+
+    Selectors are unions of simple location paths (the form used by rule
+    classes such as ``DisallowedFields`` and ``TranslatableField``) and are
+    indexed by the tag of the nodes they select. Selectors with ``CTX_TYPES``
+    are indexed by ``xsi:type`` name and their xpaths are only evaluated
+    against matching context nodes. Any selector that cannot be indexed is
+    evaluated directly.
+
+    Engines hold no per-document state and can be shared between threads.
+    Use :meth:`get_engine` to retrieve a cached instance.
+
+    Args:
+        selectors: An iterable of ``(xpath, ctx_types)`` tuples, where
+            `xpath` is a :class:`ramrod.utils.CompiledXPath` and `ctx_types`
+            is a ``CTX_TYPES`` dictionary or ``None``.
+
+    """
+    def __init__(self, selectors):
+        self._selectors = tuple(selectors)
+        self._branches = {}   # selector index => branches
+        self._absolute = set()  # selectors containing '//' branches
+        self._by_tag = {}     # tag => [(selector index, branch)]
+        self._by_type = {}    # (ns, xsi:type name) => [selector index]
+        self._direct = []     # selectors which are evaluated directly
+
+        for idx, (xpath, ctx_types) in enumerate(self._selectors):
+            if ctx_types:
+                for typename, ns in iteritems(ctx_types):
+                    self._by_type.setdefault((ns, typename), []).append(idx)
+                continue
+
+            branches = parse_xpath(xpath.path, xpath.namespaces)
+
+            if branches is None:
+                self._direct.append(idx)
+                continue
+
+            self._branches[idx] = branches
+
+            for branch in branches:
+                if branch.absolute:
+                    self._absolute.add(idx)
+
+                self._by_tag.setdefault(branch.tag, []).append((idx, branch))
+
+        self._tags = tuple(self._by_tag)
+        self._typenames = frozenset(x for _, x in self._by_type)
+
+    def __len__(self):
+        return len(self._selectors)
+
+    def _get_direct(self, root):
+        """Returns the indexes of selectors which must be evaluated directly
+        against `root`.
+
+        Branches beginning with ``//`` are evaluated against the document
+        rather than `root`, so they can only be dispatched when `root` is the
+        document root.
+
+        """
+        if not self._absolute or _is_document_root(root):
+            return self._direct
+
+        return self._direct + sorted(self._absolute)
+
+    def _iter_typed(self, root, subtrees, index):
+        """Yields xsi:typed nodes under `root` (or within each of the
+        `subtrees`) in document order.
+
+        """
+        if index is not None:
+            typed = []
+
+            for typename in self._typenames:
+                typed.extend(index.typed(typename))
+
+            if len(self._typenames) > 1:
+                typed = index.sort(typed)
+
+            for node in typed:
+                yield node
+            return
+
+        if subtrees is None:
+            for node in utils.get_typed_nodes(root):
+                yield node
+            return
+
+        for subtree in subtrees:
+            if subtree is not root and xmlconst.TAG_XSI_TYPE in subtree.attrib:
+                yield subtree
+
+            for node in utils.get_typed_nodes(subtree):
+                yield node
+
+    def _get_contexts(self, root, subtrees=None, index=None):
+        """Returns a dictionary of selector indexes to lists of context nodes
+        matched by the selector ``CTX_TYPES``.
+
+        """
+        contexts = {}
+
+        if not self._by_type:
+            return contexts
+
+        by_type, typenames = self._by_type, self._typenames
+        resolver = utils.NamespaceResolver()
+
+        for node in self._iter_typed(root, subtrees, index):
+            alias, typename = utils.get_type_info(node)
+
+            if typename not in typenames:
+                continue
+
+            ns = resolver.resolve(node, alias)
+            entries = by_type.get((ns, typename), ())
+
+            for idx in entries:
+                contexts.setdefault(idx, []).append(node)
+
+        return contexts
+
+    def _iter_candidates(self, root, subtrees, index):
+        """Yields nodes under `root` (or within each of the `subtrees`) whose
+        tags are indexed by the engine, in document order.
+
+        """
+        if index is not None:
+            for node in index.nodes(self._tags):
+                yield node
+            return
+
+        for subtree in subtrees or (root,):
+            for node in subtree.iter(*self._tags):
+                yield node
+
+    def select(self, root, subtrees=None, index=None):
+        """Evaluates every selector against `root`.
+
+        Args:
+            root: The context node for the selector xpaths.
+            subtrees (optional): An iterable of nodes under `root`. If
+                provided, only nodes found in these subtrees (including the
+                subtree roots) are considered as matches or contexts. This is
+                used to find matches in content which was added or changed
+                after a full ``select()``. Selectors which cannot be indexed
+                are always evaluated against all of `root`.
+            index (optional): A :class:`ramrod.index.DocumentIndex` for the
+                document. If provided, candidate and context nodes are looked
+                up in the index rather than found by traversing `root`. The
+                index is ignored if `subtrees` is provided or if it was not
+                built for `root`.
+
+        Returns:
+            A list containing a list of matching nodes for each selector, in
+            the order the selectors were passed to the engine. Each list is
+            in document order, as it would be if the xpath were evaluated
+            directly.
+
+        """
+        if index is not None and (subtrees is not None or index.root is not root):
+            index = None
+
+        found = [[] for _ in self._selectors]
+        by_tag = self._by_tag
+
+        if self._tags:
+            for node in self._iter_candidates(root, subtrees, index):
+                for idx, branch in by_tag[node.tag]:
+                    if not branch.matches(node, root):
+                        continue
+
+                    nodes = found[idx]
+
+                    if not nodes or nodes[-1] is not node:
+                        nodes.append(node)
+
+        contexts = self._get_contexts(root, subtrees, index)
+
+        for idx, ctxs in iteritems(contexts):
+            xpath = self._selectors[idx][0]
+
+            for ctx in ctxs:
+                found[idx].extend(xpath(ctx))
+
+        for idx in self._get_direct(root):
+            found[idx] = self._selectors[idx][0](root)
+
+        return found
+
+    def verify(self, idx, nodes, root, index=None):
+        """Returns the nodes in `nodes` which are still selected by the
+        selector at `idx` after the document under `root` has been modified.
+        Duplicate nodes are dropped.
+
+        Selectors which cannot be checked node-by-node (e.g., those with
+        ``CTX_TYPES``) are evaluated again against `root`, using `index` to
+        find context nodes if provided.
+
+        """
+        xpath, ctx_types = self._selectors[idx]
+
+        if ctx_types:
+            found = []
+
+            if index is not None and index.root is not root:
+                index = None
+
+            for ctx in self._get_contexts(root, index=index).get(idx, ()):
+                found.extend(xpath(ctx))
+
+            return found
+
+        if idx in self._get_direct(root):
+            return xpath(root)
+
+        branches = self._branches[idx]
+        verified, seen = [], set()
+
+        for node in nodes:
+            if node in seen or not is_attached(node, root):
+                continue
+
+            seen.add(node)
+
+            if any(x.matches(node, root) for x in branches):
+                verified.append(node)
+
+        return verified
+
+
+_ENGINES = {}
+
+
+def get_engine(selectors):
+    """Returns a cached :class:`RuleEngine` for `selectors`.
+
+    Args:
+        selectors: A tuple of ``(xpath, ctx_types)`` tuples. See
+            :class:`RuleEngine`.
+
+    """
+    key = tuple(
+        (xpath, tuple(sorted(ctx.items())) if ctx else None)
+        for xpath, ctx in selectors
+    )
+
+    try:
+        return _ENGINES[key]
+    except KeyError:
+        # setdefault() is atomic, so threads which race to build an engine
+        # all receive the same instance.
+        return _ENGINES.setdefault(key, RuleEngine(selectors))
+
+
+__all__ = [
+    'RuleEngine',
+    'get_engine',
+    'parse_xpath',
+    'is_attached'
+]
@@ -1,6 +1,10 @@
 # Copyright (c) 2015, The MITRE Corporation. All rights reserved.
 # See LICENSE.txt for complete terms.
 
+# external
+from lxml import etree
+
+
 class UnknownVersionError(Exception):
     """Raised when an input document does not contain a ``version`` attribute
     and the user has not specified a document version.
@@ -45,8 +49,35 @@ class InvalidVersionError(Exception):
         self.found = found
 
 
+class ServerError(Exception):
+    """Raised when a ``ramrod.server.UpdateServer`` rejects a request.
+
+    Attributes:
+        message: The error message.
+        status: The HTTP status code of the response.
+
+    """
+    def __init__(self, message=None, status=None):
+        super(ServerError, self).__init__(message)
+        self.status = status
+
+
+# The errors raised when a single input document cannot be parsed or
+# updated. APIs which update many documents report these for the document
+# rather than raising them.
+DOCUMENT_ERRORS = (
+    UpdateError,
+    InvalidVersionError,
+    UnknownVersionError,
+    etree.XMLSyntaxError,
+    IOError
+)
+
+
 __all__ = (
     'UnknownVersionError',
     'UpdateError',
-    'InvalidVersionError'
+    'InvalidVersionError',
+    'ServerError',
+    'DOCUMENT_ERRORS'
 )
\ No newline at end of file
@@ -0,0 +1,145 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# external
+from lxml import etree
+from six import string_types
+
+# internal
+import ramrod
+
+# relative
+from . import errors, utils
+
+
+# The number of bytes read at a time while looking for the root start tag.
+SNIFF_CHUNK_SIZE = 1024
+
+
+class DocumentHeader(object):
+    """Describes a STIX or CybOX document as declared by its root node.
+    Returned from :meth:`ramrod.sniff`.
+
+    Attributes:
+        family: The language of the document: ``'stix'`` or ``'cybox'``.
+        root: The local name of the root node: ``'STIX_Package'`` or
+            ``'Observables'``.
+        version: The version declared by the root node, or ``None`` if the
+            root node does not declare a version.
+        latest: The latest version of the language of the document.
+        namespaces: A dictionary of the namespace prefixes in scope on the
+            root node to their namespaces. The default namespace has a
+            ``None`` prefix.
+
+    """
+    def __init__(self, family, root, version, latest, namespaces=None):
+        self.family = family
+        self.root = root
+        self.version = version
+        self.latest = latest
+        self.namespaces = namespaces or {}
+
+    @property
+    def is_latest(self):
+        """``True`` if the document declares the latest version of its
+        language, and so does not need to be updated.
+
+        """
+        return self.version == self.latest
+
+    def __repr__(self):
+        return "DocumentHeader(%r, %r, %r)" % (
+            self.family, self.root, self.version
+        )
+
+
+def _get_version(package, root):
+    """Returns the version declared by the `root` node, or ``None`` if it
+    does not declare one.
+
+    """
+    try:
+        return package.get_version(root)
+    except errors.UnknownVersionError:
+        return None
+
+
+def _read_root(source):
+    """Parses the `source` file-like object up to the end of its root start
+    tag and returns the root node. The root node has its attributes and
+    namespace declarations but no children.
+
+    The document is read ``SNIFF_CHUNK_SIZE`` bytes at a time, so only the
+    chunks up to the root start tag are read and parsed.
+
+    """
+    parser = etree.XMLPullParser(
+        events=('start',),
+        huge_tree=True,
+        resolve_entities=False
+    )
+
+    while True:
+        data = source.read(SNIFF_CHUNK_SIZE)
+
+        if data:
+            parser.feed(data)
+        else:
+            parser.close()  # Raises XMLSyntaxError if there is no root.
+
+        for _, root in parser.read_events():
+            return root
+
+
+def sniff(source):
+    """Reads the language, version and namespaces of the `source` STIX or
+    CybOX document from its root node.
+
+    A filename or file-like object is parsed only up to the end of its root
+    start tag, so `source` documents can be sorted or skipped without
+    paying for a full parse. The rest of the document is not read, so it is
+    not checked for well-formedness.
+
+    Note:
+        When `source` is a file-like object, it is left open and its
+        position is somewhere past the root start tag.
+
+    Args:
+        source: A STIX or CybOX document filename, file-like object,
+            ``etree._Element`` or ``etree._ElementTree`` object instance.
+
+    Returns:
+        A :class:`DocumentHeader` instance.
+
+    Raises:
+        .UpdateError: If the root node of `source` is not a ``STIX_Package``
+            or ``Observables`` node.
+        etree.XMLSyntaxError: If the root start tag cannot be parsed.
+
+    """
+    if isinstance(source, etree._ElementTree):  # noqa
+        root = source.getroot()
+    elif isinstance(source, etree._Element):  # noqa
+        root = source
+    elif isinstance(source, string_types):
+        with open(source, 'rb') as f:
+            root = _read_root(f)
+    else:
+        root = _read_root(source)
+
+    package = ramrod.get_package(root)
+
+    return DocumentHeader(
+        family=package.FAMILY,
+        root=utils.get_localname(root),
+        version=_get_version(package, root),
+        latest=package.LATEST_VERSION,
+        namespaces=dict(root.nsmap)
+    )
+
+
+__all__ = [
+    'DocumentHeader',
+    'SNIFF_CHUNK_SIZE',
+    'sniff'
+]
@@ -0,0 +1,280 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# relative
+from . import xmlconst
+
+
+class DocumentIndex(object):
+    """A structural index of an XML document which is shared by the phases
+    of an update and by each hop of an :class:`ramrod.plan.UpdatePlan`.
+
+    The index maps element tags, ``xsi:type`` names and ``id`` attribute
+    values to the elements which carry them. It is built lazily with a
+    single traversal of the document the first time it is queried.
+
+    Updaters keep the index current by reporting the elements they remove,
+    replace, rename or retype (see :meth:`remove`, :meth:`replace`,
+    :meth:`rename` and :meth:`update`). Changes which are not reported must
+    be followed by a call to :meth:`invalidate`, which causes the index to be
+    rebuilt the next time it is queried. Attribute and tag values are checked
+    again when the index is queried, so stale entries are never returned.
+
+    Note:
+        Indexes hold per-document state and must not be shared between
+        documents or threads.
+
+    Args:
+        root: The root element of the document to index.
+
+    Attributes:
+        root: The root element of the indexed document.
+
+    """
+    def __init__(self, root):
+        self.root = root
+        self._stale = True
+        self._positions = {}  # element => document position
+        self._buckets = {}    # kind => {key => [elements]}
+        self._unsorted = set()  # (kind, key) buckets which need sorting
+
+    def invalidate(self):
+        """Marks the index as stale. The index will be rebuilt the next time
+        it is queried.
+
+        """
+        self._stale = True
+
+    def _build(self):
+        """Indexes every element under `root` with a single traversal."""
+        positions, tags, types, ids = {}, {}, {None: []}, {}
+        typed = types[None]
+        xsi_type = xmlconst.TAG_XSI_TYPE
+
+        for pos, node in enumerate(self.root.iter('*')):
+            positions[node] = pos
+            tags.setdefault(node.tag, []).append(node)
+
+            get = node.get
+            id_ = get('id')
+            type_ = get(xsi_type)
+
+            if id_ is not None:
+                ids.setdefault(id_, []).append(node)
+
+            if type_ is not None:
+                typed.append(node)
+                types.setdefault(_get_typename(type_), []).append(node)
+
+        self._positions = positions
+        self._buckets = {'tag': tags, 'type': types, 'id': ids}
+        self._unsorted = set()
+        self._stale = False
+
+    def _ensure(self):
+        if self._stale:
+            self._build()
+
+    def _position(self, node):
+        """Returns a sort key for the document position of `node`.
+
+        Elements indexed by :meth:`replace` are given tuple positions which
+        sort after the position of the replaced element and before any
+        element which followed the replaced subtree.
+
+        """
+        pos = self._positions[node]
+
+        if isinstance(pos, tuple):
+            return pos
+
+        return (pos,)
+
+    def _get(self, kind, key, check):
+        """Returns the valid elements in the `key` bucket of the `kind`
+        buckets, in document order.
+
+        Elements which have been removed from the document or which no longer
+        pass `check` are dropped from the bucket.
+
+        """
+        buckets = self._buckets[kind]
+        bucket = buckets.get(key)
+
+        if not bucket:
+            return []
+
+        positions = self._positions
+        unsorted = (kind, key) in self._unsorted
+        valid, seen = [], set()
+
+        for node in bucket:
+            if node not in positions or not check(node):
+                continue
+
+            if unsorted:
+                if node in seen:
+                    continue
+                seen.add(node)
+
+            valid.append(node)
+
+        if unsorted:
+            valid.sort(key=self._position)
+            self._unsorted.discard((kind, key))
+
+        if unsorted or len(valid) != len(bucket):
+            buckets[key] = valid
+
+        return valid
+
+    def _append(self, kind, key, node):
+        self._buckets[kind].setdefault(key, []).append(node)
+        self._unsorted.add((kind, key))
+
+    def _append_attributes(self, node):
+        get = node.get
+        id_ = get('id')
+        type_ = get(xmlconst.TAG_XSI_TYPE)
+
+        if id_ is not None:
+            self._append('id', id_, node)
+
+        if type_ is not None:
+            self._append('type', None, node)
+            self._append('type', _get_typename(type_), node)
+
+    def nodes(self, tags):
+        """Returns all elements under and including `root` whose tag is found
+        in `tags`, in document order.
+
+        """
+        self._ensure()
+        found = []
+
+        for tag in tags:
+            found.extend(self._get('tag', tag, lambda x: x.tag == tag))
+
+        if len(tags) > 1:
+            found.sort(key=self._position)
+
+        return found
+
+    def typed(self, typename=None):
+        """Returns the elements under `root` which have an ``xsi:type``
+        attribute, in document order.
+
+        Args:
+            typename (optional): If provided, only elements whose ``xsi:type``
+                names this type (ignoring the namespace prefix) are returned.
+
+        """
+        self._ensure()
+        root = self.root
+
+        def check(node):
+            if node is root:
+                return False
+
+            type_ = node.get(xmlconst.TAG_XSI_TYPE)
+
+            if type_ is None:
+                return False
+
+            return typename is None or _get_typename(type_) == typename
+
+        return self._get('type', typename, check)
+
+    def ids(self):
+        """Returns a dictionary of ``id`` attribute values to lists of
+        elements under `root` which carry the id. Each list of elements is in
+        document order.
+
+        """
+        self._ensure()
+        root = self.root
+        buckets = self._buckets['id']
+        found = {}
+
+        for id_ in list(buckets):
+            check = lambda x: x is not root and x.get('id') == id_
+            nodes = self._get('id', id_, check)
+
+            if nodes:
+                found[id_] = nodes
+            else:
+                del buckets[id_]
+
+        return found
+
+    def sort(self, nodes):
+        """Returns a list of the indexed elements in `nodes`, sorted in
+        document order.
+
+        """
+        self._ensure()
+        return sorted(nodes, key=self._position)
+
+    def remove(self, node):
+        """Removes `node` and its descendants from the index."""
+        if self._stale:
+            return
+
+        positions = self._positions
+
+        for desc in node.iter('*'):
+            positions.pop(desc, None)
+
+    def replace(self, old, new):
+        """Replaces `old` and its descendants with `new` and its descendants
+        in the index.
+
+        """
+        if old is self.root:
+            self.root = new
+            self.invalidate()
+
+        if self._stale:
+            return
+
+        pos = self._positions.get(old)
+        self.remove(old)
+
+        if pos is None:
+            self.invalidate()
+            return
+
+        if not isinstance(pos, tuple):
+            pos = (pos,)
+
+        for idx, desc in enumerate(new.iter('*')):
+            self._positions[desc] = pos + (idx,) if idx else pos
+            self._append('tag', desc.tag, desc)
+            self._append_attributes(desc)
+
+    def rename(self, node):
+        """Updates the index after the tag of `node` has changed."""
+        if self._stale or node not in self._positions:
+            return
+
+        self._append('tag', node.tag, node)
+
+    def update(self, node):
+        """Updates the index after the ``id`` or ``xsi:type`` attribute of
+        `node` has changed.
+
+        """
+        if self._stale or node not in self._positions:
+            return
+
+        self._append_attributes(node)
+
+
+def _get_typename(xsi_type):
+    """Returns the type name portion of an ``xsi:type`` attribute value."""
+    return xsi_type.rpartition(':')[2]
+
+
+__all__ = [
+    'DocumentIndex'
+]
@@ -0,0 +1,326 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import collections
+import itertools
+import multiprocessing
+import threading
+
+# external
+from lxml import etree
+from six import BytesIO, iteritems, text_type
+
+# internal
+import ramrod
+from ramrod import errors
+from ramrod.options import DEFAULT_UPDATE_OPTIONS
+
+
+# A picklable summary of an ``etree._Element``. Results and errors returned
+# from worker processes carry these in place of nodes.
+NodeSummary = collections.namedtuple(
+    'NodeSummary', ['tag', 'sourceline', 'attrib']
+)
+
+
+class ParallelResult(object):
+    """The result of updating one document in a worker process.
+
+    Attributes:
+        index: The position of the document in the input sequence.
+        filename: The input filename, or ``None`` if the document was passed
+            as ``bytes``.
+        document: The serialized updated document (``bytes``), or ``None``
+            if the update failed.
+        removed: A tuple of :class:`NodeSummary` instances for the nodes
+            which were removed from the document.
+        remapped_ids: An ``{ id: [summaries] }`` dictionary where the key is
+            a non-unique ID found in the input document and the values are
+            :class:`NodeSummary` instances for the nodes which were assigned
+            new IDs.
+        error: ``None`` or the error which stopped the update. Nodes carried
+            by :class:`.UpdateError` and :class:`.InvalidVersionError`
+            instances are replaced with :class:`NodeSummary` instances.
+            ``etree.XMLSyntaxError`` instances cannot be pickled, so input
+            which cannot be parsed is reported as a ``SyntaxError`` with the
+            same message and line number.
+
+    """
+    def __init__(self, index, filename=None, document=None, removed=None,
+                 remapped_ids=None, error=None):
+        self.index = index
+        self.filename = filename
+        self.document = document
+        self.removed = removed or ()
+        self.remapped_ids = remapped_ids or {}
+        self.error = error
+
+
+def summarize_node(node):
+    """Returns a :class:`NodeSummary` for `node`."""
+    if node is None:
+        return None
+
+    return NodeSummary(node.tag, node.sourceline, dict(node.attrib))
+
+
+def summarize_error(ex, summarize=summarize_node):
+    """Returns a picklable copy of `ex` which carries node summaries in place
+    of nodes.
+
+    Args:
+        ex: The error raised while updating a document.
+        summarize (optional): The function which returns a
+            :class:`NodeSummary` for a node.
+
+    """
+    if isinstance(ex, errors.UpdateError):
+        disallowed = ex.disallowed
+        duplicates = ex.duplicates
+
+        if disallowed is not None:
+            disallowed = [summarize(x) for x in disallowed]
+
+        if duplicates is not None:
+            duplicates = dict(
+                (id_, [summarize(x) for x in nodes])
+                for id_, nodes in iteritems(duplicates)
+            )
+
+        return errors.UpdateError(str(ex), disallowed, duplicates)
+
+    if isinstance(ex, errors.InvalidVersionError):
+        return errors.InvalidVersionError(
+            str(ex), summarize(ex.node), ex.expected, ex.found
+        )
+
+    if isinstance(ex, etree.XMLSyntaxError):
+        return SyntaxError(ex.msg, (ex.filename, ex.lineno, ex.offset, None))
+
+    return ex
+
+
+def summarize_results(updated, summarize=summarize_node):
+    """Returns picklable summaries of the nodes which were removed and
+    remapped by an update.
+
+    Args:
+        updated: The :class:`.UpdateResults` of the update.
+        summarize (optional): The function which returns a
+            :class:`NodeSummary` for a node.
+
+    Returns:
+        A ``(removed, remapped_ids)`` tuple, where `removed` is a tuple of
+        :class:`NodeSummary` instances and `remapped_ids` is an
+        ``{ id: [summaries] }`` dictionary.
+
+    """
+    removed = tuple(summarize(x) for x in updated.removed)
+    remapped = dict(
+        (id_, [summarize(x) for x in nodes])
+        for id_, nodes in iteritems(updated.remapped_ids)
+    )
+
+    return removed, remapped
+
+
+# The update settings of a worker process. These are set once by
+# _init_worker() rather than sent with each document.
+_settings = {}
+
+
+def _init_worker(from_, to_, options, force, pretty):
+    """Stores the update settings for the worker process and compiles the
+    update plans which may be needed to update documents to `to_`.
+
+    """
+    import ramrod.cybox
+    import ramrod.stix
+
+    _settings.update(
+        from_=from_, to_=to_, options=options, force=force, pretty=pretty
+    )
+
+    for package, versions in ((ramrod.stix, ramrod.stix.STIX_VERSIONS),
+                              (ramrod.cybox, ramrod.cybox.CYBOX_VERSIONS)):
+        for version in versions[:-1]:
+            try:
+                package.get_plan(version, to_)
+            except errors.InvalidVersionError:
+                continue
+
+
+def _update(task):
+    """Updates the document in `task` and returns a
+    :class:`ParallelResult`.
+
+    Args:
+        task: An ``(index, doc)`` tuple, where `doc` is a text filename or
+            the ``bytes`` content of a document.
+
+    """
+    index, doc = task
+    settings = _settings
+
+    if isinstance(doc, text_type):
+        filename, source = doc, doc
+    else:
+        filename, source = None, BytesIO(doc)
+
+    try:
+        updated = ramrod.update(
+            source,
+            from_=settings['from_'],
+            to_=settings['to_'],
+            options=settings['options'],
+            force=settings['force']
+        )
+    except errors.DOCUMENT_ERRORS as ex:
+        return ParallelResult(index, filename, error=summarize_error(ex))
+
+    document = updated.document.as_bytes(pretty=settings['pretty'])
+    removed, remapped = summarize_results(updated)
+
+    return ParallelResult(index, filename, document, removed, remapped)
+
+
+def _update_chunk(tasks):
+    """Updates the documents in `tasks` and returns a list of
+    :class:`ParallelResult` instances.
+
+    """
+    return [_update(x) for x in tasks]
+
+
+def _chunks(iterable, size):
+    """Yields lists of up to `size` items from `iterable`."""
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def _next_ordered(pending, finished):
+    """Removes and returns the oldest result in `pending`."""
+    return pending.popleft()
+
+
+# The number of seconds _next_ready() waits for a finished task before
+# checking `pending` again. Failed tasks do not signal `finished`.
+_POLL_INTERVAL = 0.05
+
+
+def _next_ready(pending, finished):
+    """Removes and returns the first result in `pending` which is ready,
+    waiting for one to finish if necessary.
+
+    """
+    while True:
+        finished.clear()
+
+        for result in pending:
+            if result.ready():
+                pending.remove(result)
+                return result
+
+        finished.wait(_POLL_INTERVAL)
+
+
+def update(docs, jobs=None, from_=None, to_=None, options=None, force=False,
+           pretty=False, ordered=True, max_tasks_per_child=None,
+           chunksize=1):
+    """Updates the STIX and CybOX documents in `docs` in a pool of worker
+    processes, yielding a :class:`ParallelResult` for each document.
+
+    Documents are sent to the workers as filenames or ``bytes`` and are
+    returned serialized, since lxml trees cannot be pickled. Each worker
+    compiles the update plans once, when it is started.
+
+    `docs` is read lazily: at most ``2 * jobs`` chunks of documents are in
+    flight at once, so a large or unbounded iterable of ``bytes`` is not
+    held in memory while the workers catch up.
+
+    Args:
+        docs: An iterable of STIX or CybOX document filenames or ``bytes``
+            content. Filenames must be text (``unicode`` on Python 2).
+        jobs (optional): The number of worker processes. If ``None``, the
+            number of CPUs is used.
+        from_ (optional, string): The version to update from. If not specified,
+            the `from_` version will be retrieved from each input document.
+        to_ (optional, string): The expected output version of the update
+            process. If not specified, the latest language version will be
+            assumed.
+        options (optional): A :class:`.UpdateOptions` instance. If
+            ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used. The
+            options are pickled, so ``new_id_func`` must be a module-level
+            function.
+        force (boolean): Attempt to force the update process if a document
+            contains untranslatable fields.
+        pretty (boolean): If ``True``, updated documents are pretty printed.
+        ordered (boolean): If ``True``, results are yielded in the order of
+            `docs`. If ``False``, results are yielded as soon as they are
+            ready.
+        max_tasks_per_child (optional): The number of documents a worker
+            process updates before it is replaced with a new process. This
+            releases any memory the worker's libxml2 heap is holding on to.
+            If ``None``, workers live as long as the pool.
+        chunksize (optional): The number of documents sent to a worker at a
+            time.
+
+    Yields:
+        A :class:`ParallelResult` for each document in `docs`.
+
+    """
+    options = options or DEFAULT_UPDATE_OPTIONS
+    jobs = jobs or multiprocessing.cpu_count()
+
+    pool = multiprocessing.Pool(
+        processes=jobs,
+        initializer=_init_worker,
+        initargs=(from_, to_, options, force, pretty),
+        maxtasksperchild=max_tasks_per_child
+    )
+
+    # Only 2 * jobs chunks are in flight at once, so `docs` is read as
+    # results are consumed rather than all up front.
+    limit = 2 * jobs
+    pending = collections.deque()
+    finished = threading.Event()
+    next_result = _next_ordered if ordered else _next_ready
+
+    try:
+        for chunk in _chunks(enumerate(docs), chunksize):
+            pending.append(pool.apply_async(
+                _update_chunk, (chunk,), callback=lambda _: finished.set()
+            ))
+
+            while len(pending) >= limit:
+                for result in next_result(pending, finished).get():
+                    yield result
+
+        while pending:
+            for result in next_result(pending, finished).get():
+                yield result
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+
+
+__all__ = [
+    'NodeSummary',
+    'ParallelResult',
+    'summarize_error',
+    'summarize_node',
+    'summarize_results',
+    'update'
+]
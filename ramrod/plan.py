@@ -0,0 +1,258 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# internal
+from . import analysis, errors, results, utils, xmlconst
+from .index import DocumentIndex
+from .options import DEFAULT_UPDATE_OPTIONS
+
+
+class UpdatePlan(object):
+    """A compiled update path between two versions of a language.
+
+    An ``UpdatePlan`` resolves the chain of updater classes needed to move a
+    document from `from_` to `to_` and composes the schemalocation updates of
+    every hop (``UPDATE_NS_MAP``, ``UPDATE_SCHEMALOC_MAP`` and
+    ``DISALLOWED_NAMESPACES``) into a single transition, which is applied once
+    at the end of the update rather than once per hop.
+
+    A single :class:`ramrod.index.DocumentIndex` is shared by every hop of
+    an update, so the document is not rescanned by each hop.
+
+    Plans hold no per-document state and can be reused for any number of
+    documents. Use :meth:`ramrod.stix.get_plan` or
+    :meth:`ramrod.cybox.get_plan` to retrieve a cached instance.
+
+    Args:
+        updaters: A dictionary of version numbers to updater classes (e.g.,
+            ``ramrod.stix.STIX_UPDATERS``).
+        versions: An ordered tuple of all known language versions.
+        from_: The version to update from.
+        to_: The version to update to.
+
+    Attributes:
+        from_: The version the plan updates from.
+        to_: The version the plan updates to.
+        versions: A tuple of the versions of each hop in the plan.
+        schemalocs: A dictionary of source namespaces to ``(namespace,
+            schemalocation)`` tuples describing the composed schemalocation
+            update. A schemalocation of ``None`` means the original value is
+            retained. Namespaces mapped to ``None`` are removed.
+
+    Raises:
+        .InvalidVersionError: If `from_` or `to_` are not found in
+            `versions`, or `from_` is not older than `to_`.
+
+    """
+    def __init__(self, updaters, versions, from_, to_):
+        utils.validate_versions(from_, to_, versions)
+
+        idx = versions.index
+        self.from_ = from_
+        self.to_ = to_
+        self.versions = tuple(versions[idx(from_):idx(to_)])
+
+        self._updaters = tuple(updaters[x]() for x in self.versions)
+
+        for updater in self._updaters:
+            updater._defer_schemalocs()  # noqa
+
+        self.schemalocs = self._compose_schemalocs()
+
+    def _get_schemaloc_passes(self):
+        """Returns the updaters which update the ``xsi:schemaLocation``
+        attribute, in the order their updates are applied.
+
+        STIX updaters update CybOX schemalocations before their own.
+
+        """
+        passes = []
+
+        for updater in self._updaters:
+            cybox = getattr(updater, '_cybox_updater', None)
+
+            if cybox:
+                passes.append(cybox)
+
+            passes.append(updater)
+
+        return passes
+
+    def _compose_schemalocs(self):
+        """Composes the schemalocation updates of each hop into one
+        ``{namespace: (namespace, schemalocation)}`` dictionary.
+
+        Only namespaces that are mentioned by at least one hop are included.
+        Any other namespace is left untouched by every hop.
+
+        """
+        passes = self._get_schemaloc_passes()
+        known = set()
+
+        for updater in passes:
+            known.update(updater.DISALLOWED_NAMESPACES)
+            known.update(updater.UPDATE_NS_MAP)
+            known.update(updater.UPDATE_SCHEMALOC_MAP)
+
+        composed = {}
+
+        for ns in known:
+            updated_ns, updated_loc = ns, None
+
+            for updater in passes:
+                if updated_ns in updater.DISALLOWED_NAMESPACES:
+                    composed[ns] = None
+                    break
+
+                updated_ns = updater.UPDATE_NS_MAP.get(updated_ns, updated_ns)
+                updated_loc = updater.UPDATE_SCHEMALOC_MAP.get(
+                    updated_ns, updated_loc
+                )
+            else:
+                composed[ns] = (updated_ns, updated_loc)
+
+        return composed
+
+    def _update_schemalocs(self, root):
+        """Applies the composed schemalocation updates to the
+        ``xsi:schemaLocation`` attribute on `root`.
+
+        """
+        if xmlconst.TAG_SCHEMALOCATION not in root.attrib:
+            return
+
+        updated = []
+
+        for ns, loc in utils.get_schemaloc_pairs(root):
+            if ns not in self.schemalocs:
+                updated.append((ns, loc))
+                continue
+
+            remapped = self.schemalocs[ns]
+
+            if remapped is None:
+                continue
+
+            updated_ns, updated_loc = remapped
+            updated.append((updated_ns, updated_loc or loc))
+
+        updater = self._updaters[-1]
+        schemaloc = updater._create_schemaloc_str(updated)  # noqa
+        root.attrib[xmlconst.TAG_SCHEMALOCATION] = schemaloc
+
+    def update(self, doc, options=None, force=False, inplace=False):
+        """Updates `doc` by running each hop of the plan.
+
+        Args:
+            doc: A filename, file-like object, ``etree._Element``, or
+                ``etree._ElementTree``.
+            options (optional): A :class:`ramrod.UpdateOptions` instance. If
+                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+            force (boolean): Forces the update process. This may result in
+                content being removed during the update process and could
+                result in schema-invalid content.
+            inplace (boolean): If ``True``, `doc` is updated in place rather
+                than copied.
+
+        Returns:
+            An instance of ``ramrod.UpdateResults``.
+
+        Raises:
+            .UpdateError: If an untranslatable field or non-unique ID is
+                encountered and `force` is ``False``.
+            .InvalidVersionError: If the source document version does not
+                match `from_` and `force` is ``False``.
+            .UnknownVersionError: If the source document does not contain
+                version information and `force` is ``False``.
+
+        """
+        for result in self.iter_update(doc, options, force, inplace):
+            pass
+
+        return result
+
+    def iter_update(self, doc, options=None, force=False, inplace=False):
+        """Updates `doc` one hop at a time.
+
+        This is a generator which runs one hop of the plan each time it is
+        advanced and yields ``None``. Once every hop has run, it yields the
+        ``ramrod.UpdateResults`` of the update. Callers can stop the update
+        between hops by not advancing the generator.
+
+        See :meth:`update` for a description of the arguments and errors.
+
+        """
+        root = utils.get_etree_root(doc, make_copy=not inplace)
+        index = DocumentIndex(root)
+        removed, remapped = [], {}
+
+        for updater in self._updaters:
+            result = updater.update(
+                root, options=options, force=force, inplace=True, index=index
+            )
+            root = result.document.as_element()
+
+            # Update record of removed and remapped fields
+            removed.extend(result.removed)
+            remapped.update(result.remapped_ids)
+
+            yield None
+
+        self._update_schemalocs(root)
+
+        result = results.UpdateResults(
+            document=root,
+            removed=removed,
+            remapped_ids=remapped
+        )
+
+        yield result
+
+    def analyze(self, doc, options=None):
+        """Reports what updating `doc` with this plan would do, without
+        copying or modifying `doc`.
+
+        Every hop is analyzed against `doc` as it is, so the findings of hops
+        after the first do not reflect changes made by earlier hops. The
+        version of `doc` is only checked by the first hop.
+
+        Args:
+            doc: A filename, file-like object, ``etree._Element``, or
+                ``etree._ElementTree``.
+            options (optional): A :class:`ramrod.UpdateOptions` instance. If
+                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+
+        Returns:
+            A :class:`ramrod.analysis.AnalysisReport`.
+
+        """
+        root = utils.get_etree_root(doc)
+        options = options or DEFAULT_UPDATE_OPTIONS
+        index = DocumentIndex(root)
+        nodes = sum(1 for _ in root.iter('*'))
+
+        report = analysis.AnalysisReport(self.from_, self.to_, nodes)
+        versions = self.versions + (self.to_,)
+
+        for idx, updater in enumerate(self._updaters):
+            hop = analysis.HopReport(versions[idx], versions[idx + 1], nodes)
+
+            if idx == 0 and options.check_versions:
+                try:
+                    updater._check_version(root)  # noqa
+                except (errors.UnknownVersionError,
+                        errors.InvalidVersionError) as ex:
+                    hop.version_error = str(ex)
+
+            updater._analyze(root, options, hop, index=index)  # noqa
+            report.hops.append(hop)
+
+        return report
+
+    def __repr__(self):
+        return "%s(%r, %r)" % (type(self).__name__, self.from_, self.to_)
+
+
+__all__ = [
+    'UpdatePlan'
+]
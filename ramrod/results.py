@@ -13,7 +13,8 @@ class UpdateResults(object):
 
     Attributes:
         document: The updated document. An instance of
-            :class:`ramrod.ResultDocument`.
+            :class:`ramrod.ResultDocument`, or ``None`` if the updated
+            document was written out as it was updated.
         removed: Untranslatable nodes that were removed from the
             document. An instance of ``tuple``.
         remapped_ids: An ``{ id: [nodes] }`` dictionary where the key is a
@@ -35,7 +36,7 @@ class UpdateResults(object):
 
     @document.setter
     def document(self, value):
-        if isinstance(value, ResultDocument):
+        if value is None or isinstance(value, ResultDocument):
             self._document = value
         else:
             self._document = ResultDocument(value)
@@ -74,7 +75,7 @@ class ResultDocument(object):
 
 
     def __str__(self):
-        return text_type(self.as_stringio().getvalue())
+        return etree.tounicode(self._document, pretty_print=True)
 
 
     def as_element(self):
@@ -99,6 +100,43 @@ class ResultDocument(object):
         buf = etree.tounicode(self._document, pretty_print=True)
         return StringIO(buf)
 
+    def as_bytes(self, pretty=False, encoding='utf-8', xml_declaration=True):
+        """Returns the ``ResultDocument`` serialized as ``bytes``.
+
+        Args:
+            pretty (boolean): If ``True``, the document is pretty printed.
+            encoding (optional): The encoding of the serialized document.
+            xml_declaration (boolean): If ``True``, the serialized document
+                starts with an XML declaration.
+
+        """
+        return etree.tostring(
+            self._document,
+            pretty_print=pretty,
+            encoding=encoding,
+            xml_declaration=xml_declaration
+        )
+
+    def write(self, stream, pretty=False, encoding='utf-8',
+              xml_declaration=True):
+        """Serializes the ``ResultDocument`` directly to `stream`, without
+        building an intermediate string.
+
+        Args:
+            stream: A filename or binary file-like object.
+            pretty (boolean): If ``True``, the document is pretty printed.
+            encoding (optional): The encoding of the serialized document.
+            xml_declaration (boolean): If ``True``, the serialized document
+                starts with an XML declaration.
+
+        """
+        self._document.write(
+            stream,
+            pretty_print=pretty,
+            encoding=encoding,
+            xml_declaration=xml_declaration
+        )
+
 
 __all__ = [
     'ResultDocument',
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import sys
+import argparse
+import signal
+import threading
+
+# internal
+import ramrod
+import ramrod.server
+
+
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+
+
+def _print_error(fmt, *args):
+    """Writes a message to sys.stderr.
+
+    Args:
+        fmt: A Python format string.
+        *args: Variable-length argument list for the format string.
+
+    """
+    msg = fmt % args
+    sys.stderr.write("%s\n" % (msg))
+
+
+def _get_arg_parser():
+    """Returns an ArgumentParser instance for this script."""
+    desc = "Ramrod Server v{0}: Updates STIX and CybOX documents sent by " \
+           "ramrod_update.py --server."
+    desc = desc.format(ramrod.__version__)
+
+    parser = argparse.ArgumentParser(description=desc)
+
+    parser.add_argument(
+        "--listen",
+        required=True,
+        metavar="ADDRESS",
+        help="The path of a Unix domain socket to create, or a HOST:PORT TCP "
+             "address to listen on. TCP servers should only listen on "
+             "localhost."
+    )
+
+    parser.add_argument(
+        "--jobs",
+        default=None,
+        type=int,
+        metavar="N",
+        help="Update documents in N worker processes. Defaults to the number "
+             "of CPUs."
+    )
+
+    parser.add_argument(
+        "--max-size",
+        default=ramrod.server.DEFAULT_MAX_SIZE,
+        type=int,
+        metavar="BYTES",
+        help="Reject documents larger than BYTES bytes."
+    )
+
+    parser.add_argument(
+        "--max-tasks-per-child",
+        default=None,
+        type=int,
+        metavar="N",
+        help="Replace each worker process after it has updated N documents."
+    )
+
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        default=False,
+        help="Log each request to stderr."
+    )
+
+    return parser
+
+
+def _validate_args(args):
+    """Validates the input command-line arguments.
+
+    """
+    if args.jobs is not None and args.jobs < 1:
+        raise ValueError("--jobs must be at least 1.")
+
+    if args.max_size < 1:
+        raise ValueError("--max-size must be at least 1.")
+
+
+def main():
+    parser = _get_arg_parser()
+    args = parser.parse_args()
+
+    try:
+        _validate_args(args)
+
+        server = ramrod.server.UpdateServer(
+            ramrod.server.parse_address(args.listen),
+            jobs=args.jobs,
+            max_size=args.max_size,
+            max_tasks_per_child=args.max_tasks_per_child,
+            verbose=args.verbose
+        )
+    except (ValueError, IOError, OSError) as ex:
+        _print_error("[!] %s", str(ex))
+        sys.exit(EXIT_FAILURE)
+
+    # shutdown() blocks until serve_forever() returns, so it is called
+    # from another thread.
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,15 @@
 # builtin
 import sys
 import argparse
+import json
 import os.path
+import tempfile
 
 # internal
 import ramrod
 import ramrod.errors as errors
+import ramrod.parallel
+import ramrod.server
 
 # external
 from six import iteritems, PY2
@@ -36,22 +40,225 @@ def _print_error(fmt, *args):
     sys.stderr.write("%s\n" % (msg))
 
 
+def _get_output(outfn=None):
+    """Returns `outfn` or, if `outfn` is ``None``, a binary sys.stdout
+    stream.
+
+    """
+    if outfn:
+        return outfn
+
+    if PY2:
+        return sys.stdout
+
+    return sys.stdout.buffer
+
+
 def _write_xml(document, outfn=None):
     """Writes the XML tree to an output stream. If `outfn` is ``None``,
     sys.stdout is written to.
 
     Args:
-        tree: A :class:`ramrod.ResultDocument` instance.
+        document: A :class:`ramrod.ResultDocument` instance.
+
+    """
+    out = _get_output(outfn)
+    document.write(out, pretty=True)
+
+
+def _get_outfn(args, infile):
+    """Returns the output filename for the updated `infile` document, or
+    ``None`` if it should be written to stdout.
+
+    """
+    if not args.outdir:
+        return args.outfile
+
+    return os.path.join(args.outdir, os.path.basename(infile))
+
+
+def _write_bytes(data, outfn=None):
+    """Writes the serialized XML document `data` to `outfn`. If `outfn` is
+    ``None``, sys.stdout is written to.
+
+    """
+    if not outfn:
+        _get_output().write(data)
+        return
+
+    with open(outfn, 'wb') as out:
+        out.write(data)
+
+
+def _update_stream(args, options, infile, outfn=None):
+    """Updates `infile` a few components at a time, writing the updated
+    document to `outfn` or, if `outfn` is ``None``, to sys.stdout.
+
+    The document is written to a temporary file beside `outfn`, which
+    replaces `outfn` only if the update succeeds. If the update fails, the
+    temporary file is removed and `outfn` is left as it was.
+
+    """
+    kwargs = dict(
+        from_=args.from_,
+        to_=args.to_,
+        options=options,
+        force=args.force,
+        jobs=args.jobs
+    )
+
+    if not outfn:
+        return ramrod.update_stream(infile, _get_output(), **kwargs)
+
+    fd, tmpfn = tempfile.mkstemp(
+        dir=os.path.dirname(outfn) or os.curdir,
+        suffix='.tmp'
+    )
+
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            updated = ramrod.update_stream(infile, out, **kwargs)
+
+        # mkstemp() creates the file readable only by its owner.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmpfn, 0o666 & ~umask)
+
+        if PY2:
+            os.rename(tmpfn, outfn)
+        else:
+            os.replace(tmpfn, outfn)
+    except BaseException:
+        os.remove(tmpfn)
+        raise
+
+    return updated
+
+
+def _print_document_error(err):
+    """Prints information about an error which stopped the update of one of
+    several input documents.
+
+    Args:
+        err: The error found on a :class:`ramrod.parallel.ParallelResult`.
+
+    """
+    if isinstance(err, errors.UpdateError):
+        _print_update_error(err)
+    elif isinstance(err, errors.InvalidVersionError):
+        _print_invalid_version_error(err)
+    else:
+        _print_error("[!] %s", str(err))
+
+
+def _update_remote(args, options, infiles):
+    """Updates each input file with the ramrod_server.py server listening on
+    ``args.server``.
+
+    Yields:
+        A :class:`ramrod.parallel.ParallelResult` for each input file.
 
     """
+    client = ramrod.server.Client(args.server)
+
+    try:
+        for index, infile in enumerate(infiles):
+            try:
+                updated = client.update(
+                    infile,
+                    from_=args.from_,
+                    to_=args.to_,
+                    options=options,
+                    force=args.force,
+                    pretty=True
+                )
+            except (errors.UpdateError, errors.InvalidVersionError,
+                    errors.UnknownVersionError, SyntaxError) as ex:
+                yield ramrod.parallel.ParallelResult(index, infile, error=ex)
+                continue
+
+            yield ramrod.parallel.ParallelResult(
+                index,
+                infile,
+                updated.document,
+                updated.removed,
+                updated.remapped_ids
+            )
+    finally:
+        client.close()
+
+
+def _update_files(args, options):
+    """Updates each input file in a pool of ``args.jobs`` worker processes,
+    or with the server at ``args.server``.
+
+    Returns:
+        ``True`` if every input file was updated.
+
+    """
+    infiles = args.infile
+
     if PY2:
-        bin_stdout = sys.stdout
+        encoding = sys.getfilesystemencoding()
+        infiles = [x.decode(encoding) for x in infiles]
+
+    if args.server:
+        updated = _update_remote(args, options, infiles)
     else:
-        bin_stdout = sys.stdout.buffer
+        updated = ramrod.parallel.update(
+            infiles,
+            jobs=args.jobs or 1,
+            from_=args.from_,
+            to_=args.to_,
+            options=options,
+            force=args.force,
+            pretty=True
+        )
+
+    success = True
+
+    for result in updated:
+        if result.error is not None:
+            _print_error("[!] Unable to update '%s'", result.filename)
+            _print_document_error(result.error)
+            success = False
+            continue
 
-    out = outfn or bin_stdout
-    tree = document.as_element_tree()
-    tree.write(out, pretty_print=True)
+        _write_bytes(result.document, _get_outfn(args, result.filename))
+        _write_removed(result.removed)
+        _write_remapped_ids(result.remapped_ids)
+
+    return success
+
+
+def _analyze_files(args, options):
+    """Writes a JSON report of what updating each input file would do to
+    stdout, one line per input file. No input file is updated.
+
+    Returns:
+        ``True`` if every input file was analyzed.
+
+    """
+    success = True
+
+    for infile in args.infile:
+        try:
+            report = ramrod.analyze(
+                infile,
+                from_=args.from_,
+                to_=args.to_,
+                options=options
+            )
+        except errors.DOCUMENT_ERRORS as ex:
+            summary = {'file': infile, 'error': str(ex)}
+            success = False
+        else:
+            summary = report.as_dict()
+            summary['file'] = infile
+
+        print(json.dumps(summary, sort_keys=True))
+
+    return success
 
 
 def _print_update_error(err):
@@ -174,7 +381,8 @@ def _get_arg_parser():
         "--infile",
         default=None,
         required=True,
-        help="Input STIX/CybOX document filename."
+        nargs="+",
+        help="Input STIX/CybOX document filename(s)."
     )
 
     parser.add_argument(
@@ -184,6 +392,33 @@ def _get_arg_parser():
              "provided."
     )
 
+    parser.add_argument(
+        "--outdir",
+        default=None,
+        help="Output directory for the updated documents. Output files are "
+             "named after their input files. Required when more than one "
+             "input file is provided."
+    )
+
+    parser.add_argument(
+        "--jobs",
+        default=None,
+        type=int,
+        metavar="N",
+        help="Update the input files in N worker processes. With --stream, "
+             "the components of the input file are updated in N worker "
+             "processes."
+    )
+
+    parser.add_argument(
+        "--server",
+        default=None,
+        metavar="ADDRESS",
+        help="Send the input files to the ramrod_server.py server listening "
+             "on ADDRESS, a Unix domain socket path or HOST:PORT, rather "
+             "than updating them in this process."
+    )
+
     parser.add_argument(
         "--from",
         default=None,
@@ -218,6 +453,24 @@ def _get_arg_parser():
              "releases."
     )
 
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=False,
+        help="Update the document a few components at a time, writing the "
+             "output as it is updated. This limits memory use for very large "
+             "documents, but each component repeats the namespace "
+             "declarations of the document, so the output is larger."
+    )
+
+    parser.add_argument(
+        "--analyze",
+        action="store_true",
+        default=False,
+        help="Do not update the input files. Instead, print a JSON report of "
+             "what updating each input file would do, one line per file."
+    )
+
     parser.add_argument(
         "-f",
         "--force",
@@ -230,16 +483,71 @@ def _get_arg_parser():
     return parser
 
 
+def _validate_outfiles(args):
+    """Checks that no two input files are written to the same output file,
+    and that no input file is overwritten by an output file.
+
+    """
+    infiles = dict((os.path.realpath(x), x) for x in args.infile)
+    outfiles = {}
+
+    for infile in args.infile:
+        outfn = _get_outfn(args, infile)
+
+        if not outfn:
+            continue
+
+        outpath = os.path.realpath(outfn)
+
+        if outpath in infiles:
+            error = "Output file '%s' would overwrite input file '%s'."
+            raise ValueError(error % (outfn, infiles[outpath]))
+
+        if outpath in outfiles and outfiles[outpath] != infile:
+            error = "Input files '%s' and '%s' would both be written to '%s'."
+            raise ValueError(error % (outfiles[outpath], infile, outfn))
+
+        outfiles[outpath] = infile
+
+
 def _validate_args(args):
     """Validates the input command-line arguments.
 
     """
-    infile = args.infile
+    for infile in args.infile:
+        if not os.path.exists(infile):
+            raise ValueError("Input file '%s' does not exist." % infile)
+
+    if args.analyze:
+        if args.stream or args.jobs or args.server:
+            raise ValueError(
+                "--analyze cannot be used with --stream, --jobs or --server."
+            )
+
+        if args.outfile or args.outdir:
+            raise ValueError("--analyze cannot be used with --outfile or --outdir.")
 
-    if os.path.exists(infile):
         return
 
-    raise ValueError("Input file '%s' does not exist." % infile)
+    if len(args.infile) > 1 and not args.outdir:
+        raise ValueError("--outdir is required for multiple input files.")
+
+    if args.outdir and args.outfile:
+        raise ValueError("--outfile and --outdir cannot be used together.")
+
+    if args.stream and len(args.infile) > 1:
+        raise ValueError("--stream can only be used with one input file.")
+
+    if args.outdir and not os.path.isdir(args.outdir):
+        raise ValueError("Output directory '%s' does not exist." % args.outdir)
+
+    _validate_outfiles(args)
+
+    if args.jobs is not None and args.jobs < 1:
+        raise ValueError("--jobs must be at least 1.")
+
+    if args.server and (args.stream or args.jobs):
+        raise ValueError("--server cannot be used with --stream or --jobs.")
 
 
 def main():
@@ -253,17 +561,34 @@ def main():
         # Build UpdateOptions from commandline arguments
         options = _get_options(args)
 
+        if args.analyze:
+            if not _analyze_files(args, options):
+                sys.exit(EXIT_FAILURE)
+            return
+
         # Run the update process.
-        updated = ramrod.update(
-            args.infile,
-            from_=args.from_,
-            to_=args.to_,
-            options=options,
-            force=args.force
-        )
+        if args.server or (not args.stream and (args.jobs or len(args.infile) > 1)):
+            if not _update_files(args, options):
+                sys.exit(EXIT_FAILURE)
+            return
+
+        infile = args.infile[0]
+        outfn = _get_outfn(args, infile)
+
+        if args.stream:
+            updated = _update_stream(args, options, infile, outfn)
+        else:
+            updated = ramrod.update(
+                infile,
+                from_=args.from_,
+                to_=args.to_,
+                options=options,
+                force=args.force
+            )
+
+            _write_xml(updated.document, outfn)
 
         # Write results
-        _write_xml(updated.document, args.outfile)
         _write_removed(updated.removed)
         _write_remapped_ids(updated.remapped_ids)
 
@@ -276,6 +601,14 @@ def main():
     except errors.UnknownVersionError as ex:
         _print_unknown_version_error(str(ex))
         sys.exit(EXIT_FAILURE)
+    except errors.ServerError as ex:
+        _print_error("[!] Server error: %s", str(ex))
+        sys.exit(EXIT_FAILURE)
+    except (IOError, OSError) as ex:
+        if not args.server:
+            raise
+        _print_error("[!] Unable to reach server '%s': %s", args.server, ex)
+        sys.exit(EXIT_FAILURE)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
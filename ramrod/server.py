@@ -0,0 +1,655 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import json
+import multiprocessing
+import os
+import socket
+
+# external
+from six import BytesIO, binary_type, iteritems, string_types
+from six.moves import BaseHTTPServer, http_client, socketserver
+from six.moves.urllib.parse import parse_qs, urlencode, urlparse
+
+# internal
+import ramrod
+from ramrod import errors, parallel
+from ramrod.parallel import summarize_error, summarize_results
+from ramrod.version import __version__
+
+
+# The path which update requests are POSTed to.
+UPDATE_PATH = '/update'
+
+# The response header which holds the length of the JSON summary at the
+# start of a successful response body. The updated document follows it.
+SUMMARY_LENGTH_HEADER = 'X-Ramrod-Summary-Length'
+
+# The largest request body accepted by default (16 MiB).
+DEFAULT_MAX_SIZE = 16 * 1024 * 1024
+
+# Query string options which are passed to ``ramrod.UpdateOptions``.
+_OPTION_FLAGS = ('check_versions', 'update_vocabularies', 'remove_optionals')
+
+# The size of the chunks in which oversized request bodies are discarded.
+_DISCARD_SIZE = 64 * 1024
+
+_TRUE = ('1', 'true', 'yes')
+_FALSE = ('0', 'false', 'no')
+
+
+def parse_address(address):
+    """Returns the socket address described by the `address` string.
+
+    Example:
+        >>> parse_address("localhost:8080")
+        ('localhost', 8080)
+        >>> parse_address("/tmp/ramrod.sock")
+        '/tmp/ramrod.sock'
+
+    Args:
+        address: A ``host:port`` TCP address or the path of a Unix domain
+            socket.
+
+    Returns:
+        A ``(host, port)`` tuple for TCP addresses or the socket path.
+
+    """
+    host, sep, port = address.rpartition(':')
+
+    if sep and host and port.isdigit() and '/' not in address:
+        return (host, int(port))
+
+    return address
+
+
+def _node_to_json(summary):
+    """Returns a JSON-ready dictionary for a
+    :class:`ramrod.parallel.NodeSummary`.
+
+    """
+    if summary is None:
+        return None
+
+    return {
+        'tag': summary.tag,
+        'sourceline': summary.sourceline,
+        'attrib': summary.attrib
+    }
+
+
+def _node_from_json(data):
+    """Returns a :class:`ramrod.parallel.NodeSummary` for a dictionary
+    returned by :meth:`_node_to_json`.
+
+    """
+    if data is None:
+        return None
+
+    return parallel.NodeSummary(data['tag'], data['sourceline'], data['attrib'])
+
+
+def _nodes_to_json(ids):
+    """Returns a JSON-ready copy of an ``{ id: [summaries] }`` dictionary."""
+    return dict(
+        (id_, [_node_to_json(x) for x in nodes]) for id_, nodes in iteritems(ids)
+    )
+
+
+def _nodes_from_json(ids):
+    """Returns an ``{ id: [summaries] }`` dictionary for a dictionary
+    returned by :meth:`_nodes_to_json`.
+
+    """
+    return dict(
+        (id_, [_node_from_json(x) for x in nodes]) for id_, nodes in iteritems(ids)
+    )
+
+
+def _error_to_json(ex):
+    """Returns a JSON-ready dictionary describing `ex`, an error returned by
+    :meth:`ramrod.parallel.summarize_error`.
+
+    """
+    data = {'error': type(ex).__name__, 'message': str(ex)}
+
+    if isinstance(ex, errors.UpdateError):
+        if ex.disallowed is not None:
+            data['disallowed'] = [_node_to_json(x) for x in ex.disallowed]
+        if ex.duplicates is not None:
+            data['duplicates'] = _nodes_to_json(ex.duplicates)
+    elif isinstance(ex, errors.InvalidVersionError):
+        data['node'] = _node_to_json(ex.node)
+        data['expected'] = ex.expected
+        data['found'] = ex.found
+    elif isinstance(ex, SyntaxError):
+        data['message'] = ex.msg
+        data['lineno'] = ex.lineno
+        data['offset'] = ex.offset
+
+    return data
+
+
+def _error_from_json(data):
+    """Returns the error described by a dictionary returned by
+    :meth:`_error_to_json`.
+
+    """
+    name, message = data.get('error'), data.get('message')
+
+    if name == 'UpdateError':
+        disallowed = data.get('disallowed')
+        duplicates = data.get('duplicates')
+
+        if disallowed is not None:
+            disallowed = [_node_from_json(x) for x in disallowed]
+        if duplicates is not None:
+            duplicates = _nodes_from_json(duplicates)
+
+        return errors.UpdateError(message, disallowed, duplicates)
+
+    if name == 'InvalidVersionError':
+        return errors.InvalidVersionError(
+            message,
+            _node_from_json(data.get('node')),
+            data.get('expected'),
+            data.get('found')
+        )
+
+    if name == 'UnknownVersionError':
+        return errors.UnknownVersionError(message)
+
+    if name == 'SyntaxError':
+        position = (None, data.get('lineno'), data.get('offset'), None)
+        return SyntaxError(message, position)
+
+    return errors.ServerError(message)
+
+
+def _get_flag(query, name, default):
+    """Returns the boolean value of the `name` query string parameter."""
+    values = query.get(name)
+
+    if not values:
+        return default
+
+    value = values[-1].lower()
+
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+
+    raise ValueError("Invalid value for '%s': '%s'" % (name, values[-1]))
+
+
+def _parse_query(query):
+    """Returns the update settings for an update request query string.
+
+    Returns:
+        A ``(from_, to_, flags, force, pretty)`` tuple, where `flags` is a
+        dictionary of ``UpdateOptions`` attribute names to values.
+
+    Raises:
+        ValueError: If a query string parameter value is invalid.
+
+    """
+    query = parse_qs(query)
+
+    from_ = query.get('from', [None])[-1]
+    to_ = query.get('to', [None])[-1]
+    force = _get_flag(query, 'force', False)
+    pretty = _get_flag(query, 'pretty', False)
+    flags = dict((x, _get_flag(query, x, True)) for x in _OPTION_FLAGS)
+
+    return from_, to_, flags, force, pretty
+
+
+def _init_worker():
+    """Compiles the update plans to the latest version of each language, so
+    that the first requests a worker serves are not slowed down by plan
+    compilation.
+
+    """
+    import ramrod.cybox
+    import ramrod.stix
+
+    for package, versions in ((ramrod.stix, ramrod.stix.STIX_VERSIONS),
+                              (ramrod.cybox, ramrod.cybox.CYBOX_VERSIONS)):
+        for version in versions[:-1]:
+            package.get_plan(version)
+
+
+def _update(task):
+    """Updates the document in `task` in a worker process.
+
+    Args:
+        task: A ``(data, from_, to_, flags, force, pretty)`` tuple. See
+            :meth:`_parse_query`.
+
+    Returns:
+        A ``(summary, document)`` tuple. The `summary` is a JSON-ready
+        dictionary of the removed and remapped nodes, or of the error which
+        stopped the update, in which case `document` is ``None``.
+
+    """
+    data, from_, to_, flags, force, pretty = task
+
+    options = ramrod.UpdateOptions()
+
+    for name, value in iteritems(flags):
+        setattr(options, name, value)
+
+    try:
+        updated = ramrod.update(
+            BytesIO(data),
+            from_=from_,
+            to_=to_,
+            options=options,
+            force=force
+        )
+    except errors.DOCUMENT_ERRORS as ex:
+        return _error_to_json(summarize_error(ex)), None
+
+    removed, remapped = summarize_results(updated)
+
+    summary = {
+        'removed': [_node_to_json(x) for x in removed],
+        'remapped_ids': _nodes_to_json(remapped)
+    }
+
+    return summary, updated.document.as_bytes(pretty=pretty)
+
+
+class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Handles the update requests of an :class:`UpdateServer`."""
+    server_version = "ramrod/%s" % __version__
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # Unix domain socket clients have no address.
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+
+        return 'unix'
+
+    def log_message(self, fmt, *args):
+        if self.server.update_server.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, fmt, *args)
+
+    def _send(self, code, body, content_type, headers=None):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+
+        for name, value in iteritems(headers or {}):
+            self.send_header(name, value)
+
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, code, data):
+        body = json.dumps(data).encode('utf-8')
+        self._send(code, body, 'application/json')
+
+    def _send_error(self, code, message):
+        self._send_json(code, {'error': 'ServerError', 'message': message})
+
+    def _discard(self, length):
+        """Reads and discards `length` bytes of the request body."""
+        while length > 0:
+            chunk = self.rfile.read(min(length, _DISCARD_SIZE))
+
+            if not chunk:
+                break
+
+            length -= len(chunk)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+
+        if url.path != UPDATE_PATH:
+            self.close_connection = True
+            self._send_error(404, "Unknown path: '%s'" % url.path)
+            return
+
+        try:
+            length = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            self.close_connection = True
+            self._send_error(411, "A valid Content-Length is required.")
+            return
+
+        if length < 0:
+            # The end of the body cannot be found, so the connection cannot
+            # be reused.
+            self.close_connection = True
+            self._send_error(400, "Content-Length cannot be negative.")
+            return
+
+        max_size = self.server.update_server.max_size
+
+        if length > max_size:
+            # The body is discarded so that the client, which sends the whole
+            # body before it reads the response, can read the error.
+            self._discard(length)
+            self._send_error(413, "Documents are limited to %d bytes." % max_size)
+            return
+
+        data = self.rfile.read(length)
+
+        try:
+            settings = _parse_query(url.query)
+        except ValueError as ex:
+            self._send_error(400, str(ex))
+            return
+
+        try:
+            summary, document = self.server.update_server.submit(data, settings)
+        except Exception as ex:
+            # Errors other than those of the document (e.g., a bug in an
+            # updater) must still be answered, or the client sees a dropped
+            # connection and sends the document again.
+            self.log_error("Unable to update document: %r", ex)
+            self._send_error(500, "Unable to update the document: %s" % ex)
+            return
+
+        if document is None:
+            code = 400 if summary['error'] == 'SyntaxError' else 422
+            self._send_json(code, summary)
+            return
+
+        summary = json.dumps(summary).encode('utf-8')
+        headers = {SUMMARY_LENGTH_HEADER: str(len(summary))}
+        self._send(200, summary + document, 'application/xml', headers)
+
+
+class _TCPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class UpdateServer(object):
+    """A long-running service which updates STIX and CybOX documents sent to
+    it over HTTP, keeping its update plans compiled between requests.
+
+    Requests are read by a thread per connection and updated in a pool of
+    `jobs` worker processes. Documents are POSTed to :data:`UPDATE_PATH`
+    with the update settings in the query string:
+
+    * ``from``, ``to``: The versions to update from and to.
+    * ``force``, ``pretty``: ``1`` or ``0``. Both default to ``0``.
+    * ``check_versions``, ``update_vocabularies``, ``remove_optionals``:
+      ``1`` or ``0``. These set the :class:`ramrod.UpdateOptions`
+      attributes of the same name and default to ``1``.
+
+    A successful response body holds a JSON summary of the removed and
+    remapped nodes, followed by the updated document. The length of the
+    summary is sent in the :data:`SUMMARY_LENGTH_HEADER` header. Documents
+    which cannot be updated receive a JSON description of the error with a
+    ``400`` (unparsable input) or ``422`` status. Unexpected errors raised
+    while updating a document receive a ``500`` status. Use :class:`Client`
+    to send requests.
+
+    Args:
+        address: A ``(host, port)`` tuple to listen on a TCP socket, or the
+            path of a Unix domain socket to create. See
+            :meth:`parse_address`.
+        jobs (optional): The number of worker processes. If ``None``, the
+            number of CPUs is used.
+        max_size (optional): The largest document, in bytes, which is
+            accepted.
+        max_tasks_per_child (optional): The number of documents a worker
+            process updates before it is replaced with a new process.
+        verbose (boolean): If ``True``, requests are logged to stderr.
+
+    Note:
+        The server performs no authentication. TCP servers should only
+        listen on the loopback interface.
+
+    """
+    def __init__(self, address, jobs=None, max_size=DEFAULT_MAX_SIZE,
+                 max_tasks_per_child=None, verbose=False):
+        self.max_size = max_size
+        self.verbose = verbose
+
+        # The pool is started before the server threads.
+        self._pool = multiprocessing.Pool(
+            processes=jobs,
+            initializer=_init_worker,
+            maxtasksperchild=max_tasks_per_child
+        )
+
+        try:
+            if isinstance(address, string_types):
+                self._server = _UnixServer(address, _RequestHandler)
+            else:
+                self._server = _TCPServer(address, _RequestHandler)
+        except Exception:
+            self._pool.terminate()
+            raise
+
+        self._server.update_server = self
+
+    @property
+    def address(self):
+        """The address the server is listening on. If the server was created
+        with a TCP port of ``0``, this holds the assigned port.
+
+        """
+        return self._server.server_address
+
+    def submit(self, data, settings):
+        """Updates the document `data` in a worker process, blocking until
+        it is updated.
+
+        Args:
+            data: The ``bytes`` content of the document.
+            settings: The update settings returned by :meth:`_parse_query`.
+
+        Returns:
+            The ``(summary, document)`` tuple returned by :meth:`_update`.
+
+        """
+        return self._pool.apply(_update, ((data,) + tuple(settings),))
+
+    def serve_forever(self):
+        """Handles requests until :meth:`shutdown` is called."""
+        self._server.serve_forever()
+
+    def shutdown(self):
+        """Stops :meth:`serve_forever`. This must be called from another
+        thread.
+
+        """
+        self._server.shutdown()
+
+    def close(self):
+        """Closes the listening socket and stops the worker processes."""
+        self._server.server_close()
+        self._pool.terminate()
+        self._pool.join()
+
+        if isinstance(self.address, string_types) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class ServerResult(object):
+    """The result of updating a document with an :class:`UpdateServer`.
+
+    Attributes:
+        document: The serialized updated document (``bytes``).
+        removed: A list of :class:`ramrod.parallel.NodeSummary` instances for
+            the nodes which were removed from the document.
+        remapped_ids: An ``{ id: [summaries] }`` dictionary where the key is
+            a non-unique ID found in the input document and the values are
+            :class:`ramrod.parallel.NodeSummary` instances for the nodes
+            which were assigned new IDs.
+
+    """
+    def __init__(self, document, removed=None, remapped_ids=None):
+        self.document = document
+        self.removed = removed or []
+        self.remapped_ids = remapped_ids or {}
+
+
+class _UnixHTTPConnection(http_client.HTTPConnection):
+    """An ``HTTPConnection`` to a Unix domain socket."""
+    def __init__(self, path, timeout=None):
+        http_client.HTTPConnection.__init__(self, 'localhost')
+        self._path = path
+        self._timeout = timeout
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        sock.connect(self._path)
+        self.sock = sock
+
+
+class Client(object):
+    """Sends documents to an :class:`UpdateServer`.
+
+    The connection to the server is kept open between requests. Instances
+    must not be shared between threads.
+
+    Args:
+        address: The server address. See :meth:`parse_address`.
+        timeout (optional): The socket timeout in seconds. If ``None``,
+            requests wait for the server indefinitely.
+
+    """
+    def __init__(self, address, timeout=None):
+        if isinstance(address, string_types):
+            address = parse_address(address)
+
+        self.address = address
+        self.timeout = timeout
+        self._conn = None
+
+    def _connect(self):
+        if isinstance(self.address, string_types):
+            return _UnixHTTPConnection(self.address, self.timeout)
+
+        host, port = self.address
+        return http_client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _post(self, path, data):
+        """POSTs `data` to `path` and returns the response. A closed
+        keep-alive connection is reopened once.
+
+        """
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = self._connect()
+
+            try:
+                self._conn.request('POST', path, data)
+                response = self._conn.getresponse()
+                body = response.read()
+            except (http_client.BadStatusLine, socket.error):
+                self.close()
+
+                if attempt == 2:
+                    raise
+                continue
+
+            if response.getheader('Connection', '').lower() == 'close':
+                self.close()
+
+            return response, body
+
+    def update(self, doc, from_=None, to_=None, options=None, force=False,
+               pretty=False):
+        """Updates a STIX or CybOX document with the server.
+
+        Args:
+            doc: The ``bytes`` content of a document, a filename, or a
+                file-like object.
+            from_ (optional, string): The version to update from. If not
+                specified, the server reads the version from the document.
+            to_ (optional, string): The version to update to. If not
+                specified, the latest language version is assumed.
+            options (optional): A :class:`ramrod.UpdateOptions` instance.
+                The ``new_id_func`` attribute is ignored.
+            force (boolean): Attempt to force the update process if the
+                document contains untranslatable fields.
+            pretty (boolean): If ``True``, the updated document is pretty
+                printed.
+
+        Returns:
+            A :class:`ServerResult` instance.
+
+        Raises:
+            .UpdateError: If an untranslatable field or non-unique ID is
+                found and `force` is ``False``.
+            .InvalidVersionError: If the document version is invalid.
+            .UnknownVersionError: If `from_` was not specified and the
+                document does not contain a version attribute.
+            SyntaxError: If the document cannot be parsed.
+            .ServerError: If the server rejected the request.
+
+        """
+        if isinstance(doc, string_types):
+            with open(doc, 'rb') as f:
+                doc = f.read()
+        elif not isinstance(doc, binary_type):
+            doc = doc.read()
+
+        options = options or ramrod.DEFAULT_UPDATE_OPTIONS
+        query = [('force', int(force)), ('pretty', int(pretty))]
+        query.extend((x, int(getattr(options, x))) for x in _OPTION_FLAGS)
+
+        if from_:
+            query.append(('from', from_))
+        if to_:
+            query.append(('to', to_))
+
+        path = "%s?%s" % (UPDATE_PATH, urlencode(query))
+        response, body = self._post(path, doc)
+
+        if response.status != 200:
+            try:
+                data = json.loads(body.decode('utf-8'))
+            except ValueError:
+                data = {'message': body.decode('utf-8', 'replace')}
+
+            error = _error_from_json(data)
+
+            if isinstance(error, errors.ServerError):
+                error.status = response.status
+
+            raise error
+
+        length = int(response.getheader(SUMMARY_LENGTH_HEADER))
+        summary = json.loads(body[:length].decode('utf-8'))
+
+        return ServerResult(
+            document=body[length:],
+            removed=[_node_from_json(x) for x in summary['removed']],
+            remapped_ids=_nodes_from_json(summary['remapped_ids'])
+        )
+
+    def close(self):
+        """Closes the connection to the server."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+__all__ = [
+    'Client',
+    'DEFAULT_MAX_SIZE',
+    'SUMMARY_LENGTH_HEADER',
+    'ServerResult',
+    'UPDATE_PATH',
+    'UpdateServer',
+    'parse_address'
+]
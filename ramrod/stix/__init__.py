@@ -3,9 +3,11 @@
 
 # stdlib
 import itertools
+import threading
 
 # internal
-from ramrod import utils, results
+from ramrod import stream, utils
+from ramrod.plan import UpdatePlan
 
 # relative
 from . import common
@@ -18,7 +20,8 @@ def get_version(doc):
     return BaseSTIXUpdater.get_version(root)
 
 
-def update(doc, from_=None, to_=None, options=None, force=False):
+def update(doc, from_=None, to_=None, options=None, force=False,
+           inplace=False):
     """Updates a STIX document to align with a given version of the STIX
     Language schemas.
 
@@ -35,6 +38,10 @@ def update(doc, from_=None, to_=None, options=None, force=False):
         force (boolean): Forces the update process. This may result in content
             being removed during the update process and could result in
             schema-invalid content. **Use at your own risk!**
+        inplace (boolean): If ``True``, an ``etree._Element`` or
+            ``etree._ElementTree`` `doc` is updated in place instead of being
+            copied. The input document is copied at most once, regardless of
+            how many version hops the update spans.
 
     Returns:
         An instance of ``ramrod.UpdateResults``.
@@ -51,39 +58,174 @@ def update(doc, from_=None, to_=None, options=None, force=False):
             version information and `force` is ``False``.
 
     """
-    root = utils.get_etree_root(doc)
-    versions = common.STIX_VERSIONS
+    # Copy the input once up front. Each version hop then works directly on
+    # the private copy rather than copying the document again.
+    root = utils.get_etree_root(doc, make_copy=not inplace)
     from_ = from_ or BaseSTIXUpdater.get_version(root)
-    to_ = to_ or versions[-1]  # The latest version if not specified
+    plan = get_plan(from_, to_)
+
+    return plan.update(root, options=options, force=force, inplace=True)
+
+
+def update_stream(doc, output, from_=None, to_=None, options=None,
+                  force=False, jobs=None):
+    """Updates a STIX document one top-level component at a time and writes
+    the updated document to `output`.
 
-    utils.validate_versions(from_, to_, versions)
+    The children of the ``STIX_Package`` root (e.g., ``STIX_Header``) and the
+    children of the component lists found in ``STREAM_CONTAINERS`` (e.g.,
+    each ``stix:Indicator`` under ``stix:Indicators``) are updated separately
+    from the rest of the document and written as soon as they have been
+    parsed. This bounds memory use by the size of a small batch of
+    components rather than by the whole document.
+
+    See :meth:`ramrod.stream.update` for details.
+
+    Args:
+        doc: A STIX document filename or file-like object.
+        output: A filename or file-like object to write the updated document
+            to.
+        from_ (optional, string): The base version for the update process. If
+            ``None``, an attempt will be made to extract the version number
+            from `doc`.
+        to_ (optional, string): The version to update to. If ``None``, the
+            latest version of STIX is assumed.
+        options (optional): A :class:`ramrod.UpdateOptions` instance. If
+            ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+        force (boolean): Forces the update process. This may result in content
+            being removed during the update process and could result in
+            schema-invalid content. **Use at your own risk!**
+        jobs (optional): The number of worker processes which update the
+            components of the document. If ``None``, the document is
+            updated in this process.
 
-    removed, remapped = [], {}
-    idx = versions.index
+    Returns:
+        An instance of ``ramrod.UpdateResults``. The ``document`` attribute
+        is ``None``.
 
-    for version in versions[idx(from_):idx(to_)]:
-        updater   = STIX_UPDATERS[version]
-        result    = updater().update(root, options=options, force=force)
-        root      = result.document.as_element()
+    Raises:
+        .UpdateError: If any of the following conditions are encountered:
 
-        removed.extend(result.removed)
-        remapped.update(result.remapped_ids)
+            * The `from_` or `to_` versions are invalid.
+            * The root node of `doc` is not a ``STIX_Package``.
+            * An untranslatable field is encountered and `force` is ``False``.
+            * A non-unique ID is encountered and `force` is ``False``.
+        .InvalidVersionError: If the source document version and the
+            `from_` value do not match and `force` is ``False``.
+        .UnknownVersionError: If the source document does not contain
+            version information and `force` is ``False``.
 
-    result = results.UpdateResults(
-        document=root,
-        removed=removed,
-        remapped_ids=remapped
+    """
+    return stream.update(
+        doc,
+        output,
+        from_=from_,
+        to_=to_,
+        options=options,
+        force=force,
+        jobs=jobs,
+        roots=('STIX_Package',)
     )
 
-    return result
 
+def get_plan(from_, to_=None):
+    """Returns an :class:`ramrod.plan.UpdatePlan` for updating STIX content
+    from `from_` to `to_`.
+
+    Plans are cached, so repeated calls for the same version pair return the
+    same instance.
+
+    Args:
+        from_: The version to update from.
+        to_ (optional): The version to update to. If ``None``, the latest
+            version of STIX is assumed.
+
+    Raises:
+        .InvalidVersionError: If `from_` or `to_` are invalid.
+
+    """
+    to_ = to_ or LATEST_VERSION
+    key = (from_, to_)
+
+    try:
+        return _PLANS[key]
+    except KeyError:
+        pass
+
+    with _CACHE_LOCK:
+        if key not in _PLANS:
+            _PLANS[key] = UpdatePlan(STIX_UPDATERS, STIX_VERSIONS, from_, to_)
+
+        return _PLANS[key]
+
+
+def get_updater(version):
+    """Returns a shared instance of the STIX updater class for `version`.
+
+    Updaters hold no per-document state and are not modified after they
+    are constructed, so the returned instance can be used by any number of
+    threads at once. Repeated calls for the same version return the same
+    instance.
+
+    Args:
+        version: The version of STIX content the updater updates from.
+
+    Raises:
+        .InvalidVersionError: If `version` is not a known STIX version.
+
+    """
+    try:
+        return _UPDATERS[version]
+    except KeyError:
+        pass
+
+    utils.validate_version(version, STIX_VERSIONS)
+
+    with _CACHE_LOCK:
+        if version not in _UPDATERS:
+            _UPDATERS[version] = STIX_UPDATERS[version]()
+
+        return _UPDATERS[version]
+
+
+# The language family name used by ramrod.get_updater().
+FAMILY = 'stix'
 
 # All known STIX versions.
 STIX_VERSIONS = common.STIX_VERSIONS
 
+# The latest known version, which documents are updated to by default.
+LATEST_VERSION = STIX_VERSIONS[-1]
+
 # A mapping of STIX version numbers to its respective updater class.
 STIX_UPDATERS = {}
 
+# A cache of (from, to) version pairs to UpdatePlan instances.
+_PLANS = {}
+
+# A cache of version numbers to shared updater instances.
+_UPDATERS = {}
+
+# Serializes the construction of cached plans and updaters.
+_CACHE_LOCK = threading.Lock()
+
+# The STIX_Package children whose children are updated one at a time by
+# update_stream().
+STREAM_CONTAINERS = frozenset(
+    "{http://stix.mitre.org/stix-1}%s" % name for name in (
+        'Observables',
+        'Indicators',
+        'TTPs',
+        'Exploit_Targets',
+        'Incidents',
+        'Courses_Of_Action',
+        'Campaigns',
+        'Threat_Actors',
+        'Reports',
+        'Related_Packages',
+    )
+)
+
 def _wire_nsmaps(cls):
     # Wiring namespace dictionaries
     nsmapped = itertools.chain(
@@ -96,6 +238,9 @@ def _wire_nsmaps(cls):
     for klass in nsmapped:
         klass.NSMAP = cls.NSMAP
 
+    # Compile the updater and rule xpaths against the wired namespaces.
+    cls._compile_xpaths()
+
 def register_updater(cls):
     """Registers a STIX updater class.
 
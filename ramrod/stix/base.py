@@ -51,6 +51,11 @@ class BaseSTIXUpdater(base.BaseUpdater):
         super(BaseSTIXUpdater, self).__init__()
         self._init_cybox_updater()
 
+        # Derived classes replace the xpaths of the CybOX updater instance,
+        # so they are compiled here rather than on first use.
+        if self._cybox_updater:
+            self._cybox_updater._compile_selectors()  # noqa
+
     def _init_cybox_updater(self):
         """Returns an initialized instance of a _CyboxUpdater implementation.
 
@@ -73,6 +78,16 @@ class BaseSTIXUpdater(base.BaseUpdater):
 
         self._cybox_updater = updater
 
+    def _defer_schemalocs(self):
+        """Disables ``xsi:schemaLocation`` updates for this updater instance
+        and its CybOX updater.
+
+        """
+        super(BaseSTIXUpdater, self)._defer_schemalocs()
+
+        if self._cybox_updater:
+            self._cybox_updater._defer_schemalocs()  # noqa
+
     @classmethod
     def get_version(cls, package):
         """Returns the version of the `package` ``STIX_Package`` element by
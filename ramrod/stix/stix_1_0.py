@@ -3,7 +3,6 @@
 
 # internal
 from ramrod import base, errors, utils
-from ramrod.options import DEFAULT_UPDATE_OPTIONS
 from ramrod.cybox import Cybox_2_0_Updater
 
 # relative
@@ -52,13 +51,16 @@ class DisallowedMalware(base.DisallowedFields):
     NS_MAEC_EXT = "http://stix.mitre.org/extensions/Malware#MAEC4.0-1"
 
     @classmethod
-    def _check_maec(cls, node):
+    def _check_maec(cls, node, resolver=None):
         """Returns ``True`` if every child node is an instance of the MAEC
         Malware extension.
 
         """
         try:
-            namespaces = (utils.get_ext_namespace(x) for x in utils.iterchildren(node))
+            namespaces = (
+                utils.get_ext_namespace(x, resolver)
+                for x in utils.iterchildren(node)
+            )
             return all(ns == cls.NS_MAEC_EXT for ns in namespaces)
         except KeyError:
             # At least one node didn't contain an xsi:type attribute
@@ -66,7 +68,8 @@ class DisallowedMalware(base.DisallowedFields):
 
     @classmethod
     def _interrogate(cls, nodes):
-        return [x for x in nodes if cls._check_maec(x)]
+        resolver = utils.NamespaceResolver()
+        return [x for x in nodes if cls._check_maec(x, resolver)]
 
 
 class DisallowedCAPEC(base.DisallowedFields):
@@ -90,13 +93,16 @@ class DisallowedAttackPatterns(base.DisallowedFields):
 
 
     @classmethod
-    def _check_capec(cls, node):
+    def _check_capec(cls, node, resolver=None):
         """Returns ``True`` if every child node is an instance of the CAPEC
         Attack Pattern extension.
 
         """
         try:
-            namespaces = (utils.get_ext_namespace(x) for x in utils.iterchildren(node))
+            namespaces = (
+                utils.get_ext_namespace(x, resolver)
+                for x in utils.iterchildren(node)
+            )
             return all(ns == cls.NS_CAPEC_EXT for ns in namespaces)
         except KeyError:
             # At least one node didn't contain an xsi:type attribute
@@ -104,7 +110,8 @@ class DisallowedAttackPatterns(base.DisallowedFields):
 
     @classmethod
     def _interrogate(cls, nodes):
-        return [x for x in nodes if cls._check_capec(x)]
+        resolver = utils.NamespaceResolver()
+        return [x for x in nodes if cls._check_capec(x, resolver)]
 
 
 @register_updater
@@ -129,6 +136,10 @@ class STIX_1_0_Updater(BaseSTIXUpdater):
     """
     VERSION = '1.0'
 
+    # The STIX v1.0.1 schema does not enforce ID uniqueness, so
+    # non-unique IDs are not checked for.
+    CHECK_UNIQUE_IDS = False
+
     NSMAP = {
         'campaign': 'http://stix.mitre.org/Campaign-1',
         'stix-capec': 'http://stix.mitre.org/extensions/AP#CAPEC2.5-1',
@@ -203,10 +214,6 @@ class STIX_1_0_Updater(BaseSTIXUpdater):
 
     CYBOX_UPDATER = Cybox_2_0_Updater
 
-    def __init__(self):
-        super(STIX_1_0_Updater, self).__init__()
-        self._init_cybox_updater()
-
     def _init_cybox_updater(self):
         super(STIX_1_0_Updater, self)._init_cybox_updater()
 
@@ -220,21 +227,12 @@ class STIX_1_0_Updater(BaseSTIXUpdater):
         updater.XPATH_ROOT_NODES = selectors
         updater.XPATH_VERSIONED_NODES = selectors
 
-    def _get_duplicates(self, root):
-        """The STIX v1.0.1 schema does not enforce ID uniqueness, so this
-        overrides the default ``_get_duplicates()`` by immediately returning.
-
-        Note:
-            This assumes that `root` is schema-valid.
-
-        """
-        pass
-
-    def _get_disallowed(self, root, options=None):
+    def _get_disallowed(self, root, options=None, index=None):
         """Finds all xml entities under `root` that cannot be updated.
 
         Note:
-            This checks for both untranslatable STIX and CybOX entities.
+            This checks for both untranslatable STIX and CybOX entities
+            with a single traversal of `root`.
 
         Args:
             root: The top-level xml node
@@ -243,18 +241,9 @@ class STIX_1_0_Updater(BaseSTIXUpdater):
             A list of untranslatable items.
 
         """
-        disallowed = []
-
-        for klass in self.DISALLOWED:
-            found = klass.find(root)
-            disallowed.extend(found)
-
-        disallowed_cybox = self._cybox_updater._get_disallowed(root) # noqa
-
-        if disallowed_cybox:
-            disallowed.extend(disallowed_cybox)
-
-        return disallowed
+        cybox = self._cybox_updater  # noqa
+        rules = tuple(self.DISALLOWED) + tuple(cybox.DISALLOWED)
+        return self._find_disallowed(root, rules, index=index)
 
     def _clean_disallowed(self, disallowed, options):
         """Removes the `disallowed` nodes from the source document.
@@ -288,7 +277,11 @@ class STIX_1_0_Updater(BaseSTIXUpdater):
             else:
                 node.attrib['version'] = '1.0.1'
 
-    def _update_cybox(self, root, options):
+    def _get_rule_owners(self):
+        """CybOX content is updated with the rules of the CybOX updater."""
+        return (self._cybox_updater, self)
+
+    def _update_cybox(self, root, options, index=None):
         """Updates the CybOX content found under the `root` node.
 
         Returns:
@@ -296,53 +289,46 @@ class STIX_1_0_Updater(BaseSTIXUpdater):
             instance.
 
         """
-        updated = self._cybox_updater._update(root, options)  # noqa
+        updated = self._cybox_updater._update(root, options, index=index)  # noqa
         return updated
 
-    def check_update(self, root, options=None):
-        """Determines if the input document can be upgraded.
+    def _check_update(self, root, options, index=None):
+        """Collects the untranslatable fields and non-unique IDs found in
+        the input document.
 
-        Args:
-            root: The XML document. This can be a filename, a file-like object,
-                an instance of ``etree._Element`` or an instance of
-                ``etree._ElementTree``.
-            options (optional): A ``ramrod.UpdateOptions`` instance. If
-                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+        Returns:
+            An :class:`.UpdateError` describing the findings or ``None`` if
+            the input document can be updated.
 
         Raises:
             .UnknownVersionError: If the input document does not have a
                 version.
             .InvalidVersionError: If the version of the input document
                 does not match the `VERSION` class-level attribute value.
-            .UpdateError: If the input document contains fields which
-                cannot be updated or constructs with non-unique IDs are discovered.
 
         """
-        root = utils.get_etree_root(root)
-        options = options or DEFAULT_UPDATE_OPTIONS
-
         if options.check_versions:
             self._check_version(root)
             self._cybox_updater._check_version(root) # noqa
 
-        disallowed  = self._get_disallowed(root)
+        disallowed  = self._get_disallowed(root, index=index)
 
         if not disallowed:
-            return
+            return None
 
-        raise errors.UpdateError(
+        return errors.UpdateError(
             message="Found untranslatable fields in source document.",
             disallowed=disallowed
         )
 
-    def _update(self, root, options):
-        updated = self._update_cybox(root, options)
-        updated = self._update_namespaces(updated)
+    def _update(self, root, options, index=None):
+        updated = self._update_cybox(root, options, index=index)
+        updated = self._update_namespaces(updated, index=index)
 
         self._update_schemalocs(updated)
         self._update_versions(updated)
 
         if options.update_vocabularies:
-            self._update_vocabs(updated)
+            self._update_vocabs(updated, index=index)
 
         return updated
@@ -6,9 +6,8 @@ from lxml import etree
 from six import itervalues
 
 # internal
-from ramrod import base, errors, utils
+from ramrod import base, errors, utils, xsd
 from ramrod.cybox import Cybox_2_0_1_Updater
-from ramrod.options import DEFAULT_UPDATE_OPTIONS
 
 # relative
 from . import register_updater
@@ -62,14 +61,16 @@ class DisallowedMalware(base.DisallowedFields):
     NS_MAEC_EXT = "http://stix.mitre.org/extensions/Malware#MAEC4.0-1"
 
     @classmethod
-    def _check_maec(cls, node):
+    def _check_maec(cls, node, resolver=None):
         """Returns ``True`` if every child node is an instance of the MAEC
         Malware extension.
 
         """
         try:
-
-            namespaces = (utils.get_ext_namespace(x) for x in utils.iterchildren(node))
+            namespaces = (
+                utils.get_ext_namespace(x, resolver)
+                for x in utils.iterchildren(node)
+            )
             return all(ns == cls.NS_MAEC_EXT for ns in namespaces)
         except KeyError:
             # At least one node didn't contain an xsi:type attribute
@@ -77,7 +78,8 @@ class DisallowedMalware(base.DisallowedFields):
 
     @classmethod
     def _interrogate(cls, nodes):
-        return [x for x in nodes if cls._check_maec(x)]
+        resolver = utils.NamespaceResolver()
+        return [x for x in nodes if cls._check_maec(x, resolver)]
 
 
 class DisallowedCAPEC(base.DisallowedFields):
@@ -100,13 +102,16 @@ class DisallowedAttackPatterns(base.DisallowedFields):
     NS_CAPEC_EXT = "http://stix.mitre.org/extensions/AP#CAPEC2.6-1"
 
     @classmethod
-    def _check_capec(cls, node):
+    def _check_capec(cls, node, resolver=None):
         """Returns ``True`` if every child node is an instance of the CAPEC
         Attack Pattern extension.
 
         """
         try:
-            namespaces = (utils.get_ext_namespace(x) for x in utils.iterchildren(node))
+            namespaces = (
+                utils.get_ext_namespace(x, resolver)
+                for x in utils.iterchildren(node)
+            )
             return all(ns == cls.NS_CAPEC_EXT for ns in namespaces)
         except KeyError:
             # At least one node didn't contain an xsi:type attribute
@@ -114,15 +119,15 @@ class DisallowedAttackPatterns(base.DisallowedFields):
 
     @classmethod
     def _interrogate(cls, nodes):
-        return [x for x in nodes if cls._check_capec(x)]
+        resolver = utils.NamespaceResolver()
+        return [x for x in nodes if cls._check_capec(x, resolver)]
 
 
 class DisallowedDateTime(base.DisallowedFields):
     XPATH = ".//campaign:Activity/stixCommon:Date_Time"
 
-    # Ugh. This could probably be solved with a regex but I can't find an
-    # authoritative source on a xs:dateTime/ISO8601 regex. The libxml2 2.9.1
-    # source code for dateTime validation is nuts.
+    # Fields with attributes or children are validated against this schema.
+    # Text values are checked with ramrod.xsd.
 
     XSD = \
     """
@@ -132,13 +137,23 @@ class DisallowedDateTime(base.DisallowedFields):
     """
     XML_SCHEMA = etree.XMLSchema(etree.fromstring(XSD))
 
+    @classmethod
+    def _is_text(cls, node):
+        """Returns ``True`` if the value of `node` is its text: it has a text
+        value and no attributes or children.
+
+        """
+        return bool(node.text) and not (node.attrib or len(node))
+
     @classmethod
     def _validate(cls, node):
         if not node.text:
             return False
 
-        return cls.XML_SCHEMA.validate(node)
+        if cls._is_text(node):
+            return xsd.is_datetime(node.text)
 
+        return cls.XML_SCHEMA.validate(node)
 
     @classmethod
     def _interrogate(cls, nodes):
@@ -151,7 +166,15 @@ class DisallowedDateTime(base.DisallowedFields):
             removed if an update is forced.
 
         """
-        return [x.getparent() for x in nodes if not cls._validate(x)]
+        nodes = list(nodes)
+        texts = [x for x in nodes if cls._is_text(x)]
+        valid = xsd.validate_datetimes(x.text for x in texts)
+        valid = dict(zip(texts, valid))
+
+        return [
+            x.getparent() for x in nodes
+            if not (valid[x] if x in valid else cls._validate(x))
+        ]
 
 
 class TransTTPExploitTargets(base.TranslatableField):
@@ -372,10 +395,6 @@ class STIX_1_0_1_Updater(BaseSTIXUpdater):
 
     CYBOX_UPDATER = Cybox_2_0_1_Updater
 
-    def __init__(self):
-        super(STIX_1_0_1_Updater, self).__init__()
-        self._init_cybox_updater()
-
     def _init_cybox_updater(self):
         super(STIX_1_0_1_Updater, self)._init_cybox_updater()
 
@@ -391,30 +410,12 @@ class STIX_1_0_1_Updater(BaseSTIXUpdater):
         updater.XPATH_ROOT_NODES = selectors
         updater.XPATH_VERSIONED_NODES = selectors
 
-    def _translate_fields(self, root):
-        for field in self.TRANSLATABLE_FIELDS:
-            field.translate(root)
-
-    def _update_optionals(self, root):
-        """Finds and removes empty xml elements and attributes which are
-        optional in the next language release.
-
-        Args:
-            root: The top-level xml node.
-
-        """
-        optional_elements = self.OPTIONAL_ELEMENTS
-        typed_nodes = utils.get_typed_nodes(root)
-
-        for optional in optional_elements:
-            found = optional.find(root, typed=typed_nodes)
-            utils.remove_xml_elements(found)
-
-    def _get_disallowed(self, root, options=None):
+    def _get_disallowed(self, root, options=None, index=None):
         """Finds all xml entities under `root` that cannot be updated.
 
         Note:
-            This checks for both untranslatable STIX and CybOX entities.
+            This checks for both untranslatable STIX and CybOX entities
+            with a single traversal of `root`.
 
         Args:
             root: The top-level xml node
@@ -423,19 +424,11 @@ class STIX_1_0_1_Updater(BaseSTIXUpdater):
             A list of untranslatable items.
 
         """
-        disallowed = []
-
-        for klass in self.DISALLOWED:
-            found = klass.find(root)
-            disallowed.extend(found)
-
-        disallowed_cybox = self._cybox_updater._get_disallowed(root)  # noqa
-        if disallowed_cybox:
-            disallowed.extend(disallowed_cybox)
+        cybox = self._cybox_updater  # noqa
+        rules = tuple(self.DISALLOWED) + tuple(cybox.DISALLOWED)
+        return self._find_disallowed(root, rules, index=index)
 
-        return disallowed
-
-    def _get_duplicates(self, root):
+    def _get_duplicates(self, root, index=None):
         """Returns nodes with non-unique IDs from `root`.
 
         Returns:
@@ -443,8 +436,8 @@ class STIX_1_0_1_Updater(BaseSTIXUpdater):
             with that ID is the value.
 
         """
-        duplicates = super(STIX_1_0_1_Updater, self)._get_duplicates(root)
-        cybox = self._cybox_updater._get_duplicates(root)  # noqa
+        duplicates = super(STIX_1_0_1_Updater, self)._get_duplicates(root, index)
+        cybox = self._cybox_updater._get_duplicates(root, index)  # noqa
         return dict(list(duplicates.items()) + list(cybox.items()))
 
     def _update_versions(self, root):
@@ -461,7 +454,11 @@ class STIX_1_0_1_Updater(BaseSTIXUpdater):
             else:
                 node.attrib['version'] = '1.1'
 
-    def _update_cybox(self, root, options):
+    def _get_rule_owners(self):
+        """CybOX content is updated with the rules of the CybOX updater."""
+        return (self._cybox_updater, self)
+
+    def _update_cybox(self, root, options, index=None):
         """Updates the CybOX content found under the `root` node.
 
         Returns:
@@ -470,7 +467,7 @@ class STIX_1_0_1_Updater(BaseSTIXUpdater):
 
         """
         update_func = self._cybox_updater._update  # noqa
-        updated = update_func(root, options)
+        updated = update_func(root, options, index=index)
         return updated
 
     def _clean_disallowed(self, disallowed, options):
@@ -509,57 +506,50 @@ class STIX_1_0_1_Updater(BaseSTIXUpdater):
 
         return duplicates
 
-    def check_update(self, root, options=None):
-        """Determines if the input document can be upgraded.
+    def _check_update(self, root, options, index=None):
+        """Collects the untranslatable fields and non-unique IDs found in
+        the input document.
 
-        Args:
-            root: The XML document. This can be a filename, a file-like object,
-                an instance of ``etree._Element`` or an instance of
-                ``etree._ElementTree``.
-            options (optional): A ``ramrod.UpdateOptions`` instance. If
-                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+        Returns:
+            An :class:`.UpdateError` describing the findings or ``None`` if
+            the input document can be updated.
 
         Raises:
             .UnknownVersionError: If the input document does not have a
                 version.
             .InvalidVersionError: If the version of the input document
                 does not match the `VERSION` class-level attribute value.
-            .UpdateError: If the input document contains fields which
-                cannot be updated or constructs with non-unique IDs are discovered.
 
         """
-        root = utils.get_etree_root(root)
-        options = options or DEFAULT_UPDATE_OPTIONS
-
         if options.check_versions:
             self._check_version(root)
             self._cybox_updater._check_version(root)  # noqa
 
-        duplicates = self._get_duplicates(root)
-        disallowed = self._get_disallowed(root)
+        duplicates = self._get_duplicates(root, index=index)
+        disallowed = self._get_disallowed(root, index=index)
 
         if not (disallowed or duplicates):
-            return
+            return None
 
         error = "Found duplicate or untranslatable fields in source document."
-        raise errors.UpdateError(
+        return errors.UpdateError(
             message=error,
             disallowed=disallowed,
             duplicates=duplicates
         )
 
-    def _update(self, root, options):
-        updated = self._update_cybox(root, options)
-        updated = self._update_namespaces(updated)
+    def _update(self, root, options, index=None):
+        updated = self._update_cybox(root, options, index=index)
+        updated = self._update_namespaces(updated, index=index)
 
         self._update_schemalocs(updated)
         self._update_versions(updated)
-        self._translate_fields(updated)
+        self._translate_fields(updated, index=index)
 
         if options.update_vocabularies:
-            self._update_vocabs(updated)
+            self._update_vocabs(updated, index=index)
 
         if options.remove_optionals:
-            self._update_optionals(updated)
+            self._update_optionals(updated, index=index)
 
         return updated
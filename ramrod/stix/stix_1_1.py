@@ -7,7 +7,6 @@ from lxml import etree
 # internal
 from ramrod import base, errors, utils, xmlconst
 from ramrod.cybox import Cybox_2_0_1_Updater
-from ramrod.options import DEFAULT_UPDATE_OPTIONS
 
 # relative
 from . import register_updater
@@ -25,6 +24,26 @@ class AvailabilityLossVocab(STIXVocab):
 
 
 class TransCommonSource(base.TranslatableField):
+    """Translates StatementType/Source and ConfidenceType/Source fields
+    from ControlledVocabularyStringType instances to InformationSourceType
+    instances.
+
+    This inserts the value under Identity/Name of the InformationSourceType
+    instance.
+
+    <stixCommon:Confidence>
+        <stixCommon:Source>Foobar</stixCommon:Source>
+    </stixCommon:Confidence>
+
+    <stixCommon:Confidence>
+        <stixCommon:Source>
+            <stixCommon:Identity>
+                <stixCommon:Name>Foobar</stixCommon:Name>
+            </stixCommon:Identity>
+        </stixCommon:Source>
+    </stixCommon:Confidence>
+
+    """
     FIELD = "stixCommon:Source"
     XPATH_NODE = (
         ".//campaign:Confidence/{0} | "
@@ -47,95 +66,50 @@ class TransCommonSource(base.TranslatableField):
         ".//ta:Planning_And_Operational_Support/{0} | "
         ".//ttp:Intended_Effect/{0}"
     ).format(FIELD)
+    TEMPLATE = \
+    """
+    <stixCommon:Source xmlns:stixCommon="http://stix.mitre.org/common-1">
+        <stixCommon:Identity>
+            <stixCommon:Name/>
+        </stixCommon:Identity>
+    </stixCommon:Source>
+    """
+    TEMPLATE_TARGET = "stixCommon:Identity/stixCommon:Name"
 
-    @classmethod
-    def _translate_fields(cls, node):
-        """Translates StatementType/Source and ConfidenceType/Source fields
-        from ControlledVocabularyStringType instances to InformationSourceType
-        instances.
-
-        This inserts the value under Identity/Name of the
-        InformationSourceType instance.
-
-        <stixCommon:Confidence>
-            <stixCommon:Source>Foobar</stixCommon:Source>
-        </stixCommon:Confidence>
-
-        <stixCommon:Confidence>
-            <stixCommon:Source>
-                <stixCommon:Identity>
-                    <stixCommon:Name>Example</stixCommon:Name>
-                </stixCommon:Identity>
-            </stixCommon:Source>
-        </stixCommon:Confidence>
 
-        Args:
-            node: A ``Source`` xml element.
+class TransSightingsSource(base.TranslatableField):
+    """Translates SightingType/Source fields from StructuredTextType
+    instances to InformationSourceType instances.
 
-        Returns:
-            A new ``Source`` xml element with an embedded ``Identity``
-            structure.
+    This inserts the value under Identity/Name of the InformationSourceType
+    instance.
 
-        """
+    <indicator:Sighting>
+        <indicator:Source>Foobar</indicator:Source>
+    </indicator:Sighting>
 
-        xml = \
-        """
-        <stixCommon:Source xmlns:stixCommon="http://stix.mitre.org/common-1">
+    <indicator:Sighting>
+        <indicator:Source>
             <stixCommon:Identity>
-                <stixCommon:Name>{0}</stixCommon:Name>
+                <stixCommon:Name>Foobar</stixCommon:Name>
             </stixCommon:Identity>
-        </stixCommon:Source>
-        """.format(node.text)
-
-        source = etree.fromstring(xml)
-        return source
-
+        </indicator:Source>
+    </indicator:Sighting>
 
-class TransSightingsSource(base.TranslatableField):
+    """
     XPATH_NODE = (
         ".//indicator:Sighting/indicator:Source"
     )
-
-    @classmethod
-    def _translate_fields(cls, node):
-        """Translates SightingType/Source fields from StructuredTextType
-        instances to InformationSourceType instances.
-
-        This inserts the value under Identity/Name of the
-        InformationSourceType instance.
-
-        <indicator:Sighting>
-            <indicator:Source>Foobar</indicator:Source>
-        </indicator:Sighting>
-
-         <indicator:Sighting>
-            <indicator:Source>
-                <stixCommon:Identity>
-                    <stixCommon:Name>Foobar</stixCommon:Name>
-                </stixCommon:Identity>
-            </indicator:Source>
-         </indicator:Sighting>
-
-        Args:
-            node: A ``Source`` xml element.
-
-        Returns:
-            A new ``Source`` xml element with an embedded ``Identity``
-            structure.
-
-        """
-
-        xml = \
-        """
-        <indicator:Source xmlns:indicator="http://stix.mitre.org/Indicator-2">
-            <stixCommon:Identity xmlns:stixCommon="http://stix.mitre.org/common-1">
-                <stixCommon:Name>{0}</stixCommon:Name>
-            </stixCommon:Identity>
-        </indicator:Source>
-        """.format(node.text)
-
-        source = etree.fromstring(xml)
-        return source
+    TEMPLATE = \
+    """
+    <indicator:Source xmlns:indicator="http://stix.mitre.org/Indicator-2"
+        xmlns:stixCommon="http://stix.mitre.org/common-1">
+        <stixCommon:Identity>
+            <stixCommon:Name/>
+        </stixCommon:Identity>
+    </indicator:Source>
+    """
+    TEMPLATE_TARGET = "stixCommon:Identity/stixCommon:Name"
 
 
 class TransIndicatorRelatedCampaign(base.TranslatableField):
@@ -214,6 +188,10 @@ class STIX_1_1_Updater(BaseSTIXUpdater):
     """
     VERSION = '1.1'
 
+    # The STIX v1.1 and v1.1.1 schemas both enforce ID uniqueness, so
+    # non-unique IDs are not checked for.
+    CHECK_UNIQUE_IDS = False
+
     NSMAP = {
         'TOUMarking': 'http://data-marking.mitre.org/extensions/MarkingStructure#Terms_Of_Use-1',
         'campaign': 'http://stix.mitre.org/Campaign-1',
@@ -289,26 +267,7 @@ class STIX_1_1_Updater(BaseSTIXUpdater):
     def __init__(self):
         super(STIX_1_1_Updater, self).__init__()
 
-    def _translate_fields(self, root):
-        for field in self.TRANSLATABLE_FIELDS:
-            field.translate(root)
-
-    def _update_optionals(self, root):
-        """Finds and removes empty xml elements and attributes which are
-        optional in the next language release.
-
-        Args:
-            root: The top-level xml node.
-
-        """
-        optional_elements = self.OPTIONAL_ELEMENTS
-        typed_nodes = utils.get_typed_nodes(root)
-
-        for optional in optional_elements:
-            found = optional.find(root, typed=typed_nodes)
-            utils.remove_xml_elements(found)
-
-    def _get_disallowed(self, root, options=None):
+    def _get_disallowed(self, root, options=None, index=None):
         """There are no untranslatable fields between STIX v1.1 and
         STIX v1.1.1.
 
@@ -318,16 +277,6 @@ class STIX_1_1_Updater(BaseSTIXUpdater):
         """
         pass
 
-    def _get_duplicates(self, root):
-        """The STIX v1.1 and v1.1.1 schemas both enforces ID uniqueness, so
-        this overrides the default ``_get_duplicates()``.
-
-        Note:
-            This assumes that `root` is schema-valid.
-
-        """
-        pass
-
     def _update_versions(self, root):
         """Updates the versions of versioned nodes under `root` to align with
         STIX v1.1.1 versions.
@@ -357,53 +306,45 @@ class STIX_1_1_Updater(BaseSTIXUpdater):
         """
         self._cybox_updater._update_schemalocs(root)  # noqa
 
-    def check_update(self, root, options=None):
-        """Determines if the input document can be upgraded.
+    def _check_update(self, root, options, index=None):
+        """Collects the untranslatable fields and non-unique IDs found in
+        the input document.
 
-        Args:
-            root: The XML document. This can be a filename, a file-like object,
-                an instance of ``etree._Element`` or an instance of
-                ``etree._ElementTree``.
-            options (optional): A ``ramrod.UpdateOptions`` instance. If
-                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+        Returns:
+            An :class:`.UpdateError` describing the findings or ``None`` if
+            the input document can be updated.
 
         Raises:
             .UnknownVersionError: If the input document does not have a
                 version.
             .InvalidVersionError: If the version of the input document
                 does not match the `VERSION` class-level attribute value.
-            .UpdateError: If the input document contains fields which
-                cannot be updated or constructs with non-unique IDs are
-                discovered.
 
         """
-        root = utils.get_etree_root(root)
-        options = options or DEFAULT_UPDATE_OPTIONS
-
         if options.check_versions:
             self._check_version(root)
 
-        disallowed = self._get_disallowed(root)
+        disallowed = self._get_disallowed(root, index=index)
 
         if not disallowed:
-            return
+            return None
 
         error = "Found duplicate or untranslatable fields in source document."
-        raise errors.UpdateError(
+        return errors.UpdateError(
             message=error,
             disallowed=disallowed
         )
 
-    def _update(self, root, options):
+    def _update(self, root, options, index=None):
         self._update_cybox(root)
         self._update_schemalocs(root)
         self._update_versions(root)
-        self._translate_fields(root)
+        self._translate_fields(root, index=index)
 
         if options.update_vocabularies:
-            self._update_vocabs(root)
+            self._update_vocabs(root, index=index)
 
         if options.remove_optionals:
-            self._update_optionals(root)
+            self._update_optionals(root, index=index)
 
         return root
@@ -3,7 +3,6 @@
 
 # internal
 from ramrod import utils
-from ramrod.options import DEFAULT_UPDATE_OPTIONS
 
 # relative
 from . import register_updater
@@ -34,6 +33,10 @@ class STIX_1_1_1_Updater(BaseSTIXUpdater):
     """
     VERSION = '1.1.1'
 
+    # The STIX v1.1.1 and v1.2 schemas both enforce ID uniqueness, so
+    # non-unique IDs are not checked for.
+    CHECK_UNIQUE_IDS = False
+
     NSMAP = {
         'TOUMarking': 'http://data-marking.mitre.org/extensions/MarkingStructure#Terms_Of_Use-1',
         'campaign': 'http://stix.mitre.org/Campaign-1',
@@ -98,7 +101,7 @@ class STIX_1_1_1_Updater(BaseSTIXUpdater):
         super(STIX_1_1_1_Updater, self).__init__()
 
 
-    def _get_disallowed(self, root, options=None):
+    def _get_disallowed(self, root, options=None, index=None):
         """There are no untranslatable fields between STIX v1.1.1 and
         STIX v1.2.
 
@@ -108,16 +111,6 @@ class STIX_1_1_1_Updater(BaseSTIXUpdater):
         """
         pass
 
-    def _get_duplicates(self, root):
-        """The STIX v1.1.1 schemas enforces ID uniqueness, so
-        this overrides the default ``_get_duplicates()``.
-
-        Note:
-            This assumes that `root` is schema-valid.
-
-        """
-        pass
-
     def _update_versions(self, root):
         """Updates the versions of versioned nodes under `root` to align with
         STIX v1.1.1 versions.
@@ -132,16 +125,9 @@ class STIX_1_1_1_Updater(BaseSTIXUpdater):
             else:
                 node.attrib['version'] = '1.2'
 
-    def check_update(self, root, options=None):
+    def _check_update(self, root, options, index=None):
         """Determines if the input document can be upgraded.
 
-        Args:
-            root: The XML document. This can be a filename, a file-like object,
-                an instance of ``etree._Element`` or an instance of
-                ``etree._ElementTree``.
-            options (optional): A ``ramrod.UpdateOptions`` instance. If
-                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
-
         Raises:
             .UnknownVersionError: If the input document does not have a
                 version.
@@ -149,17 +135,14 @@ class STIX_1_1_1_Updater(BaseSTIXUpdater):
                 does not match the `VERSION` class-level attribute value.
 
         """
-        root = utils.get_etree_root(root)
-        options = options or DEFAULT_UPDATE_OPTIONS
-
         if options.check_versions:
             self._check_version(root)
 
-    def _update(self, root, options):
+    def _update(self, root, options, index=None):
         self._update_schemalocs(root)
         self._update_versions(root)
 
         if options.update_vocabularies:
-            self._update_vocabs(root)
+            self._update_vocabs(root, index=index)
 
         return root
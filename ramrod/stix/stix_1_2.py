@@ -1,7 +1,5 @@
 from . import register_updater
 from .base import BaseSTIXUpdater
-from ramrod import utils
-from ramrod.options import DEFAULT_UPDATE_OPTIONS
 
 @register_updater
 class STIX_1_2_Updater(BaseSTIXUpdater):
@@ -11,6 +9,10 @@ class STIX_1_2_Updater(BaseSTIXUpdater):
 
     VERSION = "1.2"
 
+    # The STIX v1.2 schemas enforce ID uniqueness, so
+    # non-unique IDs are not checked for.
+    CHECK_UNIQUE_IDS = False
+
     UPDATE_NS_MAP = {
         # "Core" stuff
         "http://stix.mitre.org/stix-1": "http://docs.oasis-open.org/cti/ns/stix/core-1",
@@ -49,15 +51,15 @@ class STIX_1_2_Updater(BaseSTIXUpdater):
         "stix": "http://stix.mitre.org/stix-1"
     }
 
-    def check_update(self, root, options=None):
-        """Determines if the input document can be upgraded.
+    def _get_disallowed(self, root, options=None, index=None):
+        """There are no untranslatable fields between STIX v1.2 and
+        STIX v1.2.1.
+
+        """
+        pass
 
-        Args:
-            root: The XML document. This can be a filename, a file-like object,
-                an instance of ``etree._Element`` or an instance of
-                ``etree._ElementTree``.
-            options (optional): A ``ramrod.UpdateOptions`` instance. If
-                ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+    def _check_update(self, root, options, index=None):
+        """Determines if the input document can be upgraded.
 
         Raises:
             .UnknownVersionError: If the input document does not have a
@@ -66,14 +68,11 @@ class STIX_1_2_Updater(BaseSTIXUpdater):
                 does not match the `VERSION` class-level attribute value.
 
         """
-        root = utils.get_etree_root(root)
-        options = options or DEFAULT_UPDATE_OPTIONS
-
         if options.check_versions:
             self._check_version(root)
 
-    def _update(self, root, options):
-        root = self._update_namespaces(root)
+    def _update(self, root, options, index=None):
+        root = self._update_namespaces(root, index=index)
         self._update_schemalocs(root)
 
         root.set("version", "1.2.1")
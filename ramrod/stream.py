@@ -0,0 +1,632 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import collections
+import contextlib
+import multiprocessing
+
+# external
+from lxml import etree
+from six import iteritems, string_types
+
+# internal
+import ramrod
+
+# relative
+from . import errors, results, utils
+from .index import DocumentIndex
+from .options import DEFAULT_UPDATE_OPTIONS
+
+
+# The default number of components updated together by update().
+BATCH_SIZE = 100
+
+# The whitespace written for each level of nesting by update(), matching
+# the indentation of lxml's pretty printer.
+_INDENT = "  "
+
+
+def _get_declared(node, parent):
+    """Returns the namespaces in scope for `node` which are not declared
+    with the same alias by `parent`.
+
+    """
+    inherited = parent.nsmap
+    return dict(
+        (alias, ns) for alias, ns in iteritems(node.nsmap)
+        if inherited.get(alias) != ns
+    )
+
+
+def _indent(node, level):
+    """Sets the whitespace text and tails of the descendants of `node` so
+    that it is pretty printed when written at the indentation `level`.
+
+    Like lxml's pretty printer, nodes which contain text next to child
+    nodes (mixed content) are left as they are.
+
+    """
+    children = list(node)
+
+    if not children:
+        return
+
+    tails = [x.tail for x in children]
+
+    if any(x and x.strip() for x in [node.text] + tails):
+        return
+
+    node.text = "\n" + _INDENT * (level + 1)
+
+    for child in children:
+        _indent(child, level + 1)
+        child.tail = node.text
+
+    children[-1].tail = "\n" + _INDENT * level
+
+
+@contextlib.contextmanager
+def _open_element(writer, tag, attrib, nsmap):
+    """Writes the start tag of an element to the ``etree.xmlfile``
+    `writer`, and its end tag when the block exits.
+
+    Unlike ``writer.element()``, the end tag is not written if the block
+    raises an exception, so a stream which is stopped by an error is left
+    unclosed rather than looking like a complete document.
+
+    """
+    element = writer.element(tag, attrib, nsmap)
+    element.__enter__()
+    yield
+    element.__exit__(None, None, None)
+
+
+def _get_id_namespaces(plan):
+    """Returns the namespaces of the elements whose IDs are checked for
+    uniqueness by any hop of `plan`.
+
+    """
+    namespaces = set()
+
+    for updater in plan._updaters:  # noqa
+        if not updater.CHECK_UNIQUE_IDS:
+            continue
+
+        namespaces.update(updater.NSMAP.values())
+        cybox = getattr(updater, '_cybox_updater', None)
+
+        if cybox:
+            namespaces.update(cybox.NSMAP.values())
+
+    return namespaces
+
+
+class _ComponentStream(object):
+    """Updates the components of a document as they are parsed and writes
+    them to an ``etree.xmlfile`` writer.
+
+    Components are moved out of the parsed document and into a copy of the
+    root node (and container node, if any) which has no other children. The
+    copy is updated with `plan` and the updated components are written to
+    `writer`.
+
+    """
+    def __init__(self, writer, plan, root, containers, options, force,
+                 batch_size):
+        self.writer = writer
+        self.plan = plan
+        self.root = root
+        self.containers = containers
+        self.options = options
+        self.force = force
+        self.batch_size = batch_size
+        self.removed = []
+        self.remapped = {}
+        self._namespaces = _get_id_namespaces(plan)
+        self._seen = set()
+
+    def _isolate(self, nodes, container=None):
+        """Returns a copy of the root node which contains `nodes`.
+
+        If `container` is provided, `nodes` are placed under a copy of
+        `container` in the copied root node.
+
+        """
+        root = self.root
+        isolated = etree.Element(root.tag, dict(root.attrib), nsmap=root.nsmap)
+        parent = isolated
+
+        if container is not None:
+            nsmap = _get_declared(container, root)
+            parent = etree.SubElement(
+                isolated, container.tag, dict(container.attrib), nsmap=nsmap
+            )
+
+        parent.extend(nodes)
+        return isolated
+
+    def _check_ids(self, isolated):
+        """Finds the IDs under `isolated` which were found in a previously
+        updated component.
+
+        Raises:
+            .UpdateError: If an ID was found in a previous component and
+                the update is not forced.
+
+        """
+        if not self._namespaces:
+            return
+
+        namespaces, seen = self._namespaces, self._seen
+        duplicates = {}
+
+        for id_, nodes in iteritems(DocumentIndex(isolated).ids()):
+            nodes = [x for x in nodes if utils.get_namespace(x) in namespaces]
+
+            if not nodes:
+                continue
+
+            if id_ in seen:
+                duplicates[id_] = nodes
+            else:
+                seen.add(id_)
+
+        if not duplicates:
+            return
+
+        if not self.force:
+            raise errors.UpdateError(
+                message="Found duplicate IDs in source document.",
+                duplicates=duplicates
+            )
+
+        new_id = self.options.new_id_func
+
+        for id_, nodes in iteritems(duplicates):
+            for node in nodes:
+                new_id(node)
+
+            self._add_remapped(id_, nodes)
+
+    def _add_remapped(self, id_, nodes):
+        """Records `nodes` as having been assigned new IDs in place of
+        `id_`.
+
+        """
+        self.remapped.setdefault(id_, []).extend(nodes)
+
+    def update(self, nodes, container=None):
+        """Updates `nodes` in isolation from the rest of the document.
+
+        Returns:
+            The updated copy of the root node which contains `nodes`.
+
+        """
+        isolated = self._isolate(nodes, container)
+
+        if nodes:
+            self._check_ids(isolated)
+
+        result = self.plan.update(
+            isolated,
+            options=self.options,
+            force=self.force,
+            inplace=True
+        )
+
+        self.removed.extend(result.removed)
+
+        for id_, remapped in iteritems(result.remapped_ids):
+            self._add_remapped(id_, remapped)
+
+        return result.document.as_element()
+
+    def _write_updated(self, updated, container=None):
+        """Writes the children of the `updated` copy of the root node, or of
+        its copy of `container`.
+
+        """
+        if container is not None:
+            updated = updated[0]
+
+        level = 1 if container is None else 2
+
+        for child in updated:
+            self._write_node(child, level)
+
+    def _write_node(self, node, level):
+        """Writes `node` on a new line, pretty printed at the indentation
+        `level`.
+
+        """
+        _indent(node, level)
+        node.tail = None
+
+        self.writer.write("\n" + _INDENT * level)
+        self.writer.write(node)
+
+    def _submit(self, nodes, container=None):
+        """Updates and writes `nodes`, the children of the root node or
+        `container`.
+
+        """
+        updated = self.update(nodes, container)
+        self._write_updated(updated, container)
+
+    def _drain(self):
+        """Writes any components which have been submitted but not yet
+        written. This must be called before anything else is written.
+
+        """
+        pass
+
+    def _flush(self, pending, container=None):
+        """Updates and writes the `pending` children of the root node or
+        `container`, then empties `pending`.
+
+        """
+        if not pending:
+            return
+
+        self._submit(pending, container)
+        del pending[:]
+
+    def _write_children(self, parent, events):
+        """Updates and writes the children of `parent` as they are parsed,
+        until the end of `parent` is reached.
+
+        Children are updated in batches of up to `batch_size` nodes.
+        Comments are written as they are found.
+
+        """
+        container = None if parent is self.root else parent
+        level = 1 if container is None else 2
+        pending = []
+
+        for event, node in events:
+            if node is parent:
+                break
+
+            if node.getparent() is not parent:
+                continue
+
+            if event == 'start':
+                if container is None and node.tag in self.containers:
+                    self._flush(pending)
+                    self._drain()
+                    self._write_container(node, events)
+                continue
+
+            if node.tag is etree.Comment:
+                self._flush(pending, container)
+                self._drain()
+                parent.remove(node)
+                self._write_node(node, level)
+                continue
+
+            pending.append(node)
+
+            if len(pending) >= self.batch_size:
+                self._flush(pending, container)
+
+        self._flush(pending, container)
+        self._drain()
+
+    def _write_container(self, container, events):
+        """Writes the `container` child of the root node, updating its
+        children as they are parsed.
+
+        """
+        isolated = self.update([], container)
+        updated = isolated[0]
+        nsmap = _get_declared(updated, isolated)
+
+        self.writer.write("\n" + _INDENT)
+
+        with _open_element(self.writer, updated.tag, dict(updated.attrib),
+                           nsmap):
+            self._write_children(container, events)
+            self.writer.write("\n" + _INDENT)
+
+        self.root.remove(container)
+
+    def write(self, events):
+        """Writes the updated root node, updating its children as they are
+        parsed.
+
+        """
+        updated = self.update([])
+        attrib, nsmap = dict(updated.attrib), updated.nsmap
+
+        with _open_element(self.writer, updated.tag, attrib, nsmap):
+            self._write_children(self.root, events)
+            self.writer.write("\n")
+
+
+class _ParallelComponentStream(_ComponentStream):
+    """A :class:`_ComponentStream` which updates batches of components in a
+    pool of worker processes.
+
+    Each batch is isolated and checked for IDs found in earlier batches in
+    this process, then serialized and updated by a worker. Updated batches
+    are written in document order. At most ``2 * jobs`` batches are in
+    flight at once, which bounds memory use.
+
+    Removed and remapped nodes are recorded as
+    :class:`ramrod.parallel.NodeSummary` instances.
+
+    """
+    def __init__(self, pool, jobs, *args):
+        super(_ParallelComponentStream, self).__init__(*args)
+        self.pool = pool
+        self._limit = 2 * jobs
+        self._queue = collections.deque()
+        self._parser = utils.get_xml_parser()
+
+    def _add_remapped(self, id_, nodes):
+        from .parallel import summarize_node
+
+        summaries = [summarize_node(x) for x in nodes]
+        super(_ParallelComponentStream, self)._add_remapped(id_, summaries)
+
+    def _submit(self, nodes, container=None):
+        isolated = self._isolate(nodes, container)
+        self._check_ids(isolated)
+
+        # Workers report the source lines of removed and remapped nodes by
+        # their position in the batch.
+        lines = [x.sourceline for x in isolated.iter()]
+        data = etree.tostring(isolated)
+
+        result = self.pool.apply_async(_update_shard, (data, lines))
+        self._queue.append((result, container))
+
+        while len(self._queue) > self._limit:
+            self._write_next()
+
+    def _write_next(self):
+        """Writes the oldest batch submitted to the pool, waiting for it to
+        be updated if necessary.
+
+        Raises:
+            .UpdateError: If the batch could not be updated.
+
+        """
+        result, container = self._queue.popleft()
+        data, removed, remapped, error = result.get()
+
+        if error is not None:
+            raise error
+
+        self.removed.extend(removed)
+
+        for id_, summaries in iteritems(remapped):
+            self.remapped.setdefault(id_, []).extend(summaries)
+
+        updated = etree.fromstring(data, self._parser)
+        self._write_updated(updated, container)
+
+    def _drain(self):
+        while self._queue:
+            self._write_next()
+
+
+# The number of nodes in a batch whose source lines are reported by
+# _update_shard(). lxml cannot assign larger line numbers.
+_MAX_NUMBERED = 65535
+
+# The update settings of a shard worker process, set by
+# _init_shard_worker().
+_shard_settings = {}
+
+
+def _init_shard_worker(name, from_, to_, options, force):
+    """Stores the update plan and settings used by :func:`_update_shard` in
+    a worker process.
+
+    """
+    package = ramrod.get_package(name)
+
+    _shard_settings.update(
+        plan=package.get_plan(from_, to_),
+        options=options,
+        force=force,
+        parser=utils.get_xml_parser()
+    )
+
+
+def _update_shard(data, lines):
+    """Updates a serialized batch of components in a worker process.
+
+    Args:
+        data: The serialized batch.
+        lines: The source line of each node in the batch, in document order.
+
+    Returns:
+        A ``(data, removed, remapped, error)`` tuple containing the
+        serialized updated batch and summaries of the removed and remapped
+        nodes, or the error which stopped the update.
+
+    """
+    from .parallel import NodeSummary, summarize_error, summarize_results
+
+    settings = _shard_settings
+    root = etree.fromstring(data, settings['parser'])
+
+    # Number the nodes of the batch through their source lines, which are
+    # kept by the copies of nodes the update removes.
+    for idx, node in enumerate(root.iter()):
+        node.sourceline = idx + 1 if idx < _MAX_NUMBERED else 0
+
+    def _summarize(node):
+        if node is None:
+            return None
+
+        idx = (node.sourceline or 0) - 1
+        line = lines[idx] if idx >= 0 else None
+        return NodeSummary(node.tag, line, dict(node.attrib))
+
+    try:
+        result = settings['plan'].update(
+            root,
+            options=settings['options'],
+            force=settings['force'],
+            inplace=True
+        )
+    except (errors.UpdateError, errors.InvalidVersionError) as ex:
+        return None, (), {}, summarize_error(ex, _summarize)
+
+    removed, remapped = summarize_results(result, _summarize)
+
+    data = etree.tostring(result.document.as_element())
+    return data, removed, remapped, None
+
+
+def _write_trailing(output, comments):
+    """Appends the `comments` which follow the root node to `output`.
+
+    ``etree.xmlfile`` refuses to write anything after the root node, so
+    these are written once the writer has been closed.
+
+    """
+    if not comments:
+        return
+
+    data = b"".join(
+        b"\n" + etree.tostring(x, encoding='utf-8', with_tail=False)
+        for x in comments
+    )
+
+    if isinstance(output, string_types):
+        with open(output, 'ab') as out:
+            out.write(data)
+    else:
+        output.write(data)
+
+
+def update(source, output, from_=None, to_=None, options=None, force=False,
+           batch_size=BATCH_SIZE, roots=None, jobs=None):
+    """Updates the `source` STIX or CybOX document as it is parsed, writing
+    the updated document to `output`.
+
+    The document is parsed with ``etree.iterparse``. The children of the
+    root node are updated as soon as they have been parsed, separately from
+    the rest of the document, and are then written to `output` through an
+    ``etree.xmlfile`` writer. The children of the component lists named by
+    the ``STREAM_CONTAINERS`` of the STIX or CybOX package are updated and
+    written in the same way. Components are updated in batches of up to
+    `batch_size` nodes, so peak memory use is bounded by the size of a batch
+    rather than by the whole document.
+
+    If `jobs` is greater than one, batches are updated in a pool of `jobs`
+    worker processes while the document is parsed, checked for duplicate
+    IDs and written in this process. The output is the same as it would be
+    without workers.
+
+    Note:
+        ``etree.xmlfile`` writes each component with every namespace
+        declaration in scope for it, so the output is larger than that of
+        :meth:`ramrod.update` (several times larger for documents with many
+        namespaces and small components). The output is pretty printed.
+        IDs which are repeated across batches are detected, but only
+        the later occurrences are reassigned when the update is forced.
+
+    Args:
+        source: A filename or file-like object.
+        output: A filename or file-like object to write the updated document
+            to.
+        from_ (optional): The version to update from. If ``None``, the
+            version is read from the root node.
+        to_ (optional): The version to update to.
+        options (optional): A :class:`ramrod.UpdateOptions` instance. If
+            ``None``, ``ramrod.DEFAULT_UPDATE_OPTIONS`` will be used.
+        force (boolean): Forces the update process. This may result in content
+            being removed during the update process and could result in
+            schema-invalid content.
+        batch_size (optional): The maximum number of components updated
+            together.
+        roots (optional): A collection of the root node names (e.g.,
+            ``'STIX_Package'``) which are accepted. If ``None``, both STIX
+            and CybOX documents are accepted.
+        jobs (optional): The number of worker processes which update
+            batches of components. If ``None`` or ``1``, components are
+            updated in this process. The options are pickled, so
+            ``new_id_func`` must be a module-level function.
+
+    Returns:
+        An instance of ``ramrod.UpdateResults`` whose ``document`` is
+        ``None``. If `jobs` is greater than one, the removed and remapped
+        nodes are :class:`ramrod.parallel.NodeSummary` instances.
+
+    Raises:
+        .UpdateError: If the root node is not accepted, or if an
+            untranslatable field or non-unique ID is encountered and `force`
+            is ``False``. The components updated before the error was
+            encountered will have been written to `output`, but the open
+            elements are not closed, so `output` is left incomplete and is
+            not well-formed XML.
+
+    """
+    options = options or DEFAULT_UPDATE_OPTIONS
+    events = utils.iterparse(source, events=('start', 'end', 'comment'))
+
+    with etree.xmlfile(output, encoding='utf-8') as writer:
+        writer.write_declaration()
+
+        for event, node in events:
+            if event == 'start':
+                root = node
+                break
+
+            writer.write(node, pretty_print=True)
+
+        package = ramrod.get_package(root, roots)
+        from_ = from_ or package.get_version(root)
+        plan = package.get_plan(from_, to_)
+        args = (
+            writer,
+            plan,
+            root,
+            package.STREAM_CONTAINERS,
+            options,
+            force,
+            batch_size
+        )
+
+        if not jobs or jobs == 1:
+            stream = _ComponentStream(*args)
+            stream.write(events)
+        else:
+            name = utils.get_localname(root)
+            pool = multiprocessing.Pool(
+                processes=jobs,
+                initializer=_init_shard_worker,
+                initargs=(name, from_, to_, options, force)
+            )
+
+            try:
+                stream = _ParallelComponentStream(pool, jobs, *args)
+                stream.write(events)
+            except BaseException:
+                pool.terminate()
+                raise
+            else:
+                pool.close()
+            finally:
+                pool.join()
+
+        trailing = [node for event, node in events if event == 'comment']
+
+    _write_trailing(output, trailing)
+
+    return results.UpdateResults(
+        document=None,
+        removed=tuple(stream.removed),
+        remapped_ids=stream.remapped
+    )
+
+
+__all__ = [
+    'update'
+]
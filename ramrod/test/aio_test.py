@@ -0,0 +1,102 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import sys
+import unittest
+
+# external
+from lxml import etree
+from six import StringIO
+
+# internal
+import ramrod
+import ramrod.errors as errors
+
+if sys.version_info >= (3, 6):
+    import asyncio
+    import ramrod.aio as aio
+
+
+PACKAGE_XML = \
+"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    xmlns:cybox="http://cybox.mitre.org/cybox-2"
+    xmlns:example="http://example.com/"
+    id="example:STIXPackage-1"
+    version="1.0">
+    <stix:Observables cybox_major_version="2" cybox_minor_version="0">
+        <cybox:Observable id="example:Observable-1"/>
+        <cybox:Observable id="example:Observable-%s"/>
+    </stix:Observables>
+</stix:STIX_Package>
+"""
+
+
+@unittest.skipIf(sys.version_info < (3, 6), "ramrod.aio requires Python 3.6")
+class AsyncUpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def _collect(self, agen):
+        """Returns the items yielded by the asynchronous generator `agen`."""
+        items = []
+
+        while True:
+            try:
+                items.append(self._run(agen.__anext__()))
+            except StopAsyncIteration:
+                return items
+
+    def test_update(self):
+        root = etree.parse(StringIO(PACKAGE_XML % 2)).getroot()
+        expected = ramrod.update(root)
+        updated = self._run(aio.update(root))
+
+        self.assertFalse(updated.document.as_element() is root)
+        self.assertEqual(str(updated.document), str(expected.document))
+
+        data = self._run(aio.AsyncUpdater().as_bytes(updated.document))
+        self.assertEqual(data, expected.document.as_bytes())
+
+    def test_check_update(self):
+        self._run(aio.check_update(StringIO(PACKAGE_XML % 2)))
+
+        self.assertRaises(
+            errors.UpdateError,
+            self._run,
+            aio.check_update(StringIO(PACKAGE_XML % 1))
+        )
+
+    def test_update_many(self):
+        docs = [StringIO(PACKAGE_XML % x) for x in (1, 2, 1, 2, 2)]
+        updater = aio.AsyncUpdater(concurrency=2)
+        results = self._collect(updater.update_many(docs))
+
+        self.assertEqual([x for x, _ in results], docs)
+
+        errored = [isinstance(x, errors.UpdateError) for _, x in results]
+        self.assertEqual(errored, [True, False, True, False, False])
+
+    def test_cancel(self):
+        updater = aio.AsyncUpdater(concurrency=1)
+        doc = StringIO(PACKAGE_XML % 2)
+
+        task = self.loop.create_task(updater.update(doc))
+        self._run(asyncio.sleep(0))
+        task.cancel()
+        self._run(asyncio.wait([task]))
+        self.assertTrue(task.cancelled())
+
+        # The semaphore is released by a cancelled update.
+        self._run(updater.update(StringIO(PACKAGE_XML % 2)))
+
+
+if __name__ == "__main__":
+    unittest.main()
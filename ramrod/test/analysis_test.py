@@ -0,0 +1,99 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import json
+import os
+import unittest
+
+# external
+from lxml import etree
+
+# internal
+import ramrod
+import ramrod.errors as errors
+
+SAMPLES = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
+
+
+def _sample(name):
+    return os.path.join(SAMPLES, name)
+
+
+class AnalyzeTest(unittest.TestCase):
+    def test_not_modified(self):
+        root = etree.parse(_sample('stix_1.0.1_forcible.xml')).getroot()
+        before = etree.tostring(root)
+
+        ramrod.analyze(root)
+        self.assertEqual(etree.tostring(root), before)
+
+    def test_forcible(self):
+        filename = _sample('stix_1.0.1_forcible.xml')
+        report = ramrod.analyze(filename, to_='1.1.1')
+
+        self.assertEqual(report.family, 'stix')
+        self.assertEqual([(x.from_, x.to_) for x in report.hops],
+                         [('1.0.1', '1.1'), ('1.1', '1.1.1')])
+        self.assertFalse(report.updatable)
+        self.assertTrue(report.loses_content)
+
+        hop = report.hops[0]
+        self.assertEqual(
+            hop.disallowed,
+            {'DisallowedCAPEC': 1, 'DisallowedDateTime': 1, 'DisallowedMAEC': 1}
+        )
+
+        # The findings of the first hop match a forced update.
+        updated = ramrod.update(filename, to_='1.1', force=True)
+        removed = sum(1 for x in updated.removed for _ in x.iter('*'))
+        self.assertEqual(hop.removed_nodes, removed)
+        self.assertEqual(hop.translatable['TransTTPExploitTargets'], 3)
+        self.assertTrue(hop.cost > hop.nodes)
+
+        summary = json.loads(json.dumps(report.as_dict()))
+        self.assertEqual(summary['hops'][0]['disallowed'], hop.disallowed)
+        self.assertEqual(summary['cost'], report.cost)
+
+    def test_duplicates(self):
+        report = ramrod.analyze(_sample('cybox_2.0.1_forcible.xml'))
+        hop = report.hops[0]
+
+        self.assertEqual(report.family, 'cybox')
+        self.assertEqual(len(hop.duplicates), 2)
+        self.assertTrue(all(x == 2 for x in hop.duplicates.values()))
+
+    def test_options(self):
+        filename = _sample('cybox_2.0.1_upgradable.xml')
+        report = ramrod.analyze(filename)
+        self.assertTrue(report.updatable)
+        self.assertTrue(report.hops[0].optional_elements)
+        self.assertTrue(report.hops[0].vocabs)
+
+        options = ramrod.UpdateOptions()
+        options.remove_optionals = False
+        options.update_vocabularies = False
+
+        report = ramrod.analyze(filename, options=options)
+        self.assertEqual(report.hops[0].optional_elements, {})
+        self.assertEqual(report.hops[0].vocabs, {})
+
+    def test_versions(self):
+        filename = _sample('stix_1.0_upgradable.xml')
+        report = ramrod.analyze(filename, from_='1.0.1')
+        self.assertTrue(report.hops[0].version_error)
+        self.assertFalse(report.updatable)
+
+        self.assertRaises(
+            errors.UnknownVersionError,
+            ramrod.analyze,
+            _sample('stix_no_version.xml')
+        )
+
+    def test_unknown_root(self):
+        root = etree.fromstring(b"<Unknown version='1.0'/>")
+        self.assertRaises(errors.UpdateError, ramrod.analyze, root)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -136,6 +136,38 @@ class Cybox_2_0_1_Test(unittest.TestCase):
             self.assertEqual(version, updated_version)
 
 
+class WinDriverNamespaceTest(unittest.TestCase):
+    NS_OLD = "http://cybox.mitre.org/objects#WinDriverObject-2"
+    NS_NEW = "http://cybox.mitre.org/objects#WinDriverObject-3"
+
+    XML = \
+    """
+    <cybox:Observables
+        xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+        xmlns:cybox="http://cybox.mitre.org/cybox-2"
+        xmlns:WinDriverObj="http://cybox.mitre.org/objects#WinDriverObject-2"
+        cybox_major_version="2" cybox_minor_version="0" cybox_update_version="1">
+        <cybox:Observable>
+            <cybox:Object>
+                <cybox:Properties xmlns:WinDriverObj="http://cybox.mitre.org/objects#WinDriverObject-2"
+                    xsi:type="WinDriverObj:WindowsDriverObjectType">
+                    <WinDriverObj:Driver_Name>Test</WinDriverObj:Driver_Name>
+                </cybox:Properties>
+            </cybox:Object>
+        </cybox:Observable>
+    </cybox:Observables>
+    """
+
+    def test_update_namespaces(self):
+        updated = ramrod.update(StringIO(self.XML), to_='2.1')
+        root = updated.document.as_element()
+        props = root.find(".//{http://cybox.mitre.org/cybox-2}Properties")
+
+        self.assertEqual(props.nsmap['WinDriverObj'], self.NS_NEW)
+        self.assertEqual(props[0].tag, "{%s}Driver_Name" % self.NS_NEW)
+        self.assertTrue(self.NS_OLD not in str(updated.document))
+
+
 class OptionalURIFieldsTest(_BaseOptional):
     UPDATER = UPDATER_MOD.Cybox_2_0_1_Updater
     OPTIONAL_KLASS = UPDATER_MOD.OptionalURIFields
@@ -0,0 +1,249 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import copy
+import glob
+import os
+import unittest
+
+# external
+from lxml import etree
+
+# internal
+import ramrod.base as base
+import ramrod.cybox
+import ramrod.engine as engine
+import ramrod.stix
+import ramrod.utils as utils
+from ramrod.index import DocumentIndex
+
+
+SAMPLES_DIR = os.path.join(
+    os.path.dirname(__file__), os.pardir, os.pardir, 'samples'
+)
+
+
+class ParseXPathTest(unittest.TestCase):
+    NSMAP = {'foo': 'http://example.com/foo'}
+
+    def test_union(self):
+        branches = engine.parse_xpath(
+            ".//foo:a/foo:b[@id] | //foo:c", self.NSMAP
+        )
+
+        self.assertEqual(len(branches), 2)
+        self.assertEqual(branches[0].tag, "{http://example.com/foo}b")
+        self.assertFalse(branches[0].absolute)
+        self.assertTrue(branches[1].absolute)
+
+    def test_unsupported(self):
+        paths = (
+            ".", "./*", ".//foo:a//foo:b", ".//*", ".//foo:a/@id",
+            ".//foo:a/..", ".//foo:a/.", ".//foo:a[1]", ".//foo:a[last()]",
+            ".//foo:a[position() > 1]", ".//foo:a[count(foo:b)]"
+        )
+
+        for path in paths:
+            self.assertEqual(engine.parse_xpath(path, self.NSMAP), None)
+
+    def test_predicates(self):
+        paths = (
+            ".//foo:a[@id]", ".//foo:a[foo:b]", ".//foo:a[@id='1']",
+            ".//foo:a[not(@id)]", ".//foo:a[count(foo:b) > 1]"
+        )
+
+        for path in paths:
+            self.assertTrue(engine.parse_xpath(path, self.NSMAP), path)
+
+
+class RuleEngineTest(unittest.TestCase):
+    XML = \
+    """
+    <foo:root xmlns:foo="http://example.com/foo"
+        xmlns:bar="http://example.com/bar"
+        xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+        <foo:a id="a-1">
+            <foo:b/>
+            <foo:a><foo:b id="b-2"/></foo:a>
+        </foo:a>
+        <foo:b/>
+        <foo:c xsi:type="bar:CType">
+            <foo:b/>
+            <foo:d/>
+        </foo:c>
+        <foo:c xsi:type="bar:OtherType"><foo:d/></foo:c>
+    </foo:root>
+    """
+
+    NSMAP = {'foo': 'http://example.com/foo'}
+    CTX_TYPES = {'CType': 'http://example.com/bar'}
+
+    PATHS = (
+        ".//foo:b",
+        ".//foo:a/foo:b",
+        ".//foo:a[@id]/foo:b | .//foo:c",
+        "//foo:root | //foo:a/foo:a",
+        ".//foo:a//foo:b",
+    )
+
+    def _get_root(self):
+        return etree.fromstring(self.XML)
+
+    def _get_selectors(self):
+        selectors = [(utils.compile_xpath(x, self.NSMAP), None) for x in self.PATHS]
+        ctx = (utils.compile_xpath("./*", self.NSMAP), self.CTX_TYPES)
+        selectors.append(ctx)
+        return tuple(selectors)
+
+    def _get_expected(self, root, selectors):
+        expected = []
+
+        for xpath, ctx_types in selectors:
+            if not ctx_types:
+                expected.append(xpath(root))
+                continue
+
+            found = []
+            for node in utils.get_typed_nodes(root):
+                if ctx_types.get(utils.get_type_info(node)[1]):
+                    found.extend(xpath(node))
+            expected.append(found)
+
+        return expected
+
+    def test_select(self):
+        root = self._get_root()
+        selectors = self._get_selectors()
+        rules = engine.get_engine(selectors)
+
+        self.assertEqual(rules.select(root), self._get_expected(root, selectors))
+
+    def test_select_unanchored(self):
+        root = self._get_root()[0]
+        selectors = self._get_selectors()
+        rules = engine.get_engine(selectors)
+
+        self.assertEqual(rules.select(root), self._get_expected(root, selectors))
+
+    def test_select_subtrees(self):
+        root = self._get_root()
+        xpath = utils.compile_xpath(".//foo:a/foo:b", self.NSMAP)
+        rules = engine.get_engine(((xpath, None),))
+
+        found = rules.select(root, subtrees=[root[0][1]])[0]
+        self.assertEqual([x.get('id') for x in found], ['b-2'])
+
+    def test_verify(self):
+        root = self._get_root()
+        xpath = utils.compile_xpath(".//foo:a/foo:b", self.NSMAP)
+        rules = engine.get_engine(((xpath, None),))
+
+        found = rules.select(root)[0]
+        self.assertEqual(len(found), 2)
+
+        utils.remove_xml_element(root[0][1])
+        self.assertEqual(rules.verify(0, found, root), xpath(root))
+
+    def test_select_positional(self):
+        paths = (
+            ".//foo:a/foo:b[1]",
+            ".//foo:a/foo:b[last()]",
+            ".//foo:b[position()=2]",
+            ".//foo:c/foo:d[ 1 ]",
+            ".//foo:b[count(../foo:b)]",
+            ".//foo:a/foo:b/..",
+            ".//foo:a/.",
+            ".//foo:a[@id]/foo:b[not(@id)] | .//foo:c/foo:d[2]",
+        )
+
+        root = self._get_root()
+
+        for path in paths:
+            xpath = utils.compile_xpath(path, self.NSMAP)
+            rules = engine.get_engine(((xpath, None),))
+            self.assertEqual(rules.select(root), [xpath(root)], path)
+
+    def test_cached(self):
+        selectors = self._get_selectors()
+        rules = engine.get_engine(selectors)
+        self.assertTrue(rules is engine.get_engine(tuple(selectors)))
+
+
+@unittest.skipUnless(os.path.isdir(SAMPLES_DIR), "samples not found")
+class UpdaterRulesTest(unittest.TestCase):
+    """Checks that the engine selects the same nodes as the rule class
+    xpaths for every registered updater.
+
+    """
+    def _get_updaters(self):
+        updaters = []
+        updaters.extend(ramrod.stix.STIX_UPDATERS.values())
+        updaters.extend(ramrod.cybox.CYBOX_UPDATERS.values())
+        return updaters
+
+    def _get_docs(self):
+        for fn in sorted(glob.glob(os.path.join(SAMPLES_DIR, "*.xml"))):
+            yield fn, etree.parse(fn).getroot()
+
+    def _assert_rules(self, root, rules, attr):
+        rules = tuple(rules)
+        found = base.get_engine(rules, attr).select(root)
+
+        for klass, nodes in zip(rules, found):
+            if attr == 'XPATH':
+                expected = []
+                for ctx in klass._get_contexts(root):
+                    expected.extend(base.get_xpath(klass, attr)(ctx))
+            else:
+                expected = base.get_xpath(klass, attr)(root)
+
+            self.assertEqual(nodes, expected, klass)
+
+    def test_rules(self):
+        for fn, root in self._get_docs():
+            for klass in self._get_updaters():
+                self._assert_rules(root, klass.DISALLOWED, 'XPATH')
+                self._assert_rules(root, klass.OPTIONAL_ELEMENTS, 'XPATH')
+                self._assert_rules(root, klass.OPTIONAL_ATTRIBUTES, 'XPATH')
+                self._assert_rules(root, klass.TRANSLATABLE_FIELDS, 'XPATH_NODE')
+
+    def test_versioned_nodes(self):
+        for fn, root in self._get_docs():
+            for klass in self._get_updaters():
+                updater = klass()
+
+                for attr in ('XPATH_VERSIONED_NODES', 'XPATH_ROOT_NODES'):
+                    rules = base.get_engine((updater,), attr)
+                    xpath = base.get_xpath(updater, attr)
+
+                    try:
+                        expected = xpath(root)
+                    except etree.XPathEvalError:
+                        self.assertRaises(etree.XPathEvalError, rules.select, root)
+                        continue
+
+                    found = rules.select(root)[0]
+                    self.assertEqual(found, expected, (fn, klass, attr))
+
+    def test_vocabs(self):
+        for fn, root in self._get_docs():
+            for klass in self._get_updaters():
+                expected = copy.deepcopy(root)
+
+                for vocab in klass.UPDATE_VOCABS:
+                    vocab.update(expected)
+
+                expected = etree.tostring(expected)
+
+                for indexed in (False, True):
+                    updated = copy.deepcopy(root)
+                    index = DocumentIndex(updated) if indexed else None
+                    klass()._update_vocabs(updated, index=index)
+
+                    found = etree.tostring(updated)
+                    self.assertEqual(found, expected, (fn, klass, indexed))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import glob
+import os
+import unittest
+
+# external
+from lxml import etree
+from six import BytesIO
+
+# internal
+import ramrod
+import ramrod.cybox
+import ramrod.errors as errors
+import ramrod.stix
+
+SAMPLES = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
+
+
+class SniffTest(unittest.TestCase):
+    def test_samples(self):
+        filenames = glob.glob(os.path.join(SAMPLES, '*.xml'))
+        self.assertTrue(filenames)
+
+        for filename in filenames:
+            root = etree.parse(filename).getroot()
+            header = ramrod.sniff(filename)
+
+            self.assertEqual(header.namespaces, root.nsmap, filename)
+            self.assertEqual(ramrod.sniff(root).version, header.version)
+
+            if header.family == 'stix':
+                expected = ramrod.stix.get_version(root)
+            else:
+                expected = root.attrib.get('cybox_major_version') and \
+                    ramrod.cybox.get_version(root)
+
+            self.assertEqual(header.version, expected, filename)
+
+    def test_header(self):
+        xml = \
+        b"""<?xml version="1.0"?>
+        <!-- A comment before the root node. -->
+        <Observables xmlns="http://cybox.mitre.org/cybox-2"
+            xmlns:example="http://example.com/"
+            cybox_major_version="2" cybox_minor_version="1">
+            <Observable id="example:Observable-1">
+        """  # Only the root start tag needs to be well-formed.
+
+        header = ramrod.sniff(BytesIO(xml))
+        self.assertEqual(header.family, 'cybox')
+        self.assertEqual(header.root, 'Observables')
+        self.assertEqual(header.version, '2.1')
+        self.assertTrue(header.is_latest)
+        self.assertEqual(header.namespaces['example'], "http://example.com/")
+        self.assertEqual(header.namespaces[None], "http://cybox.mitre.org/cybox-2")
+
+    def test_errors(self):
+        doc = BytesIO(b"<stix:STIX_Package xmlns:stix='http://stix.mitre.org/stix-1'/>")
+        header = ramrod.sniff(doc)
+        self.assertEqual(header.version, None)
+        self.assertFalse(header.is_latest)
+
+        # Unknown roots are rejected with the error ramrod.update() raises.
+        messages = []
+
+        for func in (ramrod.sniff, ramrod.update):
+            try:
+                func(BytesIO(b"<foo/>"))
+            except errors.UpdateError as ex:
+                messages.append(str(ex))
+
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[0], messages[1])
+
+        self.assertRaises(etree.XMLSyntaxError, ramrod.sniff, BytesIO(b"foo"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import unittest
+
+# external
+from lxml import etree
+
+# internal
+import ramrod.utils as utils
+import ramrod.xmlconst as xmlconst
+from ramrod.index import DocumentIndex
+
+
+class DocumentIndexTest(unittest.TestCase):
+    XML = \
+    """
+    <foo:root xmlns:foo="http://example.com/foo"
+        xmlns:bar="http://example.com/bar"
+        xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+        id="root-1">
+        <foo:a id="a-1" xsi:type="bar:AType">
+            <foo:b id="b-1"/>
+        </foo:a>
+        <foo:b id="a-1"/>
+        <foo:c xsi:type="bar:CType">
+            <foo:b/>
+        </foo:c>
+    </foo:root>
+    """
+
+    TAG_A = "{http://example.com/foo}a"
+    TAG_B = "{http://example.com/foo}b"
+    TAG_C = "{http://example.com/foo}c"
+
+    def setUp(self):
+        self.root = etree.fromstring(self.XML)
+        self.index = DocumentIndex(self.root)
+
+    def assertFresh(self):
+        """Asserts that the index matches a newly built index."""
+        fresh = DocumentIndex(self.index.root)
+        tags = (self.TAG_A, self.TAG_B, self.TAG_C)
+
+        self.assertEqual(self.index.nodes(tags), fresh.nodes(tags))
+        self.assertEqual(self.index.typed(), fresh.typed())
+        self.assertEqual(self.index.typed('AType'), fresh.typed('AType'))
+        self.assertEqual(self.index.ids(), fresh.ids())
+
+    def test_nodes(self):
+        nodes = self.index.nodes((self.TAG_B, self.TAG_A))
+        self.assertEqual(nodes, self.root.xpath("//*[local-name() != 'c' and local-name() != 'root']"))
+
+    def test_typed(self):
+        self.assertEqual(self.index.typed(), utils.get_typed_nodes(self.root))
+        self.assertEqual(self.index.typed('CType'), [self.root[2]])
+
+    def test_ids(self):
+        ids = self.index.ids()
+        self.assertTrue('root-1' not in ids)
+        self.assertEqual(ids['a-1'], [self.root[0], self.root[1]])
+
+    def test_remove(self):
+        node = self.root[0]
+        utils.remove_xml_element(node)
+        self.index.remove(node)
+
+        self.assertEqual(self.index.ids()['a-1'], [self.root[0]])
+        self.assertFresh()
+
+    def test_replace(self):
+        old = self.root[0]
+        new = etree.Element(self.TAG_B, id="new-1")
+        etree.SubElement(new, self.TAG_A, id="new-2")
+
+        utils.replace_xml_element(old, new)
+        self.index.replace(old, new)
+
+        nodes = self.index.nodes((self.TAG_A, self.TAG_B))
+        self.assertEqual(nodes[:3], [new, new[0], self.root[1]])
+        self.assertFresh()
+
+    def test_rename(self):
+        node = self.root[1]
+        node.tag = self.TAG_A
+        self.index.rename(node)
+
+        self.assertEqual(self.index.nodes((self.TAG_A,)), [self.root[0], node])
+        self.assertFresh()
+
+    def test_update(self):
+        node = self.root[2]
+        node.attrib[xmlconst.TAG_XSI_TYPE] = "bar:AType"
+        self.index.update(node)
+
+        self.assertEqual(self.index.typed('AType'), [self.root[0], node])
+        self.assertEqual(self.index.typed('CType'), [])
+        self.assertFresh()
+
+    def test_replace_root(self):
+        new = etree.Element(self.TAG_A)
+        new[:] = self.root[:]
+        self.index.typed()
+        self.index.replace(self.root, new)
+
+        self.assertTrue(self.index.root is new)
+        self.assertEqual(len(self.index.typed()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
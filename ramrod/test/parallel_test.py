@@ -0,0 +1,97 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import os
+import unittest
+
+# external
+from lxml import etree
+
+# internal
+import ramrod
+import ramrod.errors as errors
+import ramrod.parallel as parallel
+
+SAMPLES = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
+
+PACKAGE_XML = \
+b"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    id="example:STIXPackage-1"
+    version="1.0">
+</stix:STIX_Package>
+"""
+
+DUPLICATES_XML = \
+b"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    xmlns:cybox="http://cybox.mitre.org/cybox-2"
+    xmlns:example="http://example.com/"
+    id="example:STIXPackage-1"
+    version="1.0">
+    <stix:Observables cybox_major_version="2" cybox_minor_version="0">
+        <cybox:Observable id="example:Observable-1"/>
+        <cybox:Observable id="example:Observable-1"/>
+    </stix:Observables>
+</stix:STIX_Package>
+"""
+
+
+class ParallelUpdateTest(unittest.TestCase):
+    def test_update(self):
+        filename = os.path.join(SAMPLES, 'cybox_2.0_upgradable.xml')
+        docs = [PACKAGE_XML, b"<Unclosed>", DUPLICATES_XML, filename]
+        results = list(parallel.update(docs, jobs=2, max_tasks_per_child=1))
+
+        self.assertEqual([x.index for x in results], [0, 1, 2, 3])
+
+        root = etree.fromstring(results[0].document)
+        self.assertEqual(root.attrib['version'], '1.2.1')
+        self.assertEqual(results[0].filename, None)
+
+        self.assertTrue(isinstance(results[1].error, SyntaxError))
+
+        error = results[2].error
+        self.assertTrue(isinstance(error, errors.UpdateError))
+
+        duplicates = error.duplicates["example:Observable-1"]
+        self.assertEqual([x.sourceline for x in duplicates], [8, 9])
+
+        expected = ramrod.update(filename).document.as_bytes()
+        self.assertEqual(results[3].document, expected)
+        self.assertEqual(results[3].filename, filename)
+
+    def test_force(self):
+        results = list(parallel.update([DUPLICATES_XML], jobs=1, force=True))
+        remapped = results[0].remapped_ids["example:Observable-1"]
+
+        root = etree.fromstring(results[0].document)
+        ids = [x.attrib['id'] for x in root.iter("{*}Observable")]
+        self.assertEqual(ids, [x.attrib['id'] for x in remapped])
+
+    def test_unordered(self):
+        docs = [PACKAGE_XML] * 4
+        results = parallel.update(docs, jobs=2, ordered=False)
+        self.assertEqual(sorted(x.index for x in results), [0, 1, 2, 3])
+
+    def test_lazy(self):
+        consumed = []
+
+        def docs():
+            for idx in range(100):
+                consumed.append(idx)
+                yield PACKAGE_XML
+
+        for ordered in (True, False):
+            del consumed[:]
+            results = parallel.update(docs(), jobs=1, ordered=ordered)
+
+            self.assertTrue(next(results).document)
+            self.assertTrue(len(consumed) <= 2)  # 2 * jobs
+
+            results.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import unittest
+
+# external
+from lxml import etree
+from six import StringIO
+
+# internal
+import ramrod.stix
+import ramrod.cybox
+import ramrod.errors as errors
+import ramrod.utils as utils
+
+
+class UpdatePlanTest(unittest.TestCase):
+    XML = \
+    """
+    <stix:STIX_Package
+        xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+        xmlns:stix="http://stix.mitre.org/stix-1"
+        xmlns:stix-maec="http://stix.mitre.org/extensions/Malware#MAEC4.0-1"
+        xsi:schemaLocation="
+            http://stix.mitre.org/stix-1 http://stix.mitre.org/XMLSchema/core/1.0/stix_core.xsd
+            http://stix.mitre.org/extensions/Malware#MAEC4.0-1 http://stix.mitre.org/XMLSchema/extensions/malware/maec_4.0/1.0/maec_4.0_malware.xsd
+            http://example.com/foo http://example.com/foo.xsd"
+        id="example:STIXPackage-33fe3b22-0201-47cf-85d0-97c02164528d"
+        version="1.0">
+    </stix:STIX_Package>
+    """
+
+    def _get_root(self):
+        return etree.parse(StringIO(self.XML)).getroot()
+
+    def test_cached(self):
+        plan = ramrod.stix.get_plan('1.0', '1.2')
+        self.assertTrue(plan is ramrod.stix.get_plan('1.0', '1.2'))
+        self.assertTrue(ramrod.stix.get_plan('1.0') is not plan)
+
+    def test_versions(self):
+        plan = ramrod.stix.get_plan('1.0', '1.1.1')
+        self.assertEqual(plan.versions, ('1.0', '1.0.1', '1.1'))
+
+        plan = ramrod.cybox.get_plan('2.0')
+        self.assertEqual(plan.versions, ('2.0', '2.0.1'))
+
+    def test_invalid_versions(self):
+        self.assertRaises(
+            errors.InvalidVersionError,
+            ramrod.stix.get_plan, '1.2', '1.0'
+        )
+
+        self.assertRaises(
+            errors.InvalidVersionError,
+            ramrod.cybox.get_plan, '42'
+        )
+
+    def test_composed_schemalocs(self):
+        plan = ramrod.stix.get_plan('1.0')
+        maec = "http://stix.mitre.org/extensions/Malware#MAEC4.0-1"
+        self.assertEqual(plan.schemalocs[maec], None)
+
+        ns, loc = plan.schemalocs['http://stix.mitre.org/stix-1']
+        self.assertEqual(ns, 'http://docs.oasis-open.org/cti/ns/stix/core-1')
+        self.assertTrue(loc.endswith('stix_core.xsd'))
+
+    def test_matches_per_hop_update(self):
+        plan = ramrod.stix.get_plan('1.0')
+        updated = plan.update(self._get_root()).document.as_element()
+
+        # Run each hop with its own schemalocation updates
+        root = self._get_root()
+        for version in plan.versions:
+            updater = ramrod.stix.STIX_UPDATERS[version]()
+            root = updater.update(root).document.as_element()
+
+        self.assertEqual(
+            list(utils.get_schemaloc_pairs(updated)),
+            list(utils.get_schemaloc_pairs(root))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
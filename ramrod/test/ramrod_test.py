@@ -5,11 +5,13 @@
 # See LICENSE.txt for complete terms.
 
 # builtin
+import os
+import threading
 import unittest
 
 # external
 from lxml import etree
-from six import StringIO, text_type
+from six import BytesIO, StringIO, text_type
 
 # internal
 import ramrod
@@ -17,6 +19,7 @@ import ramrod.stix
 import ramrod.cybox
 import ramrod.errors as errors
 
+SAMPLES = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
 
 class STIXVersionTest(unittest.TestCase):
 
@@ -185,6 +188,197 @@ class DocumentTest(unittest.TestCase):
         updated = ramrod.update(self._cybox_observables)
         self.assertTrue(updated.document)
 
+    def test_update_many(self):
+        docs = [
+            StringIO(self.STIX_PACKAGE_XML),
+            StringIO(self.UNKNOWN_XML),
+            StringIO("<Unclosed>"),
+            etree.fromstring(self.OBSERVABLES_XML),
+        ]
+
+        updated = list(ramrod.update_many(docs))
+        self.assertEqual([x for x, _ in updated], docs)
+
+        results = [x for _, x in updated]
+        self.assertEqual(results[0].document.as_element().attrib['version'], '1.2.1')
+        self.assertTrue(isinstance(results[1], errors.UpdateError))
+        self.assertTrue(isinstance(results[2], etree.XMLSyntaxError))
+        self.assertTrue(results[3].document.as_element() is not docs[3])
+
+    def test_get_package(self):
+        root = etree.fromstring(self.OBSERVABLES_XML)
+        self.assertTrue(ramrod.get_package(root) is ramrod.cybox)
+        self.assertTrue(ramrod.get_package('STIX_Package') is ramrod.stix)
+
+        self.assertRaises(errors.UpdateError, ramrod.get_package, 'Unknown')
+        self.assertRaises(
+            errors.UpdateError,
+            ramrod.get_package, root, roots=('STIX_Package',)
+        )
+
+
+class UpdaterCacheTest(unittest.TestCase):
+    def test_get_updater(self):
+        updater = ramrod.get_updater('stix', '1.1')
+        self.assertTrue(isinstance(updater, ramrod.stix.STIX_1_1_Updater))
+        self.assertTrue(updater is ramrod.get_updater('stix', '1.1'))
+
+        updater = ramrod.get_updater('cybox', '2.0')
+        self.assertTrue(isinstance(updater, ramrod.cybox.Cybox_2_0_Updater))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, ramrod.get_updater, 'maec', '1.0')
+        self.assertRaises(
+            errors.InvalidVersionError,
+            ramrod.get_updater, 'stix', '0.1'
+        )
+
+
+class UniqueIdTest(unittest.TestCase):
+    XML = \
+    """
+    <cybox:Observables
+        xmlns:cybox="http://cybox.mitre.org/cybox-2"
+        cybox_major_version="2" cybox_minor_version="0">
+        <cybox:Observable id="example:1"/>
+        <cybox:Observable id="example:1"/>
+    </cybox:Observables>
+    """
+
+    def test_check_unique_ids(self):
+        updaters = list(ramrod.stix.STIX_UPDATERS.values())
+        updaters.extend(ramrod.cybox.CYBOX_UPDATERS.values())
+
+        checked = sorted(x.VERSION for x in updaters if x.CHECK_UNIQUE_IDS)
+        self.assertEqual(checked, ['1.0.1', '2.0.1'])
+
+    def test_get_duplicates(self):
+        root = etree.fromstring(self.XML)
+
+        updater = ramrod.get_updater('cybox', '2.0')
+        self.assertEqual(updater._get_duplicates(root), {})  # noqa
+
+        updater = ramrod.get_updater('cybox', '2.0.1')
+        duplicates = updater._get_duplicates(root)  # noqa
+        self.assertEqual(len(duplicates['example:1']), 2)
+
+
+def _line_id(node):
+    """Assigns a new ID to `node` which is derived from its source line, so
+    that forced updates are repeatable.
+
+    """
+    node.attrib['id'] = "%s-line-%s" % (node.attrib['id'], node.sourceline)
+    return node
+
+
+class ThreadSafetyTest(unittest.TestCase):
+    """Updates documents with shared updaters and plans from several threads
+    at once, checking the output against a single-threaded update.
+
+    """
+    THREADS = 8
+    ROUNDS = 5
+
+    # (sample, language family, force)
+    SAMPLES = (
+        ('stix_1.0_upgradable.xml', 'stix', False),
+        ('stix_1.0_forcible.xml', 'stix', True),
+        ('stix_1.0.1_upgradable.xml', 'stix', False),
+        ('stix_1.0.1_forcible.xml', 'stix', True),
+        ('stix_1.1_upgradable.xml', 'stix', False),
+        ('cybox_2.0_upgradable.xml', 'cybox', False),
+        ('cybox_2.0.1_forcible.xml', 'cybox', True),
+    )
+
+    def _update(self, sample, family, force):
+        """Updates `sample` with a single hop and with every hop, returning
+        the serialized documents and removed node tags.
+
+        """
+        root = etree.parse(os.path.join(SAMPLES, sample)).getroot()
+        package = getattr(ramrod, family)
+        updater = ramrod.get_updater(family, package.get_version(root))
+
+        options = ramrod.UpdateOptions()
+        options.new_id_func = _line_id
+        updated = []
+
+        for func in (updater.update, ramrod.update):
+            result = func(root, options=options, force=force)
+            removed = [x.tag for x in result.removed]
+            updated.append((result.document.as_bytes(), removed))
+
+        return updated
+
+    def test_threads(self):
+        expected = dict((x, self._update(*x)) for x in self.SAMPLES)
+        mismatched, failed = [], []
+
+        def run():
+            try:
+                for _ in range(self.ROUNDS):
+                    for args in self.SAMPLES:
+                        if self._update(*args) != expected[args]:
+                            mismatched.append(args)
+            except Exception as ex:
+                failed.append(ex)
+
+        threads = [threading.Thread(target=run) for _ in range(self.THREADS)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(failed, [])
+        self.assertEqual(mismatched, [])
+
+
+class InPlaceUpdateTest(unittest.TestCase):
+    XML = \
+    """
+    <stix:STIX_Package
+        xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+        xmlns:stix="http://stix.mitre.org/stix-1"
+        xmlns:indicator="http://stix.mitre.org/Indicator-2"
+        id="example:STIXPackage-33fe3b22-0201-47cf-85d0-97c02164528d"
+        version="1.0">
+        <stix:Indicators>
+            <stix:Indicator xsi:type="indicator:IndicatorType" version="2.0"/>
+        </stix:Indicators>
+    </stix:STIX_Package>
+    """
+
+    def _get_root(self):
+        return etree.parse(StringIO(self.XML)).getroot()
+
+    def test_copy_by_default(self):
+        root = self._get_root()
+        original = etree.tostring(root)
+
+        updated = ramrod.update(root, to_='1.1.1')
+        updated_root = updated.document.as_element()
+
+        self.assertFalse(updated_root is root)
+        self.assertEqual(updated_root.attrib['version'], '1.1.1')
+        self.assertEqual(etree.tostring(root), original)
+
+    def test_inplace(self):
+        root = self._get_root()
+        updated = ramrod.update(root, to_='1.1.1', inplace=True)
+
+        self.assertTrue(updated.document.as_element() is root)
+        self.assertEqual(root.attrib['version'], '1.1.1')
+
+    def test_stix_update_copy_by_default(self):
+        root = self._get_root()
+        original = etree.tostring(root)
+
+        ramrod.stix.update(root, to_='1.2')
+        self.assertEqual(etree.tostring(root), original)
+
 
 class ResultDocumentTest(unittest.TestCase):
     XML = """<test>foobar</test>"""
@@ -213,5 +407,26 @@ class ResultDocumentTest(unittest.TestCase):
         val = sio.getvalue().strip()
         self.assertEqual(val, self.XML)
 
+    def test_as_bytes(self):
+        self.assertEqual(
+            self._result.as_bytes(),
+            b"<?xml version='1.0' encoding='utf-8'?>\n" + self.XML.encode()
+        )
+
+        self.assertEqual(
+            self._result.as_bytes(xml_declaration=False),
+            self.XML.encode()
+        )
+
+    def test_write(self):
+        out = BytesIO()
+        self._result.write(out, xml_declaration=False)
+        self.assertEqual(out.getvalue(), self.XML.encode())
+
+        out = BytesIO()
+        self._result.write(out, encoding='utf-16')
+        root = etree.fromstring(out.getvalue())
+        self.assertEqual(root.text, "foobar")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,151 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+# external
+from lxml import etree
+
+# internal
+import ramrod
+import ramrod.errors as errors
+import ramrod.server as server
+
+SAMPLES = os.path.join(os.path.dirname(__file__), '..', '..', 'samples')
+
+DUPLICATES_XML = \
+b"""<stix:STIX_Package
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    xmlns:cybox="http://cybox.mitre.org/cybox-2"
+    xmlns:example="http://example.com/"
+    id="example:STIXPackage-1"
+    version="1.0">
+    <stix:Observables cybox_major_version="2" cybox_minor_version="0">
+        <cybox:Observable id="example:Observable-1"/>
+        <cybox:Observable id="example:Observable-1"/>
+    </stix:Observables>
+</stix:STIX_Package>
+"""
+
+
+class ParseAddressTest(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(server.parse_address("localhost:80"), ("localhost", 80))
+        self.assertEqual(server.parse_address("/tmp/a:1"), "/tmp/a:1")
+        self.assertEqual(server.parse_address("ramrod.sock"), "ramrod.sock")
+
+
+class UpdateServerTest(unittest.TestCase):
+    MAX_SIZE = 4096
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tempdir = tempfile.mkdtemp()
+        address = os.path.join(cls.tempdir, 'ramrod.sock')
+
+        cls.server = server.UpdateServer(address, jobs=1, max_size=cls.MAX_SIZE)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.thread.join()
+        cls.server.close()
+        shutil.rmtree(cls.tempdir)
+
+    def setUp(self):
+        self.client = server.Client(self.server.address)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_update(self):
+        filename = os.path.join(SAMPLES, 'cybox_2.0_upgradable.xml')
+        expected = ramrod.update(filename).document.as_bytes()
+
+        # The connection is reused by the second request.
+        for _ in range(2):
+            updated = self.client.update(filename)
+            self.assertEqual(updated.document, expected)
+
+    def test_errors(self):
+        self.assertRaises(SyntaxError, self.client.update, b"<Unclosed>")
+
+        try:
+            self.client.update(DUPLICATES_XML)
+        except errors.UpdateError as ex:
+            duplicates = ex.duplicates["example:Observable-1"]
+            self.assertEqual([x.sourceline for x in duplicates], [8, 9])
+        else:
+            self.fail("UpdateError not raised")
+
+        updated = self.client.update(DUPLICATES_XML, force=True)
+        remapped = updated.remapped_ids["example:Observable-1"]
+
+        root = etree.fromstring(updated.document)
+        ids = [x.attrib['id'] for x in root.iter("{*}Observable")]
+        self.assertEqual(ids, [x.attrib['id'] for x in remapped])
+
+    def test_options(self):
+        options = ramrod.UpdateOptions()
+        options.check_versions = False
+
+        updated = self.client.update(
+            DUPLICATES_XML.replace(b'version="1.0"', b'version="1.1"'),
+            from_='1.0',
+            to_='1.1',
+            options=options,
+            force=True
+        )
+
+        root = etree.fromstring(updated.document)
+        self.assertEqual(root.attrib['version'], '1.1')
+
+    def test_max_size(self):
+        try:
+            self.client.update(b" " * (self.MAX_SIZE * 100))
+        except errors.ServerError as ex:
+            self.assertEqual(ex.status, 413)
+        else:
+            self.fail("ServerError not raised")
+
+    def test_internal_error(self):
+        def submit(data, settings):
+            raise ValueError("updater bug")
+
+        filename = os.path.join(SAMPLES, 'cybox_2.0_upgradable.xml')
+        self.server.submit = submit
+
+        try:
+            self.client.update(filename)
+        except errors.ServerError as ex:
+            self.assertEqual(ex.status, 500)
+        else:
+            self.fail("ServerError not raised")
+        finally:
+            del self.server.submit
+
+        # The server keeps answering requests.
+        self.assertTrue(self.client.update(filename).document)
+
+    def test_negative_length(self):
+        conn = server._UnixHTTPConnection(self.server.address, timeout=10)  # noqa
+
+        try:
+            conn.putrequest('POST', server.UPDATE_PATH)
+            conn.putheader('Content-Length', '-1')
+            conn.endheaders()
+            response = conn.getresponse()
+            self.assertEqual(response.status, 400)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
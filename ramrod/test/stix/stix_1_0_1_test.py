@@ -7,6 +7,7 @@ from six import StringIO
 import ramrod
 import ramrod.stix
 import ramrod.stix.stix_1_0_1
+import ramrod.errors as errors
 import ramrod.utils as utils
 from ramrod.test import (_BaseVocab, _BaseDisallowed, _BaseTrans)
 
@@ -57,6 +58,60 @@ class STIX_1_0_1_Test(unittest.TestCase):
             self.assertEqual(version, updated_version)
 
 
+class ForceUpdateTest(unittest.TestCase):
+    XML = PACKAGE_TEMPLATE % \
+    """
+    <stix:Indicators>
+        <stix:Indicator id="example:indicator-1" xsi:type="indicator:IndicatorType"/>
+        <stix:Indicator id="example:indicator-1" xsi:type="indicator:IndicatorType"/>
+    </stix:Indicators>
+    <stix:TTPs>
+        <stix:TTP xsi:type="ttp:TTPType">
+            <ttp:Behavior>
+                <ttp:Malware>
+                    <ttp:Malware_Instance xsi:type="stix-maec:MAEC4.0InstanceType">
+                        <stix-maec:MAEC/>
+                    </ttp:Malware_Instance>
+                </ttp:Malware>
+            </ttp:Behavior>
+        </stix:TTP>
+    </stix:TTPs>
+    """
+
+    class CountingUpdater(UPDATER):
+        def __init__(self):
+            super(ForceUpdateTest.CountingUpdater, self).__init__()
+            self.calls = []
+
+        def _get_disallowed(self, root, options=None, index=None):
+            self.calls.append('disallowed')
+            return UPDATER._get_disallowed(self, root, options, index=index)
+
+        def _get_duplicates(self, root, index=None):
+            self.calls.append('duplicates')
+            return UPDATER._get_duplicates(self, root, index=index)
+
+    def test_check_update(self):
+        root = utils.get_etree_root(StringIO(self.XML))
+
+        try:
+            UPDATER().check_update(root)
+        except errors.UpdateError as ex:
+            self.assertEqual(len(ex.disallowed), 2)
+            self.assertEqual(len(ex.duplicates), 1)
+        else:
+            self.fail("UpdateError not raised")
+
+    def test_force_reuses_findings(self):
+        root = utils.get_etree_root(StringIO(self.XML))
+        updater = self.CountingUpdater()
+        results = updater.update(root, force=True)
+
+        self.assertEqual(sorted(updater.calls), ['disallowed', 'duplicates'])
+        self.assertEqual(len(results.removed), 2)
+        self.assertEqual(len(results.remapped_ids['example:indicator-1']), 2)
+
+
 class IndicatorTypeVocab(_BaseVocab):
     UPDATER = UPDATER_MOD.STIX_1_0_1_Updater
     VOCAB_KLASS = UPDATER_MOD.IndicatorTypeVocab
@@ -87,6 +87,20 @@ class TransCommonSource(_BaseTrans):
     XML = PACKAGE_TEMPLATE % (TRANS_XML)
 
 
+class TransCommonSourceMarkup(TransCommonSource):
+    TRANS_VALUE = "AT&T <Research>"
+    TRANS_XML = \
+    """
+    <stixCommon:Confidence>
+        <stixCommon:Source>AT&amp;T &lt;Research&gt;</stixCommon:Source>
+    </stixCommon:Confidence>
+    <stixCommon:Confidence>
+        <stixCommon:Source><![CDATA[AT&T <Research>]]></stixCommon:Source>
+    </stixCommon:Confidence>
+    """
+    XML = PACKAGE_TEMPLATE % (TRANS_XML)
+
+
 class TransSightingSource(_BaseTrans):
     UPDATER = UPDATER_MOD.STIX_1_1_Updater
     TRANS_KLASS = UPDATER_MOD.TransSightingsSource
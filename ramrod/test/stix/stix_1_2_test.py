@@ -0,0 +1,116 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+import unittest
+from six import BytesIO, StringIO
+
+from lxml import etree
+
+import ramrod
+import ramrod.stix
+import ramrod.stix.stix_1_2
+import ramrod.utils as utils
+
+UPDATER_MOD = ramrod.stix.stix_1_2
+UPDATER = UPDATER_MOD.STIX_1_2_Updater
+
+NS_CORE = "http://docs.oasis-open.org/cti/ns/stix/core-1"
+NS_INDICATOR = "http://docs.oasis-open.org/cti/ns/stix/indicator-1"
+
+PACKAGE_TEMPLATE = \
+"""
+<stix:STIX_Package
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    xmlns:indicator="http://stix.mitre.org/Indicator-2"
+    xmlns:example="http://example.com/"
+    version="1.2">
+    %s
+</stix:STIX_Package>
+"""
+
+class STIX_1_2_Test(unittest.TestCase):
+    XML_VERSIONS = PACKAGE_TEMPLATE % ""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._versions = StringIO(cls.XML_VERSIONS)
+
+    def test_get_version(self):
+        root = utils.get_etree_root(self._versions)
+        version = UPDATER.get_version(root)
+        self.assertEqual(version, UPDATER.VERSION)
+
+
+class UpdateNamespacesTest(unittest.TestCase):
+    XML = PACKAGE_TEMPLATE % \
+    """
+    <stix:Indicators>
+        <stix:Indicator xsi:type="indicator:IndicatorType">
+            <indicator:Title>Test</indicator:Title>
+        </stix:Indicator>
+        <stix:Indicator xmlns:indicator="http://stix.mitre.org/Indicator-2"
+            xsi:type="indicator:IndicatorType">
+            <indicator:Title>Redeclared</indicator:Title>
+        </stix:Indicator>
+    </stix:Indicators>
+    """
+
+    def _update(self, xml):
+        root = utils.get_etree_root(StringIO(xml))
+        return UPDATER()._update_namespaces(root)
+
+    def test_nsmap(self):
+        root = self._update(self.XML)
+
+        self.assertEqual(root.tag, "{%s}STIX_Package" % NS_CORE)
+        self.assertEqual(root.nsmap['indicator'], NS_INDICATOR)
+
+        for node in root.iter("{%s}Indicator" % NS_CORE):
+            self.assertEqual(node.nsmap['indicator'], NS_INDICATOR)
+            self.assertEqual(node[0].tag, "{%s}Title" % NS_INDICATOR)
+
+    def test_redeclared_alias(self):
+        root = self._update(self.XML)
+        xml = etree.tostring(root).decode('utf-8')
+
+        self.assertEqual(xml.count("http://stix.mitre.org/Indicator-2"), 0)
+        self.assertEqual(xml.count(NS_INDICATOR), 1)
+
+    def test_cdata(self):
+        xml = PACKAGE_TEMPLATE % \
+        """
+        <stix:STIX_Header>
+            <stix:Title xmlns:stix="http://stix.mitre.org/stix-1"
+                >A &amp; <![CDATA[<B>]]></stix:Title>
+            <stix:Description>Test</stix:Description>
+        </stix:STIX_Header>
+        """
+
+        root = utils.get_etree_root(BytesIO(xml.encode('utf-8')))
+        root = UPDATER()._update_namespaces(root)
+        title, description = root[0]
+
+        self.assertEqual(title.tag, "{%s}Title" % NS_CORE)
+        self.assertEqual(title.text, "A & <B>")
+        self.assertEqual(description.text, "Test")
+
+        xml = etree.tostring(title).decode('utf-8')
+        self.assertTrue("A &amp; <![CDATA[<B>]]>" in xml)
+
+    def test_deep_document(self):
+        root = utils.get_etree_root(StringIO(PACKAGE_TEMPLATE % ""))
+        node = root
+
+        for _ in range(5000):
+            node = etree.SubElement(node, "{http://stix.mitre.org/stix-1}Indicators")
+
+        etree.SubElement(node, "{http://stix.mitre.org/Indicator-2}Title")
+
+        root = UPDATER()._update_namespaces(root)
+        titles = list(root.iter("{%s}Title" % NS_INDICATOR))
+        self.assertEqual(len(titles), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
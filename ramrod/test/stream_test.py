@@ -0,0 +1,306 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import os
+import unittest
+
+# external
+from lxml import etree
+from six import BytesIO
+
+# internal
+import ramrod
+import ramrod.cybox
+import ramrod.stix
+import ramrod.stream as stream
+import ramrod.errors as errors
+
+FORCIBLE = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'samples', 'stix_1.0_forcible.xml'
+)
+
+PACKAGE_TEMPLATE = \
+"""<?xml version="1.0" encoding="UTF-8"?>
+<!-- Header comment -->
+<stix:STIX_Package
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    xmlns:stix="http://stix.mitre.org/stix-1"
+    xmlns:indicator="http://stix.mitre.org/Indicator-2"
+    xmlns:stixVocabs="http://stix.mitre.org/default_vocabularies-1"
+    xmlns:example="http://example.com/"
+    id="example:Package-1"
+    version="1.0.1">
+    <stix:STIX_Header>
+        <stix:Title>Test</stix:Title>
+    </stix:STIX_Header>
+    <stix:Indicators>
+        %s
+    </stix:Indicators>
+</stix:STIX_Package>
+"""
+
+OBSERVABLES_TEMPLATE = \
+"""<?xml version="1.0" encoding="UTF-8"?>
+<cybox:Observables
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    xmlns:cybox="http://cybox.mitre.org/cybox-2"
+    xmlns:WinDriverObj="http://cybox.mitre.org/objects#WinDriverObject-2"
+    xmlns:example="http://example.com/"
+    xsi:schemaLocation="http://cybox.mitre.org/cybox-2 http://cybox.mitre.org/XMLSchema/core/2.0/cybox_core.xsd"
+    cybox_major_version="2"
+    cybox_minor_version="0">
+    %s
+</cybox:Observables>
+"""
+
+OBSERVABLE_TEMPLATE = \
+"""
+<cybox:Observable id="%s">
+    <cybox:Object>
+        <cybox:Properties xsi:type="WinDriverObj:WindowsDriverObjectType">
+            <WinDriverObj:Driver_Name>driver.sys</WinDriverObj:Driver_Name>
+        </cybox:Properties>
+    </cybox:Object>
+</cybox:Observable>
+"""
+
+INDICATOR_TEMPLATE = \
+"""
+<stix:Indicator id="%s" xsi:type="indicator:IndicatorType" version="2.0">
+    <indicator:Type xsi:type="stixVocabs:IndicatorTypeVocab-1.0">Exfiltration</indicator:Type>
+</stix:Indicator>
+"""
+
+
+def _get_package(*ids):
+    indicators = "<!-- Indicator comment -->".join(
+        INDICATOR_TEMPLATE % x for x in ids
+    )
+
+    xml = PACKAGE_TEMPLATE % indicators
+    return BytesIO(xml.encode('utf-8'))
+
+
+def _get_observables(*ids):
+    observables = "".join(OBSERVABLE_TEMPLATE % x for x in ids)
+    xml = OBSERVABLES_TEMPLATE % observables
+    return BytesIO(xml.encode('utf-8'))
+
+
+def _canonicalize(root):
+    """Returns the canonical form of `root`, ignoring whitespace."""
+    parser = etree.XMLParser(remove_blank_text=True)
+    root = etree.fromstring(etree.tostring(root), parser)
+    return etree.tostring(root, method='c14n')
+
+
+class STIXStreamTest(unittest.TestCase):
+    IDS = ("example:Indicator-1", "example:Indicator-2", "example:Indicator-3")
+
+    def _update_stream(self, doc, **kwargs):
+        output = BytesIO()
+        results = stream.update(doc, output, **kwargs)
+
+        root = etree.fromstring(output.getvalue())
+        return results, root
+
+    def test_matches_update(self):
+        expected = ramrod.stix.update(_get_package(*self.IDS))
+        expected = expected.document.as_element()
+
+        for batch_size in (1, 2, 100):
+            results, root = self._update_stream(
+                _get_package(*self.IDS),
+                batch_size=batch_size
+            )
+
+            self.assertEqual(results.document, None)
+            self.assertEqual(_canonicalize(root), _canonicalize(expected))
+
+    def test_jobs(self):
+        expected = ramrod.stix.update(_get_package(*self.IDS))
+        expected = expected.document.as_element()
+
+        results, root = self._update_stream(
+            _get_package(*self.IDS),
+            batch_size=1,
+            jobs=2
+        )
+
+        self.assertEqual(_canonicalize(root), _canonicalize(expected))
+
+        comments = [x for x in root[1] if x.tag is etree.Comment]
+        self.assertEqual(len(comments), 2)
+
+    def test_jobs_removed(self):
+        output = BytesIO()
+        expected = ramrod.update_stream(FORCIBLE, output, force=True)
+
+        output = BytesIO()
+        results = ramrod.update_stream(FORCIBLE, output, force=True, jobs=2)
+
+        summarize = lambda nodes: sorted((x.tag, x.sourceline) for x in nodes)
+        self.assertTrue(results.removed)
+        self.assertEqual(summarize(results.removed), summarize(expected.removed))
+
+        output = BytesIO()
+        self.assertRaises(
+            errors.UpdateError,
+            ramrod.update_stream,
+            FORCIBLE,
+            output,
+            jobs=2
+        )
+
+    def test_comments(self):
+        output = BytesIO()
+        ramrod.stix.update_stream(_get_package(*self.IDS), output)
+        root = etree.fromstring(output.getvalue())
+
+        prolog = root.getprevious()
+        self.assertEqual(prolog.text, " Header comment ")
+
+        indicators = root[1]
+        comments = [x for x in indicators if x.tag is etree.Comment]
+        self.assertEqual(len(comments), 2)
+        self.assertTrue(indicators[1] is comments[0])
+
+    def test_trailing_comments(self):
+        doc = _get_package(*self.IDS).getvalue() + b"<!-- Trailer -->\n"
+        output = BytesIO()
+        ramrod.stix.update_stream(BytesIO(doc), output)
+
+        root = etree.fromstring(output.getvalue())
+        self.assertEqual(root.getnext().text, " Trailer ")
+
+    def test_duplicates(self):
+        ids = ("example:Indicator-1", "example:Indicator-1")
+
+        self.assertRaises(
+            errors.UpdateError,
+            self._update_stream,
+            _get_package(*ids),
+            batch_size=1
+        )
+
+        results, root = self._update_stream(
+            _get_package(*ids),
+            batch_size=1,
+            force=True
+        )
+
+        remapped = results.remapped_ids["example:Indicator-1"]
+        self.assertEqual(len(remapped), 1)
+
+        indicators = [x for x in root[1] if x.tag is not etree.Comment]
+        self.assertEqual(indicators[0].attrib['id'], "example:Indicator-1")
+        self.assertEqual(indicators[1].attrib['id'], remapped[0].attrib['id'])
+
+    def test_pretty(self):
+        output = BytesIO()
+        stream.update(_get_package(*self.IDS), output, batch_size=1)
+        lines = output.getvalue().splitlines()
+
+        # The root, containers and components are indented alike.
+        self.assertTrue(lines[2].startswith(b"<stix:STIX_Package "))
+        self.assertTrue(b"  <stix:Indicators>" in lines)
+        self.assertTrue(b"    <!-- Indicator comment -->" in lines)
+        self.assertEqual(lines[-1], b"</stix:STIX_Package>")
+
+        indicators = [x for x in lines if b"<stix:Indicator " in x]
+        self.assertEqual(len(indicators), 3)
+        self.assertTrue(all(x.startswith(b"    <") for x in indicators))
+
+    def test_unclosed(self):
+        ids = ("example:Indicator-1", "example:Indicator-1")
+
+        for jobs in (None, 2):
+            output = BytesIO()
+            self.assertRaises(
+                errors.UpdateError,
+                stream.update,
+                _get_package(*ids),
+                output,
+                batch_size=1,
+                jobs=jobs
+            )
+
+            # The components written before the error are not closed off.
+            self.assertTrue(b"example:Indicator-1" in output.getvalue())
+            self.assertRaises(
+                etree.XMLSyntaxError,
+                etree.fromstring,
+                output.getvalue()
+            )
+
+    def test_root(self):
+        output = BytesIO()
+        self.assertRaises(
+            errors.UpdateError,
+            ramrod.stix.update_stream,
+            _get_observables(*self.IDS),
+            output
+        )
+
+
+class CyboxStreamTest(unittest.TestCase):
+    IDS = ("example:Observable-1", "example:Observable-2")
+
+    def test_matches_update(self):
+        expected = ramrod.cybox.update(_get_observables(*self.IDS))
+        expected = expected.document.as_element()
+
+        for batch_size in (1, 100):
+            output = BytesIO()
+            results = stream.update(
+                _get_observables(*self.IDS),
+                output,
+                batch_size=batch_size
+            )
+
+            root = etree.fromstring(output.getvalue())
+            self.assertEqual(results.document, None)
+            self.assertEqual(_canonicalize(root), _canonicalize(expected))
+
+    def test_root(self):
+        output = BytesIO()
+        ramrod.cybox.update_stream(_get_observables(*self.IDS), output)
+        root = etree.fromstring(output.getvalue())
+
+        self.assertEqual(root.attrib['cybox_minor_version'], "1")
+        self.assertEqual(len(root), len(self.IDS))
+
+        output = BytesIO()
+        self.assertRaises(
+            errors.UpdateError,
+            ramrod.cybox.update_stream,
+            _get_package(*self.IDS),
+            output
+        )
+
+    def test_duplicates(self):
+        ids = ("example:Observable-1", "example:Observable-1")
+        output = BytesIO()
+
+        self.assertRaises(
+            errors.UpdateError,
+            ramrod.update_stream,
+            _get_observables(*ids),
+            output
+        )
+
+        output = BytesIO()
+        results = ramrod.update_stream(
+            _get_observables(*ids),
+            output,
+            force=True
+        )
+
+        # Both observables are updated in the same batch.
+        remapped = results.remapped_ids["example:Observable-1"]
+        self.assertEqual(len(remapped), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import threading
+import unittest
+
+# external
+from lxml import etree
+from six import BytesIO
+
+# internal
+import ramrod.base as base
+import ramrod.utils as utils
+
+
+class GetOwnedRootTest(unittest.TestCase):
+    XML = b"<root><child/></root>"
+
+    def test_parsed(self):
+        root, owned = utils.get_owned_root(BytesIO(self.XML), make_copy=True)
+        self.assertTrue(owned)
+        self.assertEqual(root.tag, "root")
+
+    def test_element(self):
+        element = etree.fromstring(self.XML)
+
+        root, owned = utils.get_owned_root(element)
+        self.assertTrue(root is element)
+        self.assertFalse(owned)
+
+        root, owned = utils.get_owned_root(element, make_copy=True)
+        self.assertFalse(root is element)
+        self.assertTrue(owned)
+
+    def test_element_tree(self):
+        tree = etree.ElementTree(etree.fromstring(self.XML))
+
+        root, owned = utils.get_owned_root(tree)
+        self.assertTrue(root is tree.getroot())
+        self.assertFalse(owned)
+
+
+class CompiledXPathTest(unittest.TestCase):
+    XML = \
+    """
+    <foo:root xmlns:foo="http://example.com/foo">
+        <foo:child/>
+        <foo:child/>
+    </foo:root>
+    """
+
+    NSMAP = {'foo': 'http://example.com/foo'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls._root = etree.fromstring(cls.XML)
+
+    def test_evaluate(self):
+        xpath = utils.CompiledXPath(".//foo:child", self.NSMAP)
+        self.assertEqual(len(xpath(self._root)), 2)
+
+    def test_syntax_error(self):
+        self.assertRaises(
+            etree.XPathSyntaxError,
+            utils.CompiledXPath, ".//foo:child[", self.NSMAP
+        )
+
+    def test_cached(self):
+        x = utils.compile_xpath(".//foo:child", self.NSMAP)
+        y = utils.compile_xpath(".//foo:child", dict(self.NSMAP))
+        self.assertTrue(x is y)
+
+    def test_threads(self):
+        xpath = utils.compile_xpath(".//foo:child", self.NSMAP)
+        counts = []
+
+        def run():
+            root = etree.fromstring(self.XML)
+            for _ in range(100):
+                counts.append(len(xpath(root)))
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(counts), 800)
+        self.assertTrue(all(x == 2 for x in counts))
+
+
+class NamespaceResolverTest(unittest.TestCase):
+    XML = \
+    b"""<a:root xmlns:a="urn:a" xmlns:b="urn:b"
+        xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+        <a:child xsi:type="b:Type1">
+            <a:child xmlns:b="urn:b2" xsi:type="b:Type2"/>
+        </a:child>
+        <child xmlns="urn:default" xsi:type="a:Type3"/>
+    </a:root>
+    """
+
+    def test_scope(self):
+        root = etree.fromstring(self.XML)
+        resolver = utils.NamespaceResolver()
+
+        for node in root.iter('*'):
+            self.assertEqual(resolver.scope(node), node.nsmap)
+
+        # Nodes which declare no namespaces share their parent's scope.
+        self.assertTrue(resolver.scope(root[0]) is resolver.scope(root))
+
+    def test_ext_namespace(self):
+        root = etree.fromstring(self.XML)
+        resolver = utils.NamespaceResolver()
+        typed = utils.get_typed_nodes(root)
+
+        found = [utils.get_ext_namespace(x, resolver) for x in typed]
+        self.assertEqual(found, ["urn:b", "urn:b2", "urn:a"])
+        self.assertEqual(found, [utils.get_ext_namespace(x) for x in typed])
+
+        self.assertEqual(resolver.resolve(root, 'c'), None)
+
+
+class ContentMapTest(unittest.TestCase):
+    XML = \
+    b"""<root>
+        <empty><a> </a><b><c/></b></empty>
+        <text><a/><b><c>value</c></b></text>
+        <attrib><a/><b foo=""/></attrib>
+        <tail><a/>value<!-- comment --></tail>
+    </root>
+    """
+
+    def _scan(self, node):
+        nodes = node.iter('*')
+        return any(x.attrib or utils.strip_whitespace(x.text) for x in nodes)
+
+    def test_has_content(self):
+        root = etree.fromstring(self.XML)
+        expected = [self._scan(x) for x in root.iter('*')]
+
+        # Query outer nodes first, so inner results come from the cache.
+        content = utils.ContentMap()
+        self.assertEqual([content.has_content(x) for x in root.iter('*')], expected)
+
+        # Query inner nodes first.
+        content = utils.ContentMap()
+        nodes = reversed(list(root.iter('*')))
+        self.assertEqual([content.has_content(x) for x in nodes], expected[::-1])
+
+    def test_interrogate(self):
+        root = etree.fromstring(self.XML)
+        content = utils.ContentMap()
+
+        class Optional(base.OptionalElements):
+            pass
+
+        # Tail text is not content of the parent element.
+        found = Optional._interrogate(root.iter('*'), content)
+        tags = ['empty', 'a', 'b', 'c', 'a', 'a', 'tail', 'a']
+        self.assertEqual([x.tag for x in found], tags)
+
+
+class ElementTemplateTest(unittest.TestCase):
+    XML = \
+    """
+    <a:root xmlns:a="urn:a">
+        <a:first/>
+        <a:second>
+            <a:value/>
+        </a:second>
+    </a:root>
+    """
+
+    def test_build(self):
+        template = utils.ElementTemplate(self.XML, "a:second/a:value")
+        root, target = template.build()
+        target.text = "<&>"
+
+        self.assertEqual(target.tag, "{urn:a}value")
+        self.assertTrue(target.getparent().getparent() is root)
+        self.assertEqual(len(root.xpath("//text()")), 1)
+
+        # Copies are independent of each other and of the template.
+        other, _ = template.build()
+        self.assertEqual(other[1][0].text, None)
+        self.assertEqual(template.prototype[1][0].text, None)
+
+    def test_missing_target(self):
+        self.assertRaises(ValueError, utils.ElementTemplate, self.XML, "a:none")
+
+
+class GetXPathTest(unittest.TestCase):
+    class Rule(base.DisallowedFields):
+        XPATH = ".//foo:child"
+        NSMAP = {'foo': 'http://example.com/foo'}
+
+    def test_cached(self):
+        xpath = base.get_xpath(self.Rule, 'XPATH')
+        self.assertTrue(xpath is base.get_xpath(self.Rule, 'XPATH'))
+
+    def test_recompiled(self):
+        class Rule(self.Rule):
+            XPATH = ".//foo:other"
+
+        xpath = base.get_xpath(Rule, 'XPATH')
+        self.assertEqual(xpath.path, ".//foo:other")
+        self.assertEqual(base.get_xpath(self.Rule, 'XPATH').path, ".//foo:child")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import itertools
+import unittest
+
+# external
+from lxml import etree
+
+# internal
+import ramrod.xsd as xsd
+from ramrod.stix import stix_1_0_1
+
+VALUES = (
+    "2014-01-01T00:00:00",
+    "2014-01-01T00:00:00.5",
+    "2014-01-01T00:00:00.",
+    "2014-01-01T00:00:00Z",
+    "2014-01-01T00:00:00z",
+    "2014-01-01T00:00:00+0000",
+    "2014-01-01T00:00:00-00:00",
+    "2014-01-01T00:00:00+13:59",
+    "2014-01-01T00:00:00+14:00",
+    "2014-01-01T00:00:00+14:01",
+    "2014-01-01T00:00:00+00:60",
+    "2014-01-01T24:00:00",
+    "2014-01-01T24:00:01",
+    "2014-01-01T23:60:00",
+    "2014-01-01T23:59:60",
+    "2014-00-01T00:00:00",
+    "2014-13-01T00:00:00",
+    "2014-04-31T00:00:00",
+    "2014-1-01T00:00:00",
+    "2014-01-01 T00:00:00",
+    "2014-01-01",
+    "0000-01-01T00:00:00",
+    "-0001-01-01T00:00:00",
+    "-0004-02-29T00:00:00",
+    "10000-01-01T00:00:00",
+    "01000-01-01T00:00:00",
+    "99999999999999999999-01-01T00:00:00",
+    " 2014-01-01T00:00:00",
+    "2014-01-01T00:00:00\n",
+    "+2014-01-01T00:00:00",
+    u"٢014-01-01T00:00:00",
+    "THIS CANNOT BE TRANSLATED",
+    "",
+)
+
+
+class IsDatetimeTest(unittest.TestCase):
+    def test_matches_schema(self):
+        for value in VALUES:
+            self.assertEqual(
+                xsd.is_datetime(value),
+                xsd._schema_validate(value),  # noqa
+                value
+            )
+
+    def test_leap_years(self):
+        years = ("1900", "1996", "2000", "2014", "2016")
+        days = ("28", "29", "30")
+
+        for year, day in itertools.product(years, days):
+            value = "%s-02-%sT00:00:00" % (year, day)
+            self.assertEqual(
+                xsd.is_datetime(value),
+                xsd._schema_validate(value),  # noqa
+                value
+            )
+
+    def test_validate_datetimes(self):
+        values = VALUES + VALUES
+        expected = [xsd._schema_validate(x) for x in values]  # noqa
+        self.assertEqual(xsd.validate_datetimes(values), expected)
+
+
+class DisallowedDateTimeTest(unittest.TestCase):
+    XML = \
+    b"""<root xmlns:stixCommon="http://stix.mitre.org/common-1">
+        <activity><stixCommon:Date_Time>2014-01-01T00:00:00</stixCommon:Date_Time></activity>
+        <activity><stixCommon:Date_Time>yesterday</stixCommon:Date_Time></activity>
+        <activity><stixCommon:Date_Time/></activity>
+        <activity><stixCommon:Date_Time foo="bar">2014-01-01T00:00:00</stixCommon:Date_Time></activity>
+        <activity><stixCommon:Date_Time>2014-01-01<!-- comment -->T00:00:00</stixCommon:Date_Time></activity>
+    </root>
+    """
+
+    def test_interrogate(self):
+        root = etree.fromstring(self.XML)
+        nodes = [x[0] for x in root]
+
+        klass = stix_1_0_1.DisallowedDateTime
+        expected = [x.getparent() for x in nodes if not klass.XML_SCHEMA.validate(x)]
+
+        self.assertEqual(klass._interrogate(nodes), expected)  # noqa
+        self.assertEqual(len(expected), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
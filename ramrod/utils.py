@@ -4,12 +4,13 @@
 # builtin
 import copy
 import contextlib
+import threading
 import uuid
 from distutils.version import StrictVersion
 
 # external
 from lxml import etree
-from six import text_type
+from six import iteritems, text_type
 
 # relative
 from . import errors, xmlconst
@@ -40,31 +41,84 @@ def get_xml_parser():
     return parser
 
 
-def get_etree_root(doc, make_copy=False):
-    """Returns an instance of lxml.etree._Element for the given input.
+def iterparse(source, events=('end',)):
+    """Returns an ``etree.iterparse`` iterator over `source` which parses
+    with the same options as the parser returned by :func:`get_xml_parser`.
+
+    Args:
+        source: A filename or file-like object.
+        events: A tuple of the ``etree.iterparse`` events to report.
+
+    """
+    return etree.iterparse(
+        source,
+        events=events,
+        huge_tree=True,
+        resolve_entities=False,
+        remove_comments=False,
+        remove_pis=True,
+        strip_cdata=False,
+        remove_blank_text=True
+    )
+
+
+def get_owned_root(doc, make_copy=False, parser=None):
+    """Returns a tuple containing an instance of lxml.etree._Element for the
+    given input and a boolean which is ``True`` if the element belongs to a
+    tree created by this call.
+
+    Trees which are parsed from a filename or file-like object (or copied
+    because `make_copy` is ``True``) cannot be seen by the caller, so they may
+    be modified without making a defensive copy first.
 
     Args:
         doc: The input XML document. Can be an instance of
             ``lxml.etree._Element``, ``lxml.etree._ElementTree``, a file-like
             object, or a string filename.
-        make_copy: If ``True``, a ``copy.deepcopy()`` of the root node will be
-            returned.
+        make_copy: If ``True`` and `doc` is an ``lxml.etree._Element`` or
+            ``lxml.etree._ElementTree``, a ``copy.deepcopy()`` of the root
+            node will be returned. Parsed documents are never copied.
+        parser (optional): The parser used when `doc` is a filename or
+            file-like object. If ``None``, the parser returned by
+            :func:`get_xml_parser` is used.
 
     Returns:
-        An ``lxml.etree._Element`` instance for `doc`.
+        A ``(root, owned)`` tuple.
 
     """
-    deepcopy = copy.deepcopy
-
     if isinstance(doc, etree._Element):  # noqa
-        root = deepcopy(doc) if make_copy else doc
+        root = doc
     elif isinstance(doc, etree._ElementTree):  # noqa
-        root = deepcopy(doc.getroot()) if make_copy else doc.getroot()
+        root = doc.getroot()
     else:
-        parser = get_xml_parser()
+        if parser is None:
+            parser = get_xml_parser()
+
         tree = etree.parse(doc, parser=parser)
-        root = tree.getroot()
+        return tree.getroot(), True
+
+    if make_copy:
+        return copy.deepcopy(root), True
+
+    return root, False
+
+
+def get_etree_root(doc, make_copy=False):
+    """Returns an instance of lxml.etree._Element for the given input.
+
+    Args:
+        doc: The input XML document. Can be an instance of
+            ``lxml.etree._Element``, ``lxml.etree._ElementTree``, a file-like
+            object, or a string filename.
+        make_copy: If ``True``, a ``copy.deepcopy()`` of the root node will be
+            returned. Documents parsed from a filename or file-like object are
+            already private to the caller and are not copied.
+
+    Returns:
+        An ``lxml.etree._Element`` instance for `doc`.
 
+    """
+    root, _ = get_owned_root(doc, make_copy=make_copy)
     return root
 
 
@@ -122,6 +176,129 @@ def remove_xml_attributes(node, attrs):
         remove_xml_attribute(node, attr)
 
 
+class CompiledXPath(object):
+    """A compiled xpath expression which can be shared between threads.
+
+    The expression is compiled once when the ``CompiledXPath`` is created. lxml
+    serializes concurrent evaluations of a single ``etree.XPath`` instance, so
+    every other thread which evaluates the expression lazily compiles its own
+    copy rather than waiting on the shared one.
+
+    Args:
+        path: An xpath expression.
+        namespaces (optional): A dictionary of namespace aliases to namespaces
+            used when evaluating `path`.
+
+    Raises:
+        lxml.etree.XPathSyntaxError: If `path` is not a valid xpath
+            expression.
+
+    """
+    def __init__(self, path, namespaces=None):
+        self.path = path
+        self.namespaces = dict(namespaces or {})
+        self._local = threading.local()
+        self._local.xpath = self._compile()
+
+    def _compile(self):
+        return etree.XPath(self.path, namespaces=self.namespaces)
+
+    def __call__(self, node):
+        """Evaluates the xpath expression against `node` and returns the
+        result.
+
+        """
+        try:
+            xpath = self._local.xpath
+        except AttributeError:
+            xpath = self._local.xpath = self._compile()
+
+        return xpath(node)
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, self.path)
+
+
+# Cache of (xpath, namespaces) => CompiledXPath instances
+_COMPILED_XPATHS = {}
+
+
+def compile_xpath(path, namespaces=None):
+    """Returns a :class:`CompiledXPath` for the `path` xpath evaluated with the
+    `namespaces` alias mapping.
+
+    Compiled expressions are cached, so calling this repeatedly with the same
+    arguments returns the same instance.
+
+    """
+    namespaces = namespaces or {}
+    key = (path, frozenset(iteritems(namespaces)))
+
+    try:
+        return _COMPILED_XPATHS[key]
+    except KeyError:
+        compiled = CompiledXPath(path, namespaces)
+        return _COMPILED_XPATHS.setdefault(key, compiled)
+
+
+class ElementTemplate(object):
+    """A prototype XML structure which is copied to build new elements
+    without parsing XML.
+
+    The template is parsed once. Each call to :meth:`build` copies it, which
+    is considerably faster than formatting and parsing an XML string, and
+    values assigned to the copy are escaped when it is serialized.
+
+    Args:
+        xml: The XML of the template. Whitespace-only text is removed.
+        target (optional): An xpath, relative to the root of `xml`, which
+            locates the element which receives values in built copies. The
+            namespace aliases declared on the root of `xml` may be used.
+
+    Raises:
+        ValueError: If `target` does not locate an element.
+
+    """
+    def __init__(self, xml, target='.'):
+        parser = etree.XMLParser(remove_blank_text=True)
+        self.prototype = etree.fromstring(xml, parser)
+        self._path = self._get_path(target)
+
+    def _get_path(self, target):
+        """Returns the child indexes leading from the template root to the
+        element located by the `target` xpath.
+
+        """
+        namespaces = dict(
+            (alias, ns) for alias, ns in iteritems(self.prototype.nsmap) if alias
+        )
+        found = self.prototype.xpath(target, namespaces=namespaces)
+
+        if not found or not etree.iselement(found[0]):
+            raise ValueError("Template target not found: %s" % target)
+
+        path, node = [], found[0]
+        parent = node.getparent()
+
+        while parent is not None:
+            path.append(parent.index(node))
+            node, parent = parent, parent.getparent()
+
+        return tuple(reversed(path))
+
+    def build(self):
+        """Returns a ``(root, target)`` tuple: a copy of the template and the
+        element of the copy located by the `target` xpath.
+
+        """
+        root = target = copy.deepcopy(self.prototype)
+
+        for idx in self._path:
+            target = target[idx]
+
+        return root, target
+
+
 def get_type_info(node):
     """Returns a (ns alias, typename) tuple which is generated from the
     ``xsi:type`` attribute on `node`.
@@ -136,6 +313,12 @@ def get_type_info(node):
     return (alias, typename)
 
 
+_XPATH_TYPED_NODES = CompiledXPath(
+    ".//*[@xsi:type]",
+    namespaces={'xsi': xmlconst.NS_XSI}
+)
+
+
 def get_typed_nodes(root):
     """Finds all nodes under `root` which have an ``xsi:type`` attribute.
 
@@ -143,13 +326,10 @@ def get_typed_nodes(root):
         A list of ``etree._Element`` instances.
 
     """
-    nsmap = {'xsi': xmlconst.NS_XSI}
-    xpath = ".//*[@xsi:type]"
-    nodes = root.xpath(xpath, namespaces=nsmap)
-    return nodes
+    return _XPATH_TYPED_NODES(root)
 
 
-def get_ext_namespace(node):
+def get_ext_namespace(node, resolver=None):
     """Returns the namespace which contains the type definition for
     the `node`. The type definition is specified by the ``xsi:type``
     attribute which is formatted as ``[alias]:[type name]``.
@@ -160,6 +340,8 @@ def get_ext_namespace(node):
     Args:
         node: An instance of lxml.etree._Element which contains an
             ``xsi:type`` attribute.
+        resolver (optional): A :class:`NamespaceResolver` which resolves the
+            alias. If ``None``, the alias is looked up in ``node.nsmap``.
 
     Returns:
         The namespace for the type defintion of this node.
@@ -170,10 +352,178 @@ def get_ext_namespace(node):
     """
     xsi_type = node.attrib[xmlconst.TAG_XSI_TYPE]
     alias = xsi_type.split(":")[0]
+
+    if resolver is not None:
+        return resolver.scope(node)[alias]
+
     namespace = node.nsmap[alias]
     return namespace
 
 
+# The iterwalk() events which report the namespaces declared on a node.
+_NS_EVENTS = ('start-ns', 'start')
+
+
+def get_declared_namespaces(node):
+    """Returns a list of ``(alias, namespace)`` tuples for the namespaces
+    declared on `node` itself. Namespaces declared on its ancestors are not
+    included. The alias of a default namespace is ``None``.
+
+    """
+    declared = []
+
+    # The 'start-ns' events for a node precede its 'start' event and only
+    # include the namespaces declared on the node itself.
+    for event, obj in etree.iterwalk(node, events=_NS_EVENTS):
+        if event == 'start':
+            break
+
+        alias, ns = obj
+        declared.append((alias or None, ns))
+
+    return declared
+
+
+class NamespaceResolver(object):
+    """Resolves the namespace aliases in scope at nodes of a document.
+
+    Reading ``node.nsmap`` builds a new dictionary from the namespace
+    declarations of `node` and every ancestor, each time it is read. The
+    resolver instead caches the in-scope namespaces of each node it visits.
+    Nodes which declare no namespaces share the dictionary of their parent,
+    so resolving the namespaces of many nodes costs amortized constant time.
+
+    The cache is not invalidated, so a resolver should only be used while
+    the namespace declarations and structure of the document are not being
+    changed. Create a new resolver for each pass over a document.
+
+    """
+    def __init__(self):
+        self._scopes = {}  # node => {alias: namespace}
+
+    def scope(self, node):
+        """Returns a dictionary of the namespace aliases to namespaces in
+        scope at `node`, equal to ``node.nsmap``. The dictionary is shared
+        and must not be modified.
+
+        """
+        scopes = self._scopes
+        scope = scopes.get(node)
+
+        if scope is not None:
+            return scope
+
+        # Walk up to the nearest ancestor with a cached scope.
+        uncached = []
+
+        while node is not None:
+            scope = scopes.get(node)
+
+            if scope is not None:
+                break
+
+            uncached.append(node)
+            node = node.getparent()
+        else:
+            scope = {}
+
+        for node in reversed(uncached):
+            declared = get_declared_namespaces(node)
+
+            if declared:
+                scope = dict(scope)
+                scope.update(declared)
+
+            scopes[node] = scope
+
+        return scope
+
+    def resolve(self, node, alias):
+        """Returns the namespace `alias` is bound to at `node`, or ``None``
+        if it is not bound.
+
+        """
+        return self.scope(node).get(alias)
+
+
+def has_own_content(node):
+    """Returns ``True`` if `node` has attributes or a text value which is not
+    only whitespace. The content of descendants and tail text is ignored.
+
+    """
+    if node.attrib:
+        return True
+
+    text = node.text
+    return bool(text) and not text.isspace()
+
+
+class ContentMap(object):
+    """Answers whether elements of a document contain content: attributes or
+    text values which are not only whitespace, on the element itself or any
+    of its descendants.
+
+    Results are cached for every element whose subtree has been searched, so
+    nested and overlapping queries do not search the same subtree twice. A
+    search stops at the first element found with content, marking each of its
+    ancestors up to the queried node as having content.
+
+    The cache is not invalidated. Removing elements without content does not
+    change the result for any other element, but adding content or removing
+    attributes does, so a map should only be used for a single pass over a
+    document.
+
+    """
+    def __init__(self):
+        self._known = {}  # node => has content
+
+    def has_content(self, node):
+        """Returns ``True`` if `node` or any of its descendant elements has
+        attributes or a non-whitespace text value.
+
+        """
+        known = self._known
+        found = known.get(node)
+
+        if found is not None:
+            return found
+
+        if has_own_content(node):
+            known[node] = True
+            return True
+
+        # Depth-first search in document order. `path` holds the node being
+        # searched and its ancestors up to `node`.
+        path, children = [node], [node.iterchildren('*')]
+
+        while path:
+            child = next(children[-1], None)
+
+            if child is None:
+                # Every child of the last node in the path is empty.
+                known[path.pop()] = False
+                children.pop()
+                continue
+
+            found = known.get(child)
+
+            if found is False:
+                continue
+
+            if found or has_own_content(child):
+                known[child] = True
+
+                for x in path:
+                    known[x] = True
+
+                return True
+
+            path.append(child)
+            children.append(child.iterchildren('*'))
+
+        return False
+
+
 def create_new_id(orig_id):
     """Creates a new ID from `orig_id` by appending '-cleaned-' and a UUID4
     string to the end of the `orig_id` value.
@@ -0,0 +1,148 @@
+# Copyright (c) 2015, The MITRE Corporation. All rights reserved.
+# See LICENSE.txt for complete terms.
+
+# builtin
+import re
+
+try:
+    from functools import lru_cache
+except ImportError:  # Python 2: values are validated without a cache.
+    def lru_cache(maxsize):
+        return lambda func: func
+
+# external
+from lxml import etree
+
+# internal
+from ramrod import xmlconst
+
+
+# The number of recently validated xs:dateTime values which are cached.
+DATETIME_CACHE_SIZE = 4096
+
+# The common lexical form of xs:dateTime values: a year of four or more
+# digits, which may be negative, an optional fractional second and an
+# optional timezone.
+_DATETIME = re.compile(
+    r"(-?[0-9]{4,})-([0-9]{2})-([0-9]{2})"
+    r"T([0-9]{2}):([0-9]{2}):([0-9]{2})(?:\.[0-9]+)?"
+    r"(?:Z|[+-]([0-9]{2}):([0-9]{2}))?\Z"
+)
+
+# XML whitespace characters.
+_WHITESPACE = re.compile(r"[ \t\r\n]")
+
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+_XSD = \
+"""
+<xs:schema xmlns:xs="%s">
+    <xs:element name="value" type="xs:dateTime"/>
+</xs:schema>
+""" % xmlconst.NS_XML_SCHEMA
+
+_XML_SCHEMA = etree.XMLSchema(etree.fromstring(_XSD))
+
+
+def _schema_validate(value):
+    """Validates `value` against an XML Schema which declares a single
+    xs:dateTime element.
+
+    """
+    node = etree.Element("value")
+    node.text = value
+    return _XML_SCHEMA.validate(node)
+
+
+def _is_leap_year(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+@lru_cache(maxsize=DATETIME_CACHE_SIZE)
+def is_datetime(value):
+    """Returns ``True`` if `value` is a valid xs:dateTime lexical value.
+
+    Values are checked with a regular expression and range checks for each
+    field. Values which use rarely seen parts of the lexical space (years
+    before 1 CE or after 9999 CE, the ``24:00:00`` end of day time and
+    surrounding whitespace) are checked against an XML Schema instead, so
+    that every value is judged exactly as libxml2 judges an xs:dateTime
+    element.
+
+    Recently validated values are cached.
+
+    Args:
+        value: A string.
+
+    """
+    if _WHITESPACE.search(value):
+        return _schema_validate(value)
+
+    match = _DATETIME.match(value)
+
+    if not match:
+        return False
+
+    year, month, day, hour, minute, second, tz_hour, tz_minute = match.groups()
+
+    if len(year) != 4 or hour == "24":
+        return _schema_validate(value)
+
+    year, month, day = int(year), int(month), int(day)
+
+    if year == 0 or not 1 <= month <= 12:
+        return False
+
+    days = _DAYS_IN_MONTH[month - 1]
+
+    if month == 2 and _is_leap_year(year):
+        days = 29
+
+    if not 1 <= day <= days:
+        return False
+
+    if int(hour) > 23 or int(minute) > 59 or int(second) > 59:
+        return False
+
+    if tz_hour is None:
+        return True
+
+    tz_hour, tz_minute = int(tz_hour), int(tz_minute)
+
+    if tz_minute > 59:
+        return False
+
+    return tz_hour < 14 or (tz_hour == 14 and tz_minute == 0)
+
+
+def validate_datetimes(values):
+    """Validates each xs:dateTime lexical value in `values`. Each distinct
+    value is validated once.
+
+    Args:
+        values: An iterable collection of strings.
+
+    Returns:
+        A list of booleans in the order of `values`. An item is ``True`` if
+        the value is a valid xs:dateTime.
+
+    """
+    results = {}
+    validated = []
+
+    for value in values:
+        try:
+            valid = results[value]
+        except KeyError:
+            valid = results[value] = is_datetime(value)
+
+        validated.append(valid)
+
+    return validated
+
+
+__all__ = [
+    'DATETIME_CACHE_SIZE',
+    'is_datetime',
+    'validate_datetimes'
+]
@@ -50,7 +50,11 @@ setup(
     url='http://stix.mitre.org/',
     version=get_version(),
     packages=find_packages(),
-    scripts=['ramrod/scripts/ramrod_update.py', 'ramrod/scripts/update_ns.py'],
+    scripts=[
+        'ramrod/scripts/ramrod_update.py',
+        'ramrod/scripts/ramrod_server.py',
+        'ramrod/scripts/update_ns.py',
+    ],
     install_requires=install_requires,
     extras_require=extras_require,
     long_description=readme,